@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import itertools
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Generator
+
+from processors import ProcessorError
+from utils import move_file
+
+
+class FakeProcessor:
+    """Processor which emulates converting without real application.
+
+    Each job takes `latency` seconds, prints `progress_lines` progress lines
+    and creates result of `output_size` bytes. Part of jobs (`failure_rate`)
+    fails on getting the result.
+    """
+
+    def __init__(
+        self,
+        work_dir: str | Path,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        output_size: int = 0,
+        progress_lines: int = 10,
+        seed: int | None = None,
+    ) -> None:
+        self.work_dir = Path(work_dir)
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.output_size = output_size
+        self.progress_lines = progress_lines
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._job_ids = itertools.count(1)
+        self._status = "ready"
+
+    def get_status(self) -> str:
+        return self._status
+
+    def set_status(self, status: str) -> None:
+        self._status = status
+
+    def is_completed(self) -> bool:
+        return self._status == "completed"
+
+    def send_job(self, filename: str, options: dict | None = None) -> int:
+        with self._lock:
+            return next(self._job_ids)
+
+    def get_job_status(self, job_id: int) -> Generator:
+        delay = self.latency / self.progress_lines if self.progress_lines else self.latency
+        for line in range(1, self.progress_lines + 1):
+            time.sleep(delay)
+            yield "processing", f"{line * 100 // self.progress_lines}% Converting"
+        if not self.progress_lines:
+            time.sleep(delay)
+
+    def get_job_result(self, job_id: int) -> str:
+        with self._lock:
+            is_failed = self._random.random() < self.failure_rate
+        if is_failed:
+            raise ProcessorError(f"Job {job_id} failed")
+
+        path = self.work_dir / f"{job_id}.out"
+        path.write_bytes(b"\0" * self.output_size)
+        return str(path)
+
+    def save_file(self, path_to_result: str, path_to_save: str | Path) -> Path:
+        destination = Path(path_to_save)
+        destination.mkdir(parents=True, exist_ok=True)
+        new_file_path = destination / Path(path_to_result).name
+        move_file(path_to_result, new_file_path)
+        return new_file_path
+
+
+class FakeUI:
+    """UI which only counts calls of converter."""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _count(self, *args: Any, **kwargs: Any) -> None:
+        with self._lock:
+            self.calls += 1
+
+    run = setup = convert = _count
+    display_job_status = display_job_result = display_job_id = _count
+    display_common_info = display_progress = display_error = _count
@@ -0,0 +1,240 @@
+"""Benchmarks of converter with fake processor.
+
+Run from the project root:
+
+    python -m benchmarks.run --jobs 200 --parallel 8 --output results.json
+    python -m benchmarks.run --baseline results.json
+
+Exit code is 1 if some metric is worse than baseline more than on `--threshold`
+(baseline depends on machine, so it is saved by `--output` on the same one).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import platform
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from pathlib import Path
+from typing import Callable
+
+from benchmarks.fakes import FakeProcessor, FakeUI
+from config import JobConfig, Target
+from converter import Converter
+
+# methods of converter which are measured as stages of one job
+STAGES = ("validate_config", "send_job", "get_result", "save")
+PERCENTILES = (50, 95, 99)
+# changes of timings less than this (seconds) are noise, not regressions
+MIN_TIME_DELTA = 0.0005
+
+
+class StageTimer:
+    """Collects durations of converter stages from all threads."""
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, duration: float) -> None:
+        with self._lock:
+            self.samples[stage].append(duration)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        @wraps(func)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - started)
+        return timed
+
+    def instrument(self, converter: Converter) -> None:
+        for stage in (*STAGES, "convert_job"):
+            setattr(converter, stage, self.wrap(stage, getattr(converter, stage)))
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        return {stage: summarize(samples) for stage, samples in sorted(self.samples.items())}
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    """Return percentile of samples by nearest-rank method."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    summary = {"count": len(samples), "mean": sum(samples) / len(samples) if samples else 0.0}
+    for percent in PERCENTILES:
+        summary[f"p{percent}"] = percentile(samples, percent)
+    return summary
+
+
+def run_scenario(
+    name: str,
+    jobs: int,
+    parallel: int,
+    latency: float = 0.0,
+    failure_rate: float = 0.0,
+    output_size: int = 0,
+    seed: int = 0,
+) -> dict:
+    """Convert `jobs` files by converter with fake processor and return metrics."""
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        work_dir = Path(tmp_dir)
+        path_to_file = work_dir / "book.fb2"
+        path_to_file.write_bytes(b"book")
+
+        processor = FakeProcessor(
+            work_dir, latency=latency, failure_rate=failure_rate,
+            output_size=output_size, seed=seed)
+        converter = Converter(FakeUI(), processor, progress_interval=0)
+        timer = StageTimer()
+        timer.instrument(converter)
+
+        configs = [
+            JobConfig(Target("mobi", "ebook"), str(path_to_file), str(work_dir / "results"))
+            for _ in range(jobs)
+        ]
+        report = converter.convert_many(configs, max_parallel=parallel)
+
+    stages = timer.summary()
+    return {
+        "name": name,
+        "params": {
+            "jobs": jobs,
+            "parallel": parallel,
+            "latency": latency,
+            "failure_rate": failure_rate,
+            "output_size": output_size,
+        },
+        "elapsed": report.elapsed,
+        "completed": report.completed,
+        "failures": len(report.failures),
+        "books_per_minute": report.books_per_minute,
+        "job_overhead": stages["convert_job"]["mean"] - latency,
+        "stages": stages,
+    }
+
+
+def run_benchmarks(args: argparse.Namespace) -> dict:
+    scenarios = [
+        # processor does nothing, so time of job is overhead of converter
+        run_scenario("overhead", args.jobs, parallel=1),
+        run_scenario(
+            "throughput",
+            args.jobs,
+            args.parallel,
+            latency=args.latency,
+            failure_rate=args.failure_rate,
+            output_size=args.output_size,
+        ),
+    ]
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.time(),
+        "scenarios": {scenario["name"]: scenario for scenario in scenarios},
+    }
+
+
+def get_metrics(results: dict) -> dict[str, tuple[float, bool]]:
+    """Return compared metrics as value and True if higher value is better."""
+    metrics = {}
+    for name, scenario in results["scenarios"].items():
+        metrics[f"{name}.books_per_minute"] = (scenario["books_per_minute"], True)
+        metrics[f"{name}.job_overhead"] = (scenario["job_overhead"], False)
+        for stage, summary in scenario["stages"].items():
+            for percent in PERCENTILES:
+                metrics[f"{name}.{stage}.p{percent}"] = (summary[f"p{percent}"], False)
+    return metrics
+
+
+def compare(
+    results: dict, baseline: dict, threshold: float, min_delta: float = MIN_TIME_DELTA,
+) -> list[str]:
+    """Return descriptions of metrics which are worse than baseline more than on threshold.
+
+    Timings are compared only if they are changed more than on `min_delta` seconds.
+    """
+    regressions = []
+    current = get_metrics(results)
+    for name, (base_value, higher_is_better) in get_metrics(baseline).items():
+        if name not in current or not base_value:
+            continue
+
+        value = current[name][0]
+        if not higher_is_better and value - base_value < min_delta:
+            continue
+
+        change = (value - base_value) / base_value
+        is_worse = change < -threshold if higher_is_better else change > threshold
+        if is_worse:
+            regressions.append(f"{name}: {base_value:.6f} -> {value:.6f} ({change:+.1%})")
+    return regressions
+
+
+def print_results(results: dict) -> None:
+    for name, scenario in results["scenarios"].items():
+        print(
+            f"{name}: {scenario['completed']} jobs in {scenario['elapsed']:.2f}s, "
+            f"{scenario['books_per_minute']:.0f} books/min, "
+            f"overhead {scenario['job_overhead'] * 1000:.3f}ms per job"
+        )
+        for stage, summary in scenario["stages"].items():
+            timings = ", ".join(
+                f"p{percent} {summary[f'p{percent}'] * 1000:.3f}ms" for percent in PERCENTILES)
+            print(f"    {stage}: {timings}")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=100, help="count of jobs in each scenario")
+    parser.add_argument("--parallel", type=int, default=8, help="jobs processed at the same time")
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds of processing one job")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="part of failed jobs")
+    parser.add_argument("--output-size", type=int, default=1024 * 1024, help="bytes of result")
+    parser.add_argument("--output", type=Path, help="path to save results as JSON")
+    parser.add_argument("--baseline", type=Path, help="path to JSON results to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.2, help="allowed relative change of metrics")
+    parser.add_argument(
+        "--min-delta", type=float, default=MIN_TIME_DELTA,
+        help="seconds of timing change which are ignored as noise")
+
+    args = parser.parse_args(argv)
+    # regression check should not be passed silently because of wrong path
+    if args.baseline is not None and not args.baseline.is_file():
+        parser.error(f"baseline file does not exist: {args.baseline}")
+    return args
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    results = run_benchmarks(args)
+    print_results(results)
+
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    if args.baseline is None:
+        return 0
+
+    regressions = compare(
+        results, json.loads(args.baseline.read_text()), args.threshold, args.min_delta)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
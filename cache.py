@@ -0,0 +1,211 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path, PosixPath
+from typing import Union
+
+from utils import copy_file_fast, get_result_name
+
+DEFAULT_CACHE_DIR = Path("~/.cache/convert").expanduser()
+DEFAULT_CACHE_SIZE = 2 * 1024**3
+HASH_CHUNK_SIZE = 1024 * 1024
+# file of entry with name of the source which result was converted from
+SOURCE_FILE_NAME = ".source"
+
+
+def hash_file(path_to_file: str | Path) -> str:
+    """Return sha256 hex digest of the file content."""
+    file_hash = hashlib.sha256()
+    with open(path_to_file, "rb") as file:
+        while chunk := file.read(HASH_CHUNK_SIZE):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+class ResultCache:
+    """Content-addressed cache of converted files on disk.
+
+    Entry key is a hash of the input file bytes and the job options,
+    so the same book with the same target can be reused by any processor.
+    The least recently used entries are removed when the size budget is exceeded.
+    Cache dir can be shared by processes, so entries can be removed or saved
+    by other ones: lookup errors are misses and saving is best-effort.
+    """
+
+    def __init__(
+        self,
+        cache_dir: str | Path = DEFAULT_CACHE_DIR,
+        max_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        self.cache_dir = Path(cache_dir)
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._size = 0
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._load_entries()
+
+    @staticmethod
+    def make_key(path_to_file: str | Path, options: dict, file_hash: str | None = None) -> str:
+        """Return cache key of the file content and the job options.
+
+        `file_hash` is hash of the file which was computed before.
+        """
+        options_data = json.dumps(options, sort_keys=True, default=str)
+        key = hashlib.sha256(bytes.fromhex(file_hash or hash_file(path_to_file)))
+        key.update(options_data.encode())
+        return key.hexdigest()
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(
+        self, key: str, path_to_save: str | Path, source: str | Path | None = None,
+    ) -> Union[Path, PosixPath, None]:
+        """Copy cached result to directory, return path to it or None without entry.
+
+        Cached file is named by the first source of the entry, so the copy is renamed
+        for `source` by the same rule (e.g. "alpha.mobi" of "alpha.fb2" for "beta.fb2"
+        is "beta.mobi").
+        """
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            try:
+                cached_file = self._get_entry_file(key)
+                if cached_file is None:
+                    self._remove_entry(key)
+                    return None
+                name = self._get_entry_name(key, cached_file, source)
+                # keep modification time as the last usage time of entry
+                cached_file.touch()
+                # opened file is kept if entry is removed by eviction in other thread
+                opened_file = open(cached_file, "rb")
+            except OSError:
+                # entry was removed by other process
+                self._size -= self._entries.pop(key)
+                return None
+
+        # copy without the lock to not block other lookups
+        with opened_file:
+            destenation_dir = Path(path_to_save)
+            destenation_dir.mkdir(parents=True, exist_ok=True)
+            return copy_file_fast(opened_file, destenation_dir / name)
+
+    def put(
+        self, key: str, path_to_result: str | Path, source: str | Path | None = None,
+    ) -> Path | None:
+        """Save copy of converted file of `source` to cache and return path to the entry.
+
+        Entry of the same key which was saved by other process is kept.
+        None is returned if entry can not be saved.
+        """
+        source_path = Path(path_to_result)
+        entry_dir = self.cache_dir / key
+
+        # prepare entry in temporary dir to not show partial files to other threads
+        tmp_dir = self.cache_dir / f".{key}.{uuid.uuid4().hex}"
+        try:
+            tmp_dir.mkdir()
+            copy_file_fast(source_path, tmp_dir / source_path.name)
+            if source is not None:
+                (tmp_dir / SOURCE_FILE_NAME).write_text(Path(source).name)
+            entry_size = (tmp_dir / source_path.name).stat().st_size
+
+            with self._lock:
+                if key in self._entries:
+                    self._remove_entry(key)
+                try:
+                    tmp_dir.rename(entry_dir)
+                except OSError:
+                    if not entry_dir.is_dir():
+                        raise
+                    return self._add_existing_entry(key)
+                self._add_entry(key, entry_size)
+        except OSError:
+            return None
+        finally:
+            # temporary dir is left if entry was not saved
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        return entry_dir / source_path.name
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._remove_entry(key)
+
+    def _get_entry_file(self, key: str) -> Path | None:
+        entry_dir = self.cache_dir / key
+        files = [path for path in entry_dir.iterdir() if path.name != SOURCE_FILE_NAME]
+        return files[0] if files else None
+
+    def _get_entry_name(self, key: str, cached_file: Path, source: str | Path | None) -> str:
+        """Return name of cached result for source, entries without source are not renamed."""
+        source_file = self.cache_dir / key / SOURCE_FILE_NAME
+        if source is None or not source_file.is_file():
+            return cached_file.name
+        return get_result_name(cached_file.name, source_file.read_text(), Path(source).name)
+
+    def _add_entry(self, key: str, entry_size: int) -> None:
+        self._entries[key] = entry_size
+        self._size += entry_size
+        self._evict()
+
+    def _add_existing_entry(self, key: str) -> Path | None:
+        """Add entry which was saved to cache dir by other process."""
+        cached_file = self._get_entry_file(key)
+        if cached_file is not None:
+            self._add_entry(key, cached_file.stat().st_size)
+        return cached_file
+
+    def _remove_entry(self, key: str) -> None:
+        self._size -= self._entries.pop(key, 0)
+        shutil.rmtree(self.cache_dir / key, ignore_errors=True)
+
+    def _evict(self) -> None:
+        """Remove the least recently used entries while cache is bigger than the budget."""
+        while self._size > self.max_size and self._entries:
+            key = next(iter(self._entries))
+            self._remove_entry(key)
+
+    def _load_entries(self) -> None:
+        """Restore entries from cache dir ordered by the last usage."""
+        entries = []
+        for entry_dir in self.cache_dir.iterdir():
+            if not entry_dir.is_dir():
+                continue
+            if entry_dir.name.startswith("."):
+                # remove entries which were not completed
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+
+            files = [
+                path for path in entry_dir.iterdir()
+                if path.is_file() and path.name != SOURCE_FILE_NAME
+            ]
+            if not files:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                continue
+
+            stat = files[0].stat()
+            entries.append((stat.st_mtime, entry_dir.name, stat.st_size))
+
+        for _, key, entry_size in sorted(entries):
+            self._entries[key] = entry_size
+            self._size += entry_size
+        self._evict()
@@ -20,6 +20,8 @@ class JobConfig:
     target: Target
     path_to_file: str
     path_to_save: str = "books"
+    # sha256 of the file content, it is set when job key is computed
+    file_hash: str | None = field(default=None, compare=False)
 
     @property
     def job_target(self):
@@ -41,6 +43,33 @@ class JobConfig:
         }
 
 
+@dataclass
+class HTTPConfig:
+    """Settings of shared HTTP connections pool and retries of failed requests."""
+
+    pool_connections: int = 10
+    pool_size: int = 10
+    keep_alive: bool = True
+    retries: int = 3
+    backoff_factor: float = 0.5
+    retry_statuses: tuple[int, ...] = (500, 502, 503, 504)
+    # do not repeat not idempotent requests after server errors
+    retry_methods: tuple[str, ...] = ("GET", "HEAD")
+    timeout: float = 30
+
+
+@dataclass
+class PollingConfig:
+    """Intervals between job status requests: start with fast polls and back off."""
+
+    initial: float = 0.25
+    maximum: float = 3
+    factor: float = 1.5
+    jitter: float = 0.1
+    # the longest wait which server can ask by Retry-After header
+    retry_after_maximum: float = 60
+
+
 class APIConfig:
     def __init__(self, token: str | None = None, url: str | None = None):
         self.token = token or os.environ.get("API_KEY")
@@ -1,14 +1,29 @@
 from __future__ import annotations
 
+import inspect
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from contextlib import AbstractContextManager
 from functools import partial
 from pathlib import Path, PosixPath
 from typing import Any, Union, TYPE_CHECKING
 
+from cache import ResultCache, hash_file
 from config import JobConfig as Config
+from instrumentation import (
+    CONVERT_STAGE,
+    Instrumentation,
+    instrumentation as default_instrumentation,
+)
 
+from job_store import JobStore, StoredJob, get_processor_name
 from interfaces.ui_interface import UIProtocol
 from interfaces.processor_interface import JobProcessor
 from interfaces.worker_interface import Worker
+from progress import DEFAULT_PROGRESS_INTERVAL, ProgressTracker, parse_progress
+from single_flight import Flight, SingleFlight
+from utils import copy_file_fast, get_result_name
 
 if TYPE_CHECKING:
     from collections.abc import Callable
@@ -18,6 +33,60 @@ class ConvertError(Exception):
     """The special type of the converter error"""
 
 
+def accepts_upload_progress(send_job: Callable) -> bool:
+    """Return True if processor reports upload progress to callback of the job."""
+    try:
+        return "upload_progress" in inspect.signature(send_job).parameters
+    except (TypeError, ValueError):
+        return False
+
+
+@dataclass
+class JobResult:
+    """Result of one job from the batch processing."""
+
+    config: Config
+    result: Union[str, Path, PosixPath, None] = None
+    error: Exception | None = None
+    elapsed: float = 0.0
+
+    @property
+    def is_failed(self) -> bool:
+        return self.error is not None
+
+
+@dataclass
+class BatchReport:
+    """Results of all batch jobs in the same order as configs were sent."""
+
+    jobs: list[JobResult] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def total(self) -> int:
+        return len(self.jobs)
+
+    @property
+    def failures(self) -> list[JobResult]:
+        return [job for job in self.jobs if job.is_failed]
+
+    @property
+    def completed(self) -> int:
+        return self.total - len(self.failures)
+
+    @property
+    def books_per_minute(self) -> float:
+        if not self.elapsed:
+            return 0.0
+        return self.completed * 60 / self.elapsed
+
+    def summary(self) -> str:
+        return (
+            f"Converted {self.completed} of {self.total} books "
+            f"in {self.elapsed:.1f}s ({self.books_per_minute:.1f} books/min), "
+            f"failures: {len(self.failures)}"
+        )
+
 
 # TODO: maybe make save the result private and return as result the bytes instead of link to file
 # because each processor can have different type of result link. Example:
@@ -34,6 +103,22 @@ class Converter:
     For converting uses different kind of processor class.
 
     Worker class is used for concurrency processing.
+
+    Cache (optional) is used to reuse results of the same files converted before
+    without sending them to processor.
+
+    Progress lines of processor output are sent to UI as progress events
+    not more often than once per `progress_interval` seconds.
+
+    Job store (optional) keeps config, processor job ID and status of each job,
+    so jobs which were not finished before restart can be continued by `resume_jobs`.
+
+    Stages of each job (validate, cache, send, process, save) are measured by
+    instrumentation hooks with processor and format pair as labels.
+
+    Single flight (optional, shared by converters) sends identical jobs (the same
+    file content and options) in progress to processor only once. Other callers get
+    the same status stream and copy of the result to their `path_to_save`.
     """
 
     def __init__(
@@ -41,10 +126,20 @@ class Converter:
         interface: UIProtocol,
         processor: JobProcessor,
         worker: Worker | None = None,
+        cache: ResultCache | None = None,
+        progress_interval: float = DEFAULT_PROGRESS_INTERVAL,
+        job_store: JobStore | None = None,
+        instrumentation: Instrumentation | None = None,
+        single_flight: SingleFlight | None = None,
     ) -> None:
         self.interface = interface
         self.processor = processor
         self.worker = worker
+        self.cache = cache
+        self.progress_interval = progress_interval
+        self.job_store = job_store
+        self.instrumentation = instrumentation or default_instrumentation
+        self.single_flight = single_flight
         self.config: Any[None, Config] = None
 
     def get_status(self) -> str:
@@ -57,10 +152,88 @@ class Converter:
 
         executor = self.set_converter_executor()
         try:
-            executor()
+            executor(config)
         except Exception as ex:
             self.error_handler(ex)
 
+    def convert_many(
+        self,
+        configs: list[Config],
+        max_parallel: int = 4,
+        on_done: Callable[[JobResult], None] | None = None,
+    ) -> BatchReport:
+        """Run processing of many jobs at once and return report with result of each job.
+
+        Each job gets its own config, so one converter can be used for all of them.
+        Not more than `max_parallel` jobs are processed at the same time.
+        `on_done` is called with result of each job as soon as it is finished.
+        """
+        return self._run_batch(self.convert_job, configs, max_parallel, on_done)
+
+    def convert_job(self, config: Config, store_id: str | None = None) -> JobResult:
+        """Run processing of one job in current thread and return its result or error.
+
+        `store_id` is ID of the job which was saved to job store before.
+        """
+        return self._run_job(config, self._convert, config, store_id)
+
+    def resume_jobs(self, max_parallel: int = 4) -> BatchReport:
+        """Continue jobs of the processor which were not finished before restart.
+
+        Jobs which were sent to processor are attached to it again instead of
+        being sent again, jobs which were not sent are processed from the start.
+        """
+        if self.job_store is None:
+            msg = "Job store was not set"
+            raise ConvertError(msg)
+
+        stored_jobs = self.job_store.get_unfinished(get_processor_name(self.processor))
+        return self._run_batch(self.resume_job, stored_jobs, max_parallel)
+
+    def resume_job(self, stored: StoredJob) -> JobResult:
+        """Continue one job from job store in current thread and return its result or error."""
+        return self._run_job(stored.config, self._resume, stored)
+
+    def _run_batch(
+        self,
+        func: Callable,
+        items: list,
+        max_parallel: int,
+        on_done: Callable[[JobResult], None] | None = None,
+    ) -> BatchReport:
+        if max_parallel < 1:
+            msg = "max_parallel should be positive number"
+            raise ConvertError(msg)
+
+        def run(item: Any) -> JobResult:
+            job = func(item)
+            if on_done is not None:
+                try:
+                    on_done(job)
+                except Exception as ex:
+                    self.error_handler(ex)
+            return job
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            jobs = list(executor.map(run, items))
+        self._wait_for_saving(jobs)
+
+        report = BatchReport(jobs=jobs, elapsed=time.monotonic() - started)
+        self.interface.display_common_info(report.summary())
+        return report
+
+    def _run_job(self, config: Config, func: Callable, *args: Any) -> JobResult:
+        started = time.monotonic()
+        job = JobResult(config=config)
+        try:
+            job.result = func(*args)
+        except Exception as ex:
+            job.error = ex
+            self.error_handler(ex)
+        job.elapsed = time.monotonic() - started
+        return job
+
     def set_config(self, config: Config) -> None:
         """Set converter configuration."""
         self.config = config
@@ -73,23 +246,211 @@ class Converter:
             self.worker.set_error_handler(self.error_handler)
         return executor
 
-    def _convert(self) -> None:
+    def _wait_for_saving(self, jobs: list[JobResult]) -> None:
+        """Wait for results which processor saves in background and set their errors to jobs."""
+        wait_for_moves = getattr(self.processor, "wait_for_moves", None)
+        if wait_for_moves is None:
+            return
+
+        errors = wait_for_moves()
+        for job in jobs:
+            error = errors.get(job.result) if job.result is not None else None
+            if error is not None:
+                job.error = error
+                self.error_handler(error)
+
+    def _convert(
+        self, config: Config | None = None, store_id: str | None = None,
+    ) -> Union[str, Path, PosixPath, None]:
+        config = self._get_config(config)
+
         # validate config
-        self.validate_config()
+        with self.measure("validate", config):
+            self.validate_config(config)
+
+        if self.job_store is None:
+            return self._process(config)
+
+        if store_id is None:
+            store_id = self.job_store.create(config, get_processor_name(self.processor))
+        return self._track(store_id, self._process, config, store_id)
+
+    def _resume(self, stored: StoredJob) -> Union[str, Path, PosixPath, None]:
+        if stored.external_id is None:
+            # job was not sent to processor before restart
+            return self._convert(stored.config, stored.id)
+        return self._track(stored.id, self._attach, stored)
+
+    def _attach(self, stored: StoredJob) -> Union[str, Path, PosixPath, None]:
+        """Attach to the job which was sent to processor before restart and finish it."""
+        job_id = stored.external_id
+        if not self.processor.attach_job(job_id, stored.state):
+            msg = f"Job {job_id} was lost on restart"
+            raise ConvertError(msg)
+
+        self.interface.display_common_info(f"Job ID: {job_id} (attached after restart)")
+        return self._finish(job_id, stored.config)
+
+    def _track(
+        self, store_id: str, func: Callable, *args: Any,
+    ) -> Union[str, Path, PosixPath, None]:
+        """Run processing of the stored job and save its final status to job store."""
+        try:
+            result = func(*args)
+        except Exception as ex:
+            self.job_store.set_status(store_id, "error", error=str(ex))
+            raise
+        self.job_store.set_status(store_id, "completed", result=result)
+        return result
+
+    def _process(
+        self, config: Config, store_id: str | None = None,
+    ) -> Union[str, Path, PosixPath, None]:
+        # use result of the same job from cache without processing
+        with self.measure("cache", config):
+            cache_key = self.get_cache_key(config)
+            cached_path = None
+            if cache_key is not None:
+                cached_path = self.cache.get(cache_key, config.path_to_save, config.path_to_file)
+
+        if cached_path is not None:
+            self.interface.display_common_info("Result was found in cache")
+            self.display_result(cached_path)
+            return cached_path
+
+        flight_key = self.get_flight_key(config, cache_key)
+        if flight_key is None:
+            return self._send(config, store_id, cache_key)
+
+        # identical jobs in progress are processed once
+        flight, is_leader = self.single_flight.join(flight_key)
+        if not is_leader:
+            return self._follow(flight, config)
+        flight.source = config.path_to_file
 
+        try:
+            path = self._send(config, store_id, cache_key, flight)
+        except Exception as ex:
+            self.single_flight.finish(flight, error=ex)
+            raise
+        self.single_flight.finish(flight, result=path)
+        return path
+
+    def _send(
+        self,
+        config: Config,
+        store_id: str | None = None,
+        cache_key: str | None = None,
+        flight: Flight | None = None,
+    ) -> Union[str, Path, PosixPath, None]:
         # send file to processor
-        job_id = self.send_job()
+        with self.measure("send", config):
+            job_id = self.send_job(config)
+        if store_id is not None:
+            self.job_store.set_sent(store_id, job_id, self.processor.get_job_state(job_id))
+        if flight is not None:
+            flight.publish("display_job_status", "start")
 
+        return self._finish(job_id, config, cache_key, flight)
+
+    def _finish(
+        self,
+        job_id: int,
+        config: Config,
+        cache_key: str | None = None,
+        flight: Flight | None = None,
+    ) -> Union[str, Path, PosixPath, None]:
         # check processing result and get it path
-        result = self.get_result(job_id)
+        with self.measure("process", config):
+            result = self.get_result(job_id, flight)
 
         # save result file
-        if result:
-            self.save(result, self.config.path_to_save)
+        if not result:
+            return None
+
+        with self.measure("save", config):
+            path = self.save(result, config.path_to_save)
+            if cache_key is not None:
+                self.cache_result(cache_key, path, config.path_to_file)
+            elif flight is not None:
+                # followers copy the result, so it should be saved
+                self.wait_for_result(path)
+        return path
 
-    def validate_config(self) -> None:
+    def _follow(self, flight: Flight, config: Config) -> Union[str, Path, PosixPath, None]:
+        """Show status stream of the identical job in progress and copy its result."""
+        self.interface.display_common_info("The same job is in progress, waiting for its result")
+        with self.measure("process", config):
+            for method, args, kwargs in flight.subscribe():
+                getattr(self.interface, method)(*args, **kwargs)
+            try:
+                result = flight.result.result()
+            except Exception as err:
+                msg = f"The same job failed: {err}"
+                raise ConvertError(msg) from err
+
+        if result is None:
+            return None
+
+        with self.measure("save", config):
+            # result is named by the source of follower as processor named it for leader
+            name = get_result_name(
+                Path(result).name, Path(flight.source).name, Path(config.path_to_file).name)
+            path = self.copy_result(result, config.path_to_save, name)
+        self.display_result(path)
+        return path
+
+    @staticmethod
+    def copy_result(
+        path: Union[str, Path, PosixPath],
+        path_to_save: Union[str, Path],
+        name: str | None = None,
+    ) -> Union[str, Path, PosixPath]:
+        """Copy result of other job to `path_to_save` dir as `name` (name of result by default)."""
+        source = Path(path)
+        destination = Path(path_to_save) / (name or source.name)
+        if destination.resolve() == source.resolve():
+            return path
+
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        return copy_file_fast(source, destination)
+
+    def measure(self, stage: str, config: Config | None = None) -> AbstractContextManager:
+        """Return context manager which measures stage of the job."""
+        return self.instrumentation.measure(CONVERT_STAGE, stage=stage, **self.get_labels(config))
+
+    def get_labels(self, config: Config | None = None) -> dict:
+        """Return processor and format pair of the job to label its metrics."""
+        path_to_file = str(getattr(config, "path_to_file", None) or "")
+        return {
+            "processor": get_processor_name(self.processor),
+            "source": Path(path_to_file).suffix.lstrip(".").lower(),
+            "target": str(getattr(config, "job_target", None) or ""),
+        }
+
+    def cache_result(
+        self, cache_key: str, path: Union[str, Path, PosixPath], source: str | None = None,
+    ) -> None:
+        """Put saved result of source to cache, wait for it if processor saves it in background."""
+        self.wait_for_result(path)
+        self.cache.put(cache_key, path, source)
+
+    def wait_for_result(self, path: Union[str, Path, PosixPath]) -> None:
+        """Wait for result if processor saves results in background, raise error of saving."""
+        wait_for_moves = getattr(self.processor, "wait_for_moves", None)
+        if wait_for_moves is not None:
+            error = wait_for_moves(path).get(path)
+            if error is not None:
+                raise error
+
+    def _get_config(self, config: Config | None = None) -> Config:
+        """Return config of current job or converter`s config if it was not sent."""
+        return config if config is not None else self.config
+
+    def validate_config(self, config: Config | None = None) -> None:
         """Run different type of covert validation. Raise ConvertError in case of issues."""
-        if not self.config or not self.config.get_config():
+        config = self._get_config(config)
+        if not config or not config.get_config():
             error_msg = "Converter`s config was not set"
             raise ConvertError(error_msg)
 
@@ -101,24 +462,54 @@ class Converter:
             raise ConvertError(msg)
         return True
 
-    def get_file_path(self) -> str:
+    def get_cache_key(self, config: Config | None = None) -> str | None:
+        """Return key of the job in cache or None if cache is not used."""
+        if self.cache is None:
+            return None
+
+        return self.cache.make_key(
+            self.get_file_path(config), self.get_job_options(config), self.get_file_hash(config))
+
+    def get_flight_key(self, config: Config, cache_key: str | None = None) -> str | None:
+        """Return key of identical jobs (as key in cache) or None if they are not coalesced."""
+        if self.single_flight is None:
+            return None
+        if cache_key is not None:
+            return cache_key
+
+        return ResultCache.make_key(
+            self.get_file_path(config), self.get_job_options(config), self.get_file_hash(config))
+
+    def get_file_hash(self, config: Config | None = None) -> str:
+        """Return hash of the file content, it is computed once and saved to config."""
+        config = self._get_config(config)
+        if config.file_hash is None:
+            self.validate_path(config.path_to_file)
+            config.file_hash = hash_file(config.path_to_file)
+        return config.file_hash
+
+    def get_file_path(self, config: Config | None = None) -> str:
         """Return string path to target (file need to be converted)."""
-        return self.config.path_to_file
+        return self._get_config(config).path_to_file
 
     # TODO: implement functionality to add different converter formats
-    def get_job_options(self) -> dict:
+    def get_job_options(self, config: Config | None = None) -> dict:
         """Return the structure with main convert params."""
-        return self.config.get_config()
+        return self._get_config(config).get_config()
 
-    def send_job(self) -> int:
+    def send_job(self, config: Config | None = None) -> int:
         """send job data to processor. Return job ID"""
         # setup converter options
-        path_to_file = self.get_file_path()
+        path_to_file = self.get_file_path(config)
         self.validate_path(path_to_file)
-        options = self.get_job_options()
+        options = self.get_job_options(config)
 
-        # send main data to processing
-        job_id = self.processor.send_job(path_to_file, options)
+        # send main data to processing, some processors (remote) report progress
+        # of file uploading to callback of the job (processor is shared by converters)
+        kwargs = {}
+        if accepts_upload_progress(self.processor.send_job):
+            kwargs["upload_progress"] = self.display_upload_progress
+        job_id = self.processor.send_job(path_to_file, options, **kwargs)
 
         # show job ID on interface
         self.interface.display_common_info(f"Job ID: {job_id}")
@@ -128,21 +519,43 @@ class Converter:
 
         return job_id
 
-    def get_result(self, job_id: int) -> str:
-        """get job result from processor. Return path to converted file"""
+    def get_result(self, job_id: int, flight: Flight | None = None) -> str:
+        """get job result from processor. Return path to converted file
+
+        Status stream is published to followers of the flight.
+        """
         self.processor.set_status("processing")
 
         # check processing results as status to show info in user interface
         # NOTE: need to implement processing as generator to stream processor status
         processor_info = self.processor.get_job_status(job_id)
+        tracker = ProgressTracker(self.progress_interval)
         for status, message in processor_info:
-            self.interface.display_common_info(message, status=status)
+            progress = parse_progress(message) if isinstance(message, str) else None
+            if progress is None:
+                self._display(flight, "display_common_info", message, status=status)
+                continue
+
+            progress = tracker.update(progress)
+            if progress is not None:
+                self._display(flight, "display_progress", progress)
 
         # after end of processing data return the result as bytes data or Path to save file
         # NOTE: need to check different types of results
         #       (some processors returns path to save, other bytes)
         return self.processor.get_job_result(job_id)
 
+    def _display(self, flight: Flight | None, method: str, *args: Any, **kwargs: Any) -> None:
+        getattr(self.interface, method)(*args, **kwargs)
+        if flight is not None:
+            flight.publish(method, *args, **kwargs)
+
+    def display_upload_progress(self, sent: int, total: int) -> None:
+        """Show progress of file uploading to processor on user interface."""
+        percent = sent * 100 // total if total else 100
+        message = f"Uploaded {sent / 1024**2:.1f} of {total / 1024**2:.1f} MB ({percent}%)"
+        self.interface.display_common_info(message, status="uploading")
+
     def error_handler(self, error: Exception) -> None:
         """Send error from converter to user interface."""
         self.interface.display_error(f"Converter got an error: {error}")
@@ -150,6 +563,10 @@ class Converter:
     # TODO: implement saver class to replace logic of saving results with different sources
     def save(self, file_path: str, path_to_save: Union[Path, str]) -> Union[str, Path, PosixPath]:
         path = self.processor.save_file(file_path, path_to_save)
+        self.display_result(path)
+        return path
+
+    def display_result(self, path: Union[str, Path, PosixPath]) -> None:
+        """Show saved result of processing on user interface."""
         self.interface.display_job_result(path)
         self.interface.display_job_status("completed")
-        return path
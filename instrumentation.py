@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import bisect
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from workers.observer import Signal
+
+# seconds, from fast calls of processor to long conversions
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# names of measured operations
+CONVERT_STAGE = "convert_stage"
+PROCESSOR_CALL = "processor_call"
+
+Labels = tuple[tuple[str, str], ...]
+
+
+def make_labels(labels: dict) -> Labels:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        (key, value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for key, value in labels
+    )
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+class Instrumentation:
+    """Hooks around stages of converter and calls of processors.
+
+    Each measured operation emits `finished` signal with name, duration in seconds,
+    labels and error (or None), so any collector can be connected to it.
+    """
+
+    def __init__(self) -> None:
+        self.finished = Signal()
+
+    @contextmanager
+    def measure(self, name: str, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as ex:
+            self.record(name, time.perf_counter() - started, ex, **labels)
+            raise
+        self.record(name, time.perf_counter() - started, **labels)
+
+    def record(
+        self, name: str, duration: float, error: BaseException | None = None, **labels: str,
+    ) -> None:
+        """Emit already measured operation."""
+        if self.finished.handlers:
+            self.finished.emit(name, duration, labels, error)
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    counts: list[int] = field(default_factory=list)
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * len(self.buckets)
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Return counts of buckets as Prometheus does (each includes previous ones)."""
+        result, total = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((f"{bound:g}", total))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class Metrics:
+    """Counters and latency histograms of measured operations.
+
+    For each operation `<name>_duration_seconds` histogram and
+    `<name>_errors_total` counter are collected by labels.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._counters: dict[str, dict[Labels, float]] = {}
+        self._histograms: dict[str, dict[Labels, Histogram]] = {}
+
+    def connect(self, instrumentation: Instrumentation) -> None:
+        instrumentation.finished.connect(self.on_finished)
+
+    def on_finished(
+        self, name: str, duration: float, labels: dict, error: BaseException | None,
+    ) -> None:
+        self.observe(f"{name}_duration_seconds", duration, **labels)
+        if error is not None:
+            self.inc(f"{name}_errors_total", **labels)
+
+    def inc(self, name: str, value: float = 1, **labels: str) -> None:
+        key = make_labels(labels)
+        with self._lock:
+            counters = self._counters.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = make_labels(labels)
+        with self._lock:
+            histograms = self._histograms.setdefault(name, {})
+            histogram = histograms.get(key)
+            if histogram is None:
+                histogram = histograms[key] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def to_prometheus(self) -> str:
+        """Return metrics in Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, counters in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for labels, value in sorted(counters.items()):
+                    lines.append(f"{name}{format_labels(labels)} {value:g}")
+
+            for name, histograms in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for labels, histogram in sorted(histograms.items()):
+                    for bound, count in histogram.cumulative():
+                        bucket_labels = format_labels((*labels, ("le", bound)))
+                        lines.append(f"{name}_bucket{bucket_labels} {count}")
+                    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum:g}")
+                    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def to_dict(self) -> dict:
+        """Return counters and histograms (count, sum, mean) as JSON-like dict."""
+        with self._lock:
+            counters = {
+                name: [{"labels": dict(labels), "value": value} for labels, value in values.items()]
+                for name, values in self._counters.items()
+            }
+            histograms = {
+                name: [
+                    {
+                        "labels": dict(labels),
+                        "count": histogram.count,
+                        "sum": histogram.sum,
+                        "mean": histogram.sum / histogram.count if histogram.count else 0.0,
+                    }
+                    for labels, histogram in values.items()
+                ]
+                for name, values in self._histograms.items()
+            }
+        return {"counters": counters, "histograms": histograms}
+
+    def dump(self, path: str | None = None, fmt: str = "prometheus") -> str:
+        """Return metrics as text (prometheus or json) and save it to file if path is set."""
+        text = json.dumps(self.to_dict(), indent=2) if fmt == "json" else self.to_prometheus()
+        if path is not None:
+            with open(path, "w") as opened_file:
+                opened_file.write(text)
+        return text
+
+
+# instrumentation which is used by converter and processors by default
+instrumentation = Instrumentation()
+metrics = Metrics()
+metrics.connect(instrumentation)
@@ -22,6 +22,12 @@ class JobProcessor(Protocol):
     def send_job(self, filename: str, options: None | dict = None) -> int:
         """Method to send data to processing"""
 
+    def get_job_state(self, job_id: int) -> dict:
+        """return data which is needed to attach to the job after restart"""
+
+    def attach_job(self, job_id: int, state: dict) -> bool:
+        """attach to the job which was sent before restart, return False if it is lost"""
+
     def get_job_status(self, job_id: int) -> Generator:
         """return job status by job ID"""
 
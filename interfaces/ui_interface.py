@@ -7,6 +7,7 @@ from config import JobConfig as Config
 if TYPE_CHECKING:
     from pathlib import Path
     from converter import Converter
+    from progress import ProgressEvent
 
 
 class UIProtocol(Protocol):
@@ -38,6 +39,10 @@ class UIProtocol(Protocol):
         """Show common info on the UI."""
         raise NotImplementedError
 
+    def display_progress(self, progress: ProgressEvent) -> None:
+        """Show percent, stage and ETA of processing on the UI."""
+        raise NotImplementedError
+
     def display_error(self, error: str) -> None:
         """Show error messages on the UI."""
         raise NotImplementedError
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from concurrent.futures import Future
 from typing import Callable, Protocol, Any
 
 
@@ -12,7 +13,8 @@ class Worker(Protocol):
     def get_result(self) -> Any:
         raise NotImplementedError
 
-    def execute(self, func: Callable, *args, **kwargs) -> None:
+    def execute(self, func: Callable, *args, **kwargs) -> Future | None:
+        """Run func, pooled workers return future of the call."""
         raise NotImplementedError
 
     def set_error_handler(self, handler: Callable) -> None:
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from config import JobConfig, Target
+
+DEFAULT_DB_PATH = Path("~/.cache/convert/jobs.db").expanduser()
+
+# statuses of jobs which were not finished
+UNFINISHED_STATUSES = ("queued", "running")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    config TEXT NOT NULL,
+    processor TEXT NOT NULL,
+    external_id TEXT,
+    state TEXT NOT NULL DEFAULT '{}',
+    status TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, processor);
+"""
+
+
+def get_processor_name(processor: Any) -> str:
+    """Return name of processor which is saved with jobs to continue them by the same processor."""
+    return type(processor).__name__
+
+
+def dump_config(config: JobConfig) -> str:
+    return json.dumps(asdict(config))
+
+
+def load_config(data: str) -> JobConfig:
+    config = json.loads(data)
+    return JobConfig(
+        Target(**config["target"]),
+        config["path_to_file"],
+        config["path_to_save"],
+    )
+
+
+@dataclass
+class StoredJob:
+    id: str
+    config: JobConfig
+    processor: str
+    status: str
+    external_id: str | None = None
+    state: dict = field(default_factory=dict)
+    result: str | None = None
+    error: str | None = None
+    created: float = 0.0
+    updated: float = 0.0
+
+
+class JobStore:
+    """Durable store of jobs in SQLite database (WAL mode).
+
+    Keeps config, processor, external job ID and status of each job
+    to continue processing of unfinished jobs after restart.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_DB_PATH) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+
+    def create(self, config: JobConfig, processor: str, job_id: str | None = None) -> str:
+        """Save new job and return its ID."""
+        job_id = job_id or uuid.uuid4().hex
+        now = time.time()
+        self._execute(
+            "INSERT INTO jobs (id, config, processor, status, created, updated) "
+            "VALUES (?, ?, ?, 'queued', ?, ?)",
+            (job_id, dump_config(config), processor, now, now),
+        )
+        return job_id
+
+    def set_sent(self, job_id: str, external_id: str | int, state: dict | None = None) -> None:
+        """Save ID of the job in processor and data to attach to it after restart."""
+        self._execute(
+            "UPDATE jobs SET external_id = ?, state = ?, status = 'running', updated = ? "
+            "WHERE id = ?",
+            (str(external_id), json.dumps(state or {}), time.time(), job_id),
+        )
+
+    def set_status(
+        self,
+        job_id: str,
+        status: str,
+        result: str | Path | None = None,
+        error: str | None = None,
+    ) -> None:
+        self._execute(
+            "UPDATE jobs SET status = ?, result = COALESCE(?, result), error = ?, updated = ? "
+            "WHERE id = ?",
+            (status, str(result) if result is not None else None, error, time.time(), job_id),
+        )
+
+    def get(self, job_id: str) -> StoredJob | None:
+        rows = self._select("SELECT * FROM jobs WHERE id = ?", (job_id,))
+        return rows[0] if rows else None
+
+    def get_unfinished(self, processor: str | None = None) -> list[StoredJob]:
+        """Return queued and running jobs (of the processor) in order of creation."""
+        placeholders = ",".join("?" * len(UNFINISHED_STATUSES))
+        query = f"SELECT * FROM jobs WHERE status IN ({placeholders})"
+        params: tuple = UNFINISHED_STATUSES
+        if processor is not None:
+            query += " AND processor = ?"
+            params = (*params, processor)
+        return self._select(query + " ORDER BY created", params)
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def _execute(self, query: str, params: tuple) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(query, params)
+
+    def _select(self, query: str, params: tuple) -> list[StoredJob]:
+        with self._lock:
+            rows = self._connection.execute(query, params).fetchall()
+        return [
+            StoredJob(
+                id=row["id"],
+                config=load_config(row["config"]),
+                processor=row["processor"],
+                status=row["status"],
+                external_id=row["external_id"],
+                state=json.loads(row["state"]),
+                result=row["result"],
+                error=row["error"],
+                created=row["created"],
+                updated=row["updated"],
+            )
+            for row in rows
+        ]
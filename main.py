@@ -1,15 +1,11 @@
+import argparse
 import logging
+import os
+import sys
 
+from cache import ResultCache
 from converter import Converter
-
-from processors.remote_processor import JobProcessorRemote
-from processors.local_processor import LocalProcessor
-from processors.processor_on_docker import ProcessorOnDocker
-
-from uis.cli_ui import ConverterInterfaceCLI
-from uis.tk_ui import ConverterInterfaceTk
-
-from workers.worker import ThreadWorker
+from registry import processors, uis, workers
 
 logger = logging.getLogger(__name__)
 
@@ -22,13 +18,41 @@ except ImportError as err:
 
 load_dotenv()
 
+# plugins are imported only when they are selected,
+# so CLI with local processor does not import tkinter or docker
+DEFAULT_UI = "tk"
+DEFAULT_PROCESSOR = "docker"
+DEFAULT_WORKER = "thread"
+NO_WORKER = "none"
+
+
+def parse_args(argv: list[str]) -> tuple[argparse.Namespace, list[str]]:
+    """Return app options and other arguments which are left for UI."""
+    parser = argparse.ArgumentParser(add_help=False, allow_abbrev=False)
+    parser.add_argument(
+        "--ui", default=os.environ.get("CONVERTER_UI", DEFAULT_UI),
+        help=f"one of: {', '.join(uis.names())}")
+    parser.add_argument(
+        "--processor", default=os.environ.get("CONVERTER_PROCESSOR", DEFAULT_PROCESSOR),
+        help=f"one of: {', '.join(processors.names())}")
+    parser.add_argument(
+        "--worker", default=os.environ.get("CONVERTER_WORKER", DEFAULT_WORKER),
+        help=f"one of: {', '.join([*workers.names(), NO_WORKER])}")
+    parser.add_argument("--no-cache", action="store_true", help="do not use cache of results")
+    return parser.parse_known_args(argv)
+
 
 def main() -> None:
-    interface = ConverterInterfaceTk()
-    worker = ThreadWorker()
-    processor = ProcessorOnDocker()
+    options, ui_args = parse_args(sys.argv[1:])
+    # UI parses its own params from command line
+    sys.argv = [sys.argv[0], *ui_args]
+
+    interface = uis.create(options.ui)
+    worker = workers.create(options.worker) if options.worker != NO_WORKER else None
+    processor = processors.create(options.processor)
+    cache = None if options.no_cache else ResultCache()
 
-    converter = Converter(interface, processor, worker)
+    converter = Converter(interface, processor, worker, cache)
     interface.run(converter)
 
 
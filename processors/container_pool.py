@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import queue
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any
+
+from processors import ProcessorError
+
+CONTAINER_WORKDIR = "/mnt/books"
+CONTAINER_COMMAND = ["sleep", "infinity"]
+
+
+class ContainerPool:
+    """Pool of long-lived containers which take jobs via `exec`.
+
+    All containers mount the same host `workspace` dir, so jobs have to put
+    their files to the workspace before processing.
+    Containers are checked before each job and recreated after `max_jobs` jobs.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        image: str,
+        size: int = 2,
+        max_jobs: int = 50,
+        workspace: str | Path | None = None,
+    ) -> None:
+        if size < 1:
+            msg = "Size of container pool should be positive number"
+            raise ProcessorError(msg)
+
+        self.client = client
+        self.image = image
+        self.size = size
+        self.max_jobs = max_jobs
+        self.workspace = Path(workspace or tempfile.mkdtemp(prefix=f"{image}_")).resolve()
+        self.workspace.mkdir(parents=True, exist_ok=True)
+
+        self._idle: queue.Queue = queue.Queue()
+        self._jobs_count: dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def acquire(self, timeout: float | None = None) -> Any:
+        """Return healthy container to run one job. Wait for free one if pool is full."""
+        while True:
+            container = self._get_idle_or_create(timeout)
+            if self.is_healthy(container):
+                with self._lock:
+                    self._jobs_count[container.id] += 1
+                return container
+            self._discard(container)
+
+    def release(self, container: Any) -> None:
+        """Return container to pool after the job or recycle it."""
+        if self._closed or self._jobs_count.get(container.id, 0) >= self.max_jobs:
+            self._discard(container)
+            return
+        self._idle.put(container)
+
+    @staticmethod
+    def is_healthy(container: Any) -> bool:
+        try:
+            container.reload()
+        except Exception:
+            return False
+        return container.status == "running"
+
+    def close(self) -> None:
+        """Remove all idle containers. Busy ones are removed after release."""
+        self._closed = True
+        while True:
+            try:
+                container = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(container)
+
+    def get_job_dir(self, job_id: str) -> tuple[Path, str]:
+        """Return paths of job dir on host and inside container."""
+        return self.workspace / job_id, f"{CONTAINER_WORKDIR}/{job_id}"
+
+    def _get_idle_or_create(self, timeout: float | None) -> Any:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_create = len(self._jobs_count) < self.size
+            if can_create:
+                # reserve place in pool before long creation of container
+                reserved_id = object()
+                self._jobs_count[reserved_id] = 0
+
+        if not can_create:
+            try:
+                return self._idle.get(timeout=timeout)
+            except queue.Empty as err:
+                msg = "There is not free container in pool"
+                raise ProcessorError(msg) from err
+
+        container = None
+        try:
+            container = self._create()
+        finally:
+            with self._lock:
+                del self._jobs_count[reserved_id]
+                if container is not None:
+                    self._jobs_count[container.id] = 0
+        return container
+
+    def _create(self) -> Any:
+        return self.client.containers.run(
+            image=self.image,
+            volumes=[f"{self.workspace}:{CONTAINER_WORKDIR}"],
+            command=CONTAINER_COMMAND,
+            detach=True,
+        )
+
+    def _discard(self, container: Any) -> None:
+        with self._lock:
+            self._jobs_count.pop(container.id, None)
+        try:
+            container.remove(force=True)
+        except Exception as ex:
+            print(f"Container {container.id} was not removed: {ex}")
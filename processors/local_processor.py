@@ -1,22 +1,89 @@
 from __future__ import annotations
 
+import itertools
 import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path, PosixPath
 from typing import Generator, Union
 
 from processors import ProcessorError
+from processors.scheduler import JobScheduler
+from utils import move_file
 
 
-class LocalProcessor:
-    """Job processor which user local installed application called "ebook-convert"
-    to convert via OTHER CLI app"""
+def get_exit_status(exit_code: int | None) -> str:
+    """Return status of the job by exit code of its process."""
+    return "completed" if exit_code == 0 else "error"
+
+
+class ResultMover:
+    """Moves results of jobs to destination in background I/O thread."""
 
     def __init__(self) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="result_mover")
+        self._pending: dict[Path, Future] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, source: str | Path, destination: Path) -> Future:
+        future = self._executor.submit(move_file, source, destination)
+        with self._lock:
+            self._pending[destination] = future
+        return future
+
+    def wait(self, destination: Path | None = None) -> dict[Path, Exception]:
+        """Wait for submitted moves (all or to one destination) and return errors by destination path."""
+        with self._lock:
+            if destination is None:
+                pending, self._pending = self._pending, {}
+            else:
+                future = self._pending.pop(destination, None)
+                pending = {destination: future} if future is not None else {}
+        wait(pending.values())
+        return {
+            destination: future.exception()
+            for destination, future in pending.items()
+            if future.exception() is not None
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+class LocalProcessor:
+    """Job processor which user local installed application called "ebook-convert"
+    to convert via OTHER CLI app
+
+    Jobs are queued by scheduler which runs not more than `max_jobs`
+    processes at the same time (CPU count by default).
+
+    Results are moved by rename or by kernel copy if destination is on other
+    filesystem. With `background_moves` they are moved in separated I/O thread,
+    use `wait_for_moves` to get errors of them.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int | None = None,
+        pin_cores: bool = False,
+        niceness: int | None = None,
+        background_moves: bool = False,
+    ) -> None:
         self._status = "ready"
         self.processes: dict[int, tuple] = {}
+        self.scheduler = JobScheduler(
+            max_jobs, pin_cores=pin_cores, niceness=niceness, processor_name=type(self).__name__)
+        self.mover = ResultMover() if background_moves else None
+        self._job_ids = itertools.count(1)
 
     def _get_process(self, job_id: int) -> subprocess.Popen:
-        return self.processes[job_id][0]
+        return self.scheduler.wait_started(self.processes[job_id][0])
+
+    def get_status(self) -> str:
+        return self._status
+
+    def set_status(self, status: str) -> None:
+        self._status = status
 
     def is_completed(self) -> bool:
         """return True if job is completed"""
@@ -30,15 +97,22 @@ class LocalProcessor:
         params = self._prepare_command(filename, options)
         command, file_to_save = params["command"], params["file_to_save"]
 
-        try:
-            # if send errors to pipe we will have traceback data in process
-            # can use it in debug mode
-            process = subprocess.Popen(command, stdout=subprocess.PIPE)
-        except Exception as ex:
-            raise ProcessorError(f"Error in send: {ex}") from ex
+        # process is started by scheduler when there is free slot for it
+        job_id = next(self._job_ids)
+        job = self.scheduler.submit(job_id, command)
+        if job.error is not None:
+            raise ProcessorError(f"Error in send: {job.error}") from job.error
 
-        self.processes[process.pid] = (process, file_to_save)
-        return process.pid
+        self.processes[job_id] = (job, file_to_save)
+        return job_id
+
+    def get_job_state(self, job_id: int) -> dict:
+        """return data which is needed to attach to the job after restart"""
+        return {"file_to_save": self.processes[job_id][1]}
+
+    def attach_job(self, job_id: int, state: dict) -> bool:
+        """processes are children of the app and do not live after restart"""
+        return False
 
     def _prepare_command(self, filename: str, options: dict) -> dict:
         """Prepare list with string command to user inner application"""
@@ -59,28 +133,35 @@ class LocalProcessor:
 
     def get_job_status(self, job_id: int) -> Generator:
         """return job status by job ID"""
-        process = self._get_process(job_id)
-        yield from self._get_job_status(process)
-
-    def _get_job_status(self, process: subprocess.Popen) -> Generator:
-        while True:
-            line = process.stdout.readline() if process.stdout is not None else None
-            if not line:
-                self.set_status("completed")
-                break
-            yield self._status, line.decode().strip()
+        self._get_process(job_id)
+        yield from self._get_job_status(job_id)
+
+    def _get_job_status(self, job_id: int) -> Generator:
+        # status is got from process of the job, because processor is shared
+        # between many jobs which are processed at the same time
+        monitor = self.scheduler.monitor
+        # lines of all processes are read by one monitor thread
+        for stream, line in monitor.iter_events(job_id):
+            if stream == "stdout":
+                yield "processing", line
+
+        job = monitor.get_job(job_id)
+        job.done.wait()
+        yield get_exit_status(job.returncode), f"Process exited with code {job.returncode}"
 
     def get_job_result(self, job_id: int) -> str:
         """get job data by job ID after processing and return it"""
         try:
-            process, result = self.processes[job_id]
+            job, result = self.processes.pop(job_id)
         except KeyError as err:
             raise ProcessorError("Processor did not find") from err
 
-        process.stdout.close()
-        return_code = process.wait()
+        self.scheduler.wait_started(job)
+        monitor = self.scheduler.monitor
+        errors = monitor.get_job(job_id).stderr_tail
+        return_code = monitor.wait(job_id)
         if return_code != 0:
-            raise ProcessorError(f"ERROR IN RESULTS {process.stderr or ''}")
+            raise ProcessorError(f"ERROR IN RESULTS {' '.join(errors)}")
         return result
 
     def save_file(
@@ -99,6 +180,15 @@ class LocalProcessor:
 
         new_file_path = destenation_path / source_path.name
 
-        source_path.rename(new_file_path)
+        if self.mover is not None:
+            self.mover.submit(source_path, new_file_path)
+        else:
+            move_file(source_path, new_file_path)
 
         return new_file_path
+
+    def wait_for_moves(self, path: Path | None = None) -> dict[Path, Exception]:
+        """Wait for results which are moved in background and return errors by path."""
+        if self.mover is None:
+            return {}
+        return self.mover.wait(path)
@@ -0,0 +1,158 @@
+from __future__ import annotations
+
+import os
+import queue
+import selectors
+import subprocess
+import threading
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Generator
+
+from processors import ProcessorError
+
+READ_SIZE = 64 * 1024
+STDERR_TAIL_SIZE = 20
+EXIT_CHECK_INTERVAL = 0.1
+
+# event of the job exit in the queue of job events
+JOB_EXIT = ("exit", None)
+
+
+@dataclass
+class MonitoredJob:
+    job_id: int
+    process: subprocess.Popen
+    on_exit: Callable | None = None
+    events: queue.Queue = field(default_factory=queue.Queue)
+    buffers: dict[str, bytes] = field(default_factory=dict)
+    stderr_tail: deque = field(default_factory=lambda: deque(maxlen=STDERR_TAIL_SIZE))
+    returncode: int | None = None
+    done: threading.Event = field(default_factory=threading.Event)
+
+
+class ProcessMonitor:
+    """Reads stdout and stderr of all watched processes in one thread via selector (epoll).
+
+    Each line is put to the events queue of its job as (stream name, line).
+    When both streams are closed and process exits, return code is saved
+    and JOB_EXIT event is sent.
+    """
+
+    def __init__(self) -> None:
+        self._selector = selectors.DefaultSelector()
+        self._jobs: dict[int, MonitoredJob] = {}
+        self._pending: list[MonitoredJob] = []
+        self._exiting: list[MonitoredJob] = []
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+        # pipe to wake up selector when new process is added
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+
+    def watch(
+        self, job_id: int, process: subprocess.Popen, on_exit: Callable | None = None
+    ) -> MonitoredJob:
+        """Start reading of process streams. on_exit(job) is called in monitor thread."""
+        job = MonitoredJob(job_id, process, on_exit)
+        with self._lock:
+            self._jobs[job_id] = job
+            self._pending.append(job)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+        os.write(self._wakeup_write, b"\0")
+        return job
+
+    def get_job(self, job_id: int) -> MonitoredJob:
+        try:
+            return self._jobs[job_id]
+        except KeyError as err:
+            raise ProcessorError("Processor did not find") from err
+
+    def iter_events(self, job_id: int) -> Generator[tuple[str, str], None, None]:
+        """Return lines of the job streams until the job exit."""
+        job = self.get_job(job_id)
+        while True:
+            event = job.events.get()
+            if event == JOB_EXIT:
+                # keep event for other readers of the same job
+                job.events.put(JOB_EXIT)
+                return
+            yield event
+
+    def wait(self, job_id: int, timeout: float | None = None) -> int:
+        """Wait for the job exit, stop watching it and return its code."""
+        job = self.get_job(job_id)
+        if not job.done.wait(timeout):
+            msg = f"Job {job_id} is not completed"
+            raise ProcessorError(msg)
+
+        with self._lock:
+            self._jobs.pop(job_id, None)
+        return job.returncode
+
+    def _run(self) -> None:
+        while True:
+            self._register_pending()
+            timeout = EXIT_CHECK_INTERVAL if self._exiting else None
+            for key, _ in self._selector.select(timeout):
+                if key.fd == self._wakeup_read:
+                    os.read(self._wakeup_read, READ_SIZE)
+                    continue
+                self._read(key)
+            self._check_exiting()
+
+    def _register_pending(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, []
+
+        for job in pending:
+            for name in ("stdout", "stderr"):
+                stream = getattr(job.process, name)
+                if stream is not None:
+                    job.buffers[name] = b""
+                    self._selector.register(stream, selectors.EVENT_READ, (job, name))
+            if not job.buffers:
+                self._exiting.append(job)
+
+    def _read(self, key: selectors.SelectorKey) -> None:
+        job, name = key.data
+        data = os.read(key.fd, READ_SIZE)
+        if data:
+            *lines, job.buffers[name] = (job.buffers[name] + data).split(b"\n")
+            for line in lines:
+                self._put_line(job, name, line)
+            return
+
+        # stream is closed
+        self._selector.unregister(key.fileobj)
+        key.fileobj.close()
+        rest = job.buffers.pop(name)
+        if rest:
+            self._put_line(job, name, rest)
+        if not job.buffers:
+            self._exiting.append(job)
+
+    def _put_line(self, job: MonitoredJob, name: str, line: bytes) -> None:
+        text = line.decode(errors="replace").strip()
+        if not text:
+            return
+        if name == "stderr":
+            job.stderr_tail.append(text)
+        job.events.put((name, text))
+
+    def _check_exiting(self) -> None:
+        """Save exit code of processes with closed streams."""
+        for job in list(self._exiting):
+            returncode = job.process.poll()
+            if returncode is None:
+                continue
+
+            self._exiting.remove(job)
+            job.returncode = returncode
+            job.events.put(JOB_EXIT)
+            job.done.set()
+            if job.on_exit is not None:
+                job.on_exit(job)
@@ -1,84 +1,200 @@
 from __future__ import annotations
 
+import codecs
+import hashlib
+import os
+import shutil
 import threading
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from collections import deque
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Callable, Generator
+from typing import Any, Callable, Generator, Iterable, Iterator
 
 import docker
-from docker.errors import ImageNotFound
+from docker.errors import ImageNotFound, NotFound
 
-from processors.local_processor import LocalProcessor
+from instrumentation import PROCESSOR_CALL, instrumentation
+from processors import ProcessorError
+from processors.container_pool import ContainerPool
+from processors.local_processor import LocalProcessor, get_exit_status
 
 IMAGE_NAME = "ebook_converter"
+DOCKERFILE_DIR = Path(__file__).parent
+# label of image with hash of Dockerfile which it was built from
+DOCKERFILE_HASH_LABEL = "convert.dockerfile-hash"
+# the last lines of output are shown in error of failed job
+OUTPUT_TAIL_SIZE = 5
+
+
+def get_dockerfile_hash(dockerfile_dir: str | Path = DOCKERFILE_DIR) -> str:
+    return hashlib.sha256((Path(dockerfile_dir) / "Dockerfile").read_bytes()).hexdigest()
 
 
 def init_container(
-    rebuild: bool = False, callback: Callable | None = None,
+    rebuild: bool = False,
+    client: docker.client.DockerClient | None = None,
+    dockerfile_dir: str | Path = DOCKERFILE_DIR,
 ) -> docker.client.DockerClient:
-    client = docker.from_env()
+    """Return docker client when image is ready, build image if it is needed.
+
+    Image is not rebuilt if it has label with hash of the current Dockerfile.
+    """
+    client = client or docker.from_env()
+    dockerfile_hash = get_dockerfile_hash(dockerfile_dir)
 
     # try to get prebuild image
-    image = False
     try:
         image = client.images.get(IMAGE_NAME)
     except ImageNotFound as err:
         print(err)
         rebuild = True
+    else:
+        if image.labels.get(DOCKERFILE_HASH_LABEL) != dockerfile_hash:
+            print(f"Dockerfile of image {IMAGE_NAME} was changed")
+            rebuild = True
 
-    # rebuild image in separated thread
-    if not image or rebuild:
-        start_build(str(Path(__file__).parents[0]), IMAGE_NAME, callback)
+    if rebuild:
+        labels = {DOCKERFILE_HASH_LABEL: dockerfile_hash}
+        build_image(str(dockerfile_dir), IMAGE_NAME, labels=labels)
 
     return client
 
 
 def build_image(
-    dockerfile_path: str, tag: str, callback: Callable | None = None,
+    dockerfile_path: str, tag: str, callback: Callable | None = None, labels: dict | None = None,
 ) -> None:
-    """Build docker image via low-level api."""
+    """Build docker image via low-level api. Raise ProcessorError if build is failed."""
     client = docker.APIClient()
     print(f"Building image: {tag} from {Path(dockerfile_path).resolve()}")
 
+    response = client.build(path=dockerfile_path, tag=tag, rm=True, decode=True, labels=labels)
+    for chunk in response:
+        if "stream" in chunk:
+            print(chunk["stream"], end="")
+        if "error" in chunk:
+            raise ProcessorError(f"Build of {tag} failed: {chunk['error']}")
+
+    print(f"\nBuild completed: {tag}")
+
+    if callback is not None:
+        callback(docker.from_env())
+
+
+def stage_file(filename: str, job_dir: Path) -> Path:
+    """Put file to job dir as hard link or as copy if link can not be created."""
+    job_dir.mkdir(parents=True, exist_ok=True)
+    staged_file = job_dir / Path(filename).name
     try:
-        response = client.build(path=dockerfile_path, tag=tag, rm=True, decode=True)
-        for chunk in response:
-            if "stream" in chunk:
-                print(chunk["stream"], end="")
+        os.link(filename, staged_file)
+    except OSError:
+        shutil.copyfile(filename, staged_file)
+    return staged_file
+
 
-        print(f"\nBuild completed: {tag}")
+def iter_output_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+    """Return not empty lines of output stream.
 
-        if callback is not None:
-            callback(docker.from_env())
+    Chunks of stream can be split inside of line or even of character,
+    so the rest of line is kept until the next chunk (as process monitor does).
+    """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+    for chunk in chunks:
+        *lines, buffer = (buffer + decoder.decode(chunk)).split("\n")
+        yield from (line.strip() for line in lines if line.strip())
 
-    except docker.errors.BuildError as e:
-        print(f"Build failed: {e}")
-    except Exception as e:
-        print(f"Unexpected error: {e}")
+    buffer += decoder.decode(b"", final=True)
+    if buffer.strip():
+        yield buffer.strip()
 
 
-def start_build(dockerfile_path: str, tag: str, callback: Callable) -> None:
-    """Start build processing in separated thread"""
-    build_thread = threading.Thread(
-        target=build_image, args=(dockerfile_path, tag, callback)
-    )
-    build_thread.daemon = True  # Ensures the thread exits when the program closes
-    build_thread.start()
-    print("Build started in the background!")
+@dataclass
+class PooledJob:
+    container: Any
+    file_to_save: Path
+    output: Iterator[bytes]
+    exec_id: str
+    released: bool = False
+    exit_code: int | None = None
+    tail: deque[str] = field(default_factory=lambda: deque(maxlen=OUTPUT_TAIL_SIZE))
 
 
 # TODO: send processing of container init to UI
 # TODO: split classes to make LocalProcessor more common
 #       and set it as base to other with similar logic
 class ProcessorOnDocker(LocalProcessor):
-    def __init__(self) -> None:
+    """Job processor which runs "ebook-convert" in docker containers.
+
+    By default each job runs in the new container.
+    With `pool_size` jobs run in pool of long-lived containers via `exec`.
+
+    If client is not set, docker is initialized (and image is built) in background
+    thread. `ready` future gets the client when image is ready, jobs which are sent
+    before it wait for it not longer than `ready_timeout` seconds.
+    """
+
+    def __init__(
+        self,
+        client: docker.client.DockerClient | None = None,
+        pool_size: int = 0,
+        max_jobs_per_container: int = 50,
+        workspace: str | Path | None = None,
+        rebuild: bool = False,
+        ready_timeout: float | None = None,
+    ) -> None:
         super().__init__()
-        self.client = init_container(
-            rebuild=False, callback=self.set_docker_client)
+        self.client = client
+        self.ready_timeout = ready_timeout
+        self.ready: Future = Future()
         self.containers: dict[int, tuple] = {}
+        self.pooled_jobs: dict[str, PooledJob] = {}
+        self.pool: ContainerPool | None = None
+        if pool_size:
+            self.pool = ContainerPool(
+                self.client,
+                IMAGE_NAME,
+                size=pool_size,
+                max_jobs=max_jobs_per_container,
+                workspace=workspace,
+            )
+
+        if client is not None:
+            self.ready.set_result(client)
+        else:
+            threading.Thread(
+                target=self._initialize, args=(rebuild,), name="docker_init", daemon=True,
+            ).start()
+
+    def _initialize(self, rebuild: bool) -> None:
+        try:
+            client = init_container(rebuild=rebuild)
+        except Exception as ex:
+            print(f"Docker was not initialized: {ex}")
+            self.ready.set_exception(ex)
+            return
+
+        self.set_docker_client(client)
+        self.ready.set_result(client)
+
+    def is_ready(self) -> bool:
+        return self.ready.done() and self.ready.exception() is None
+
+    def wait_ready(self, timeout: float | None = None) -> docker.client.DockerClient:
+        """Wait for docker client and image. Raise ProcessorError if they are not ready."""
+        try:
+            return self.ready.result(timeout)
+        except FutureTimeoutError as err:
+            raise ProcessorError("Docker image is not ready yet") from err
+        except Exception as ex:
+            raise ProcessorError(f"Docker is not ready: {ex}") from ex
 
     def set_docker_client(self, new_client: docker.client.DockerClient) -> None:
         """Called when the build is done to update the client."""
         self.client = new_client
+        if self.pool is not None:
+            self.pool.client = new_client
 
     def get_status(self) -> str:
         return self._status
@@ -91,16 +207,83 @@ class ProcessorOnDocker(LocalProcessor):
         params = self._prepare_command(filename, options)
         command, file_to_save = params["command"], params["file_to_save"]
 
+        # jobs are queued until image is built
+        self.wait_ready(self.ready_timeout)
+
+        if self.pool is not None:
+            return self._send_pooled_job(filename, command, file_to_save)
+
         path_to_mount = Path(filename).parents[0].absolute()
-        container = self.client.containers.run(
-            image=IMAGE_NAME,
-            volumes=[f"{path_to_mount}:/mnt/books"],
-            command=command,
-            detach=True,
-        )
+        with self._measure("container_run"):
+            container = self.client.containers.run(
+                image=IMAGE_NAME,
+                volumes=[f"{path_to_mount}:/mnt/books"],
+                command=command,
+                detach=True,
+            )
         self.containers[container.id] = (container, file_to_save)
         return container.id
 
+    def get_job_state(self, job_id: int) -> dict:
+        """return data which is needed to attach to the job after restart"""
+        if job_id in self.pooled_jobs:
+            return {"file_to_save": str(self.pooled_jobs[job_id].file_to_save), "pooled": True}
+        return {"file_to_save": self.containers[job_id][1]}
+
+    def attach_job(self, job_id: int, state: dict) -> bool:
+        """attach to the container of the job if it still exists.
+
+        Pooled jobs can not be attached, because their exec sessions are closed on restart.
+        """
+        if state.get("pooled") or "file_to_save" not in state:
+            return False
+
+        self.wait_ready(self.ready_timeout)
+        try:
+            container = self.client.containers.get(job_id)
+        except NotFound:
+            return False
+
+        self.containers[job_id] = (container, state["file_to_save"])
+        return True
+
+    def _send_pooled_job(self, filename: str, command: list, file_to_save: str) -> str:
+        """Run job in the container from pool and return job ID"""
+        job_id = uuid.uuid4().hex
+        job_dir, container_dir = self.pool.get_job_dir(job_id)
+        stage_file(filename, job_dir)
+
+        with self._measure("container_acquire"):
+            container = self.pool.acquire()
+        try:
+            # exec is created by low-level API to get its exit code after the end
+            with self._measure("container_exec"):
+                exec_id = self.client.api.exec_create(
+                    container.id, command, workdir=container_dir)["Id"]
+                output = self.client.api.exec_start(exec_id, stream=True)
+        except Exception as ex:
+            self.pool.release(container)
+            shutil.rmtree(job_dir, ignore_errors=True)
+            raise ProcessorError(f"Error in send: {ex}") from ex
+
+        self.pooled_jobs[job_id] = PooledJob(
+            container, job_dir / Path(file_to_save).name, output, exec_id)
+        return job_id
+
+    def _measure(self, call: str):
+        """return context manager which measures call of docker"""
+        return instrumentation.measure(PROCESSOR_CALL, processor=type(self).__name__, call=call)
+
+    def _release_pooled_job(self, job: PooledJob) -> None:
+        if not job.released:
+            job.released = True
+            # exec is inspected before container can be recycled by pool
+            try:
+                job.exit_code = self.client.api.exec_inspect(job.exec_id)["ExitCode"]
+            except docker.errors.APIError:
+                job.exit_code = None
+            self.pool.release(job.container)
+
     def _prepare_command(self, filename: str, options: dict) -> dict:
         res = super()._prepare_command(filename, options)
 
@@ -117,20 +300,36 @@ class ProcessorOnDocker(LocalProcessor):
         return self.containers[job_id][0]
 
     def get_job_status(self, job_id: int) -> Generator:
+        if job_id in self.pooled_jobs:
+            yield from self._get_pooled_job_status(self.pooled_jobs[job_id])
+            return
+
         container = self._get_container(job_id)
         logs_stream = self.client.containers.get(container.id).logs(stream=True)
+        for line in iter_output_lines(logs_stream):
+            yield "processing", line
+
+        # status of the job is got from its container, processor is shared by many jobs
+        exit_code = container.wait()["StatusCode"]
+        yield get_exit_status(exit_code), f"Process exited with code {exit_code}"
+
+    def _get_pooled_job_status(self, job: PooledJob) -> Generator:
         try:
-            while True:
-                line = next(logs_stream).decode("utf-8").strip()
-                yield self._status, line
-        except StopIteration:
-            pass
+            for line in iter_output_lines(job.output):
+                job.tail.append(line)
+                yield "processing", line
+        finally:
+            self._release_pooled_job(job)
+        yield get_exit_status(job.exit_code), f"Process exited with code {job.exit_code}"
 
     def set_status(self, status: str) -> None:
         self._status = status
 
     def get_job_result(self, job_id: int) -> str:
         """get job data by job ID after processing and return it"""
+        if job_id in self.pooled_jobs:
+            return self._get_pooled_job_result(job_id)
+
         try:
             container, result = self.containers[job_id]
         except KeyError as err:
@@ -139,6 +338,34 @@ class ProcessorOnDocker(LocalProcessor):
         container.remove()
         return result
 
+    def _get_pooled_job_result(self, job_id: str) -> str:
+        job = self.pooled_jobs.pop(job_id)
+        if not job.released:
+            # wait for the end of processing if status was not read
+            for _ in job.output:
+                pass
+            self._release_pooled_job(job)
+
+        # partial result of failed "ebook-convert" should not be used (and cached)
+        if job.exit_code:
+            shutil.rmtree(job.file_to_save.parent, ignore_errors=True)
+            msg = f"ERROR IN RESULTS (exit code {job.exit_code}): {' '.join(job.tail)}"
+            raise ProcessorError(msg)
+        if not job.file_to_save.is_file():
+            shutil.rmtree(job.file_to_save.parent, ignore_errors=True)
+            raise ProcessorError(f"ERROR IN RESULTS: {job.file_to_save.name} was not created")
+        return str(job.file_to_save)
+
+    def save_file(self, path_to_result: str, path_to_save: str | Path) -> str | Path:
+        """save job result after processing and return path to file"""
+        new_file_path = super().save_file(path_to_result, path_to_save)
+
+        # remove job dir with staged files of the pooled job
+        job_dir = Path(path_to_result).parent
+        if self.pool is not None and job_dir.parent == self.pool.workspace:
+            shutil.rmtree(job_dir, ignore_errors=True)
+        return new_file_path
+
 
 if __name__ == "__main__":
     build_image(dockerfile_path="./processors", tag="my-image:latest")
@@ -1,54 +1,149 @@
 from __future__ import annotations
 
 import json
+import math
 import os
+import random
 import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
 from pathlib import Path, PosixPath
-from typing import TextIO, Generator
+from typing import Callable, Generator
 
 import requests
-from config import APIConfig
+from config import APIConfig, HTTPConfig, PollingConfig
+from instrumentation import (
+    PROCESSOR_CALL,
+    Instrumentation,
+    instrumentation as default_instrumentation,
+)
 from processors import ProcessorError
 from interfaces.processor_interface import JobProcessor
-from utils import get_full_file_path, save_data_from_response_to_dir
+from utils import (
+    MultipartFileStream,
+    create_session,
+    download_file,
+    get_connection_stats,
+    get_full_file_path,
+)
 
-PROCESSOR_TIMEOUT = 3
+def poll_intervals(config: PollingConfig) -> Generator[float, None, None]:
+    """return growing intervals between polls with random jitter"""
+    interval = config.initial
+    while True:
+        jitter = interval * config.jitter
+        yield max(interval + random.uniform(-jitter, jitter), 0)
+        interval = min(interval * config.factor, config.maximum)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """return seconds to wait from Retry-After header"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        pass
+    else:
+        return max(seconds, 0) if math.isfinite(seconds) else None
+
+    try:
+        date = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if date.tzinfo is None:
+        # "-0000" zone means UTC without information about local time
+        date = date.replace(tzinfo=timezone.utc)
+    return max((date - datetime.now(timezone.utc)).total_seconds(), 0)
 
 
 class JobProcessorRemote:
-    """Processor use remote API for convert files."""
-    def __init__(self) -> None:
+    """Processor use remote API for convert files.
+
+    All requests are sent via one session to reuse keep-alive connections
+    of the pool for polling and downloading.
+    Progress of file uploading is sent to `upload_progress` callback of the job
+    with sent and total bytes.
+    """
+    def __init__(
+        self,
+        http_config: HTTPConfig | None = None,
+        session: requests.Session | None = None,
+        polling_config: PollingConfig | None = None,
+        instrumentation: Instrumentation | None = None,
+    ) -> None:
         self.api_config = APIConfig()
+        self.http_config = http_config or HTTPConfig()
+        self.polling_config = polling_config or PollingConfig()
+        self.session = session or create_session(self.http_config)
         self._status = "ready"
+        # the last job info and server hint to wait before next poll by job ID
+        self._jobs_info: dict[int, dict] = {}
+        self._poll_hints: dict[int, float] = {}
+        self.instrumentation = instrumentation or default_instrumentation
+
+    def get_connection_stats(self) -> dict:
+        """return count of opened and reused connections of the session"""
+        return get_connection_stats(self.session)
+
+    def _measure(self, call: str):
+        """return context manager which measures request to server"""
+        return self.instrumentation.measure(
+            PROCESSOR_CALL, processor=type(self).__name__, call=call)
 
     def set_status(self, status: str) -> None:
         self._status = status
 
-    def send_job(self, filename: str, options: None | dict = None) -> int:
+    def send_job(
+        self,
+        filename: str,
+        options: None | dict = None,
+        upload_progress: Callable | None = None,
+    ) -> int:
         """Method to send data to processing and return job ID"""
         if options is None:
             options = {}
 
-        with open(filename) as f:
-            return self._send_job_data(filename, f, options)
+        return self._send_job_data(filename, options, upload_progress)
+
+    def get_job_state(self, job_id: int) -> dict:
+        """job is kept on server, its ID is enough to continue polling"""
+        return {}
+
+    def attach_job(self, job_id: int, state: dict) -> bool:
+        """job is kept on server, so status of it can be polled again after restart"""
+        return True
 
     def get_job_status(self, job_id: int) -> Generator:
-        while not self.is_completed():
-            time.sleep(PROCESSOR_TIMEOUT)
+        # check status of current job only, because processor can be shared
+        # between many jobs which are processed at the same time
+        intervals = poll_intervals(self.polling_config)
+        status_code = None
+        while status_code != "completed":
+            time.sleep(self._get_poll_interval(job_id, intervals))
             status = self._get_job_status(job_id)
-            self.set_status(status["code"])
-            yield self._status, status["info"]
+            status_code = status["code"]
+            self.set_status(status_code)
+            yield status_code, status["info"]
+
+    def _get_poll_interval(self, job_id: int, intervals: Generator) -> float:
+        """return the next interval or the time which server asked to wait (not too long)"""
+        interval = next(intervals)
+        hint = self._poll_hints.pop(job_id, None)
+        return interval if hint is None else min(hint, self.polling_config.retry_after_maximum)
 
     def is_completed(self) -> bool:
         return self._status == "completed"
 
-    def _send_job_data(self, path_to_file: str, file_data: TextIO, options: dict) -> int:
+    def _send_job_data(
+        self, path_to_file: str, options: dict, upload_progress: Callable | None = None,
+    ) -> int:
         # get server`s options for convert
         job_id, server_url = self._get_job_id_from_server(self._set_data_options(options))
         url_upload = self._set_upload_url(job_id, server_url)
 
         # send file data to server
-        self._send_file_to_server(url_upload, path_to_file, file_data)
+        self._send_file_to_server(url_upload, path_to_file, upload_progress)
         return job_id
 
     def _set_data_options(self, options: dict) -> str:
@@ -70,29 +165,54 @@ class JobProcessorRemote:
         options_data: json string with parameters target and category
         return: job server url and job id
         """
-        response = requests.post(
-            self.api_config.url,
-            headers=self.api_config.get_header("main_header"),
-            data=options_data,
-            timeout=PROCESSOR_TIMEOUT,
-        )
-        data: dict = response.json()
-        return data["id"], data["server"]
+        with self._measure("create_job"):
+            response = self.session.post(
+                self.api_config.url,
+                headers=self.api_config.get_header("main_header"),
+                data=options_data,
+                timeout=self.http_config.timeout,
+            )
+        data = self._get_response_data(response, "create_job")
+        try:
+            return data["id"], data["server"]
+        except (KeyError, TypeError) as err:
+            raise ProcessorError(f"ERROR: job was not created: {data}") from err
 
     @staticmethod
     def _set_upload_url(job_id: int, server_url: str) -> str:
         return f"{server_url}/upload-file/{job_id}"
 
-    def _send_file_to_server(self, server_url: str, path_to_file: str, file_data: TextIO) -> dict:
-        """sends file data to remote API"""
-        response = requests.post(
-            server_url,
-            headers=self.api_config.get_header("cache_header"),
-            files={"file": (path_to_file, file_data)},
-            timeout=PROCESSOR_TIMEOUT,
-        )
+    def _send_file_to_server(
+        self, server_url: str, path_to_file: str, upload_progress: Callable | None = None,
+    ) -> dict:
+        """sends file data to remote API as stream of binary chunks"""
+        progress = upload_progress and self._get_upload_progress_callback(upload_progress)
+        with MultipartFileStream(path_to_file, callback=progress) as body, self._measure("upload"):
+            response = self.session.post(
+                server_url,
+                headers={
+                    **self.api_config.get_header("cache_header"),
+                    "content-type": body.content_type,
+                },
+                data=body,
+                timeout=self.http_config.timeout,
+            )
 
-        return response.json().get("completed")
+        return self._get_response_data(response, "upload").get("completed")
+
+    @staticmethod
+    def _get_upload_progress_callback(upload_progress: Callable) -> Callable:
+        """return callback which reports upload progress only on change of percents"""
+        last_percent = -1
+
+        def callback(sent: int, total: int) -> None:
+            nonlocal last_percent
+            percent = sent * 100 // total if total else 100
+            if percent != last_percent:
+                last_percent = percent
+                upload_progress(sent, total)
+
+        return callback
 
     def _get_job_status(self, job_id: int) -> dict:
         res = self._get_job_info(job_id)
@@ -102,25 +222,53 @@ class JobProcessorRemote:
         return self._get_job_result(job_id)
 
     def _get_job_result(self, job_id: int) -> str:
-        res = self._get_job_info(job_id)
+        # use info of the last status poll to not request it again
+        res = self._jobs_info.pop(job_id, None)
+        self._poll_hints.pop(job_id, None)
+        if res is None or not res.get("output"):
+            res = self._get_job_info(job_id)
         return res["output"][0]["uri"]
 
     def _get_job_info(self, job_id: int) -> dict:
         """sends request to server with unique id
         and return response with status code
         """
-        response = requests.get(
-            f"{self.api_config.url}/{job_id}",
-            headers=self.api_config.get_header("main_header"),
-            timeout=PROCESSOR_TIMEOUT,
-        )
+        with self._measure("status"):
+            response = self.session.get(
+                f"{self.api_config.url}/{job_id}",
+                headers=self.api_config.get_header("main_header"),
+                timeout=self.http_config.timeout,
+            )
 
-        res = response.json()
+        res = self._get_response_data(response, "status")
         self._check_errors(res)
+
+        self._jobs_info[job_id] = res
+        hint = parse_retry_after(response.headers.get("Retry-After"))
+        if hint is not None:
+            self._poll_hints[job_id] = hint
         return res
 
+    @staticmethod
+    def _get_response_data(response: requests.Response, call: str) -> dict:
+        """return JSON data of response, raise ProcessorError if request failed
+
+        Server errors are returned as responses when retries of session are exhausted.
+        """
+        try:
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as err:
+            raise ProcessorError(f"ERROR: {call} request failed: {err}") from err
+        if not isinstance(data, dict):
+            raise ProcessorError(f"ERROR: {call} request returned wrong data: {data}")
+        return data
+
     def _check_errors(self, data: dict) -> None:
-        is_error = data["status"]["code"] == "error" or data["errors"]
+        try:
+            is_error = data["status"]["code"] == "error" or data["errors"]
+        except (KeyError, TypeError) as err:
+            raise ProcessorError(f"ERROR: wrong job info: {data}") from err
         if not is_error:
             return
 
@@ -138,6 +286,6 @@ class JobProcessorRemote:
         """saves file form remote URL to directory"""
         filename = url.split("/")[-1] if url else ""
         full_path = get_full_file_path(filename, sub_dir)
-        response = requests.get(url, stream=True)
-        save_data_from_response_to_dir(full_path, response)
+        with self._measure("download"):
+            download_file(url, full_path, session=self.session, timeout=self.http_config.timeout)
         return full_path
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import os
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+from instrumentation import (
+    PROCESSOR_CALL,
+    Instrumentation,
+    instrumentation as default_instrumentation,
+)
+from processors import ProcessorError
+from processors.monitor import ProcessMonitor
+
+
+def get_available_cores() -> list[int]:
+    """return list of CPU cores which current process can use"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+@dataclass
+class ScheduledJob:
+    job_id: int
+    command: list[str]
+    started: threading.Event = field(default_factory=threading.Event)
+    process: subprocess.Popen | None = None
+    error: Exception | None = None
+    core: int | None = None
+    submitted: float = field(default_factory=time.perf_counter)
+
+
+class JobScheduler:
+    """Queue of subprocesses which runs not more than `max_jobs` of them at the same time.
+
+    Queued jobs are started when running ones exit.
+    Optionally each job is pinned to the free CPU core and gets lower priority (nice).
+    Affinity and priority are set from the parent after start of process,
+    because `preexec_fn` is not safe with threads.
+    Output and exit of all processes are watched by one monitor thread.
+    Time of waiting in queue and of process spawn are sent to instrumentation.
+    """
+
+    def __init__(
+        self,
+        max_jobs: int | None = None,
+        pin_cores: bool = False,
+        niceness: int | None = None,
+        instrumentation: Instrumentation | None = None,
+        processor_name: str = "LocalProcessor",
+    ) -> None:
+        self.max_jobs = max_jobs or len(get_available_cores())
+        self.pin_cores = pin_cores and hasattr(os, "sched_setaffinity")
+        self.niceness = niceness if hasattr(os, "setpriority") else None
+
+        self._queue: deque[ScheduledJob] = deque()
+        self._running: set[int] = set()
+        self._free_cores = get_available_cores() if self.pin_cores else []
+        self._lock = threading.Lock()
+        self.monitor = ProcessMonitor()
+        self.instrumentation = instrumentation or default_instrumentation
+        self.processor_name = processor_name
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def submit(self, job_id: int, command: list[str]) -> ScheduledJob:
+        """Add command to queue and start it if there is free slot."""
+        job = ScheduledJob(job_id, command)
+        with self._lock:
+            self._queue.append(job)
+        self._dispatch()
+        return job
+
+    def wait_started(self, job: ScheduledJob, timeout: float | None = None) -> subprocess.Popen:
+        """Wait for start of job and return its process."""
+        if not job.started.wait(timeout):
+            msg = f"Job {job.job_id} was not started"
+            raise ProcessorError(msg)
+        if job.error is not None or job.process is None:
+            raise ProcessorError(f"Error in send: {job.error}") from job.error
+        return job.process
+
+    def release(self, job: ScheduledJob) -> None:
+        """Free slot of the finished job and start the next queued one."""
+        with self._lock:
+            if job.job_id not in self._running:
+                return
+            self._running.discard(job.job_id)
+            if job.core is not None:
+                self._free_cores.append(job.core)
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        to_start = []
+        with self._lock:
+            while self._queue and len(self._running) < self.max_jobs:
+                job = self._queue.popleft()
+                self._running.add(job.job_id)
+                if self._free_cores:
+                    job.core = self._free_cores.pop(0)
+                to_start.append(job)
+
+        for job in to_start:
+            self._start(job)
+
+    def _start(self, job: ScheduledJob) -> None:
+        labels = {"processor": self.processor_name}
+        self.instrumentation.record(
+            PROCESSOR_CALL, time.perf_counter() - job.submitted, call="queue_wait", **labels)
+        try:
+            with self.instrumentation.measure(PROCESSOR_CALL, call="spawn", **labels):
+                job.process = subprocess.Popen(
+                    job.command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        except Exception as ex:
+            job.error = ex
+            job.started.set()
+            self.release(job)
+            return
+
+        self._set_limits(job)
+        self.monitor.watch(job.job_id, job.process, on_exit=lambda _: self.release(job))
+        job.started.set()
+
+    def _set_limits(self, job: ScheduledJob) -> None:
+        pid = job.process.pid
+        try:
+            if job.core is not None:
+                os.sched_setaffinity(pid, {job.core})
+            if self.niceness is not None:
+                os.setpriority(os.PRIO_PROCESS, pid, self.niceness)
+        except OSError as ex:
+            # process can exit before setting of limits
+            print(f"Limits were not set for job {job.job_id}: {ex}")
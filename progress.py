@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import re
+import time
+from dataclasses import dataclass, replace
+from typing import Callable
+
+# ebook-convert prints progress as "34% Running transforms on e-book..."
+PROGRESS_PATTERN = re.compile(r"^\s*(\d{1,3}(?:\.\d+)?)%\s*(.*)$")
+DEFAULT_PROGRESS_INTERVAL = 0.25
+
+
+@dataclass(frozen=True)
+class ProgressEvent:
+    percent: float
+    stage: str
+    eta: float | None = None
+
+
+def parse_progress(line: str) -> ProgressEvent | None:
+    """Return progress event from line of converter output or None if it is other message."""
+    match = PROGRESS_PATTERN.match(line)
+    if match is None:
+        return None
+
+    percent = float(match.group(1))
+    if percent > 100:
+        return None
+    return ProgressEvent(percent, match.group(2).strip())
+
+
+class ProgressTracker:
+    """Add ETA to progress events of one job and pass not more than one event per `interval`.
+
+    The last (100%) event is always passed.
+    """
+
+    def __init__(
+        self,
+        interval: float = DEFAULT_PROGRESS_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.interval = interval
+        self.clock = clock
+        self._started = clock()
+        self._last_sent: float | None = None
+
+    def update(self, event: ProgressEvent) -> ProgressEvent | None:
+        now = self.clock()
+        event = replace(event, eta=self._get_eta(event.percent, now))
+
+        is_throttled = self._last_sent is not None and now - self._last_sent < self.interval
+        if is_throttled and event.percent < 100:
+            return None
+
+        self._last_sent = now
+        return event
+
+    def _get_eta(self, percent: float, now: float) -> float | None:
+        if percent <= 0:
+            return None
+        elapsed = now - self._started
+        return elapsed * (100 - percent) / percent
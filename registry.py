@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import importlib
+from typing import Any
+
+
+class RegistryError(Exception):
+    """Plugin was not found or can not be loaded."""
+
+
+class Registry:
+    """Plugins (processors, UIs, workers) by name.
+
+    Plugins are registered as "module:attribute" strings and imported only when
+    they are loaded, so heavy dependencies of not selected plugins are not imported.
+    Not registered "module:attribute" string can be loaded as well.
+    """
+
+    def __init__(self, kind: str) -> None:
+        self.kind = kind
+        self._plugins: dict[str, str] = {}
+
+    def register(self, name: str, target: str) -> None:
+        if ":" not in target:
+            msg = f"Target of {self.kind} {name!r} should be 'module:attribute'"
+            raise RegistryError(msg)
+        self._plugins[name] = target
+
+    def names(self) -> list[str]:
+        return sorted(self._plugins)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._plugins
+
+    def load(self, name: str) -> Any:
+        """Import and return class of plugin by name."""
+        target = self._plugins.get(name, name)
+        if ":" not in target:
+            msg = f"Unknown {self.kind}: {name!r}, choose from {', '.join(self.names())}"
+            raise RegistryError(msg)
+
+        module_name, _, attribute = target.partition(":")
+        try:
+            module = importlib.import_module(module_name)
+            return getattr(module, attribute)
+        except (ImportError, AttributeError) as err:
+            msg = f"Can not load {self.kind} {name!r} from {target}: {err}"
+            raise RegistryError(msg) from err
+
+    def create(self, name: str, *args: Any, **kwargs: Any) -> Any:
+        """Return new instance of plugin by name."""
+        return self.load(name)(*args, **kwargs)
+
+
+processors = Registry("processor")
+processors.register("local", "processors.local_processor:LocalProcessor")
+processors.register("docker", "processors.processor_on_docker:ProcessorOnDocker")
+processors.register("remote", "processors.remote_processor:JobProcessorRemote")
+
+uis = Registry("ui")
+uis.register("cli", "uis.cli_ui:ConverterInterfaceCLI")
+uis.register("tk", "uis.tk_ui:ConverterInterfaceTk")
+
+workers = Registry("worker")
+workers.register("thread", "workers.worker:ThreadWorker")
+workers.register("pool", "workers.worker:PoolWorker")
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from collections import defaultdict
+
+# statuses after which job is not updated anymore
+FINAL_STATUSES = ("completed", "error")
+
+
+def is_finished(event: dict) -> bool:
+    """Return True if job of the event is finished with result or error (not by status only)."""
+    if event.get("status") == "completed":
+        return event.get("result") is not None
+    return event.get("status") == "error" and event.get("error") is not None
+
+
+class Subscription:
+    """Updates of subscribed jobs for one client.
+
+    Only the latest update of each job is kept until client reads it,
+    so slow client gets less updates instead of growing queue.
+    """
+
+    def __init__(self, job_ids: set[str], loop: asyncio.AbstractEventLoop) -> None:
+        self.job_ids = job_ids
+        self._loop = loop
+        self._lock = threading.Lock()
+        self._pending: dict[str, dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict) -> None:
+        """Add update of job, can be called from any thread."""
+        with self._lock:
+            self._pending[event["id"]] = event
+        try:
+            self._loop.call_soon_threadsafe(self._ready.set)
+        except RuntimeError:
+            # loop of the client is closed
+            pass
+
+    async def get(self) -> list[dict]:
+        """Wait for updates and return the latest one of each job."""
+        await self._ready.wait()
+        self._ready.clear()
+        with self._lock:
+            events, self._pending = list(self._pending.values()), {}
+        return events
+
+
+class JobEventBroker:
+    """Sends updates of jobs from converter threads to subscribed clients."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: dict[str, set[Subscription]] = defaultdict(set)
+
+    def subscribe(self, job_ids: set[str], loop: asyncio.AbstractEventLoop) -> Subscription:
+        subscription = Subscription(job_ids, loop)
+        with self._lock:
+            for job_id in job_ids:
+                self._subscriptions[job_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            for job_id in subscription.job_ids:
+                subscriptions = self._subscriptions.get(job_id)
+                if subscriptions is None:
+                    continue
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[job_id]
+
+    def publish(self, event: dict) -> None:
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event["id"], ()))
+        for subscription in subscriptions:
+            subscription.push(event)
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+from config import JobConfig, Target
+from app.events import JobEventBroker
+from converter import Converter
+from job_store import JobStore, StoredJob, get_processor_name
+from registry import processors
+from single_flight import SingleFlight
+
+WORK_DIR = Path(os.environ.get("CONVERTER_WORK_DIR", "/tmp/convert_service"))
+MAX_WORKERS = int(os.environ.get("CONVERTER_MAX_WORKERS", 4))
+PROCESSOR_NAME = os.environ.get("CONVERTER_PROCESSOR", "local")
+MAX_MESSAGES = 50
+# finished jobs are loaded from job store when they are not kept in memory
+MAX_FINISHED_JOBS = 100
+DEFAULT_UPLOAD_NAME = "book"
+
+
+def create_processor(name: str = PROCESSOR_NAME) -> Any:
+    """Return processor by name, import only the selected one."""
+    return processors.create(name)
+
+
+def get_upload_name(filename: str) -> str:
+    """Return name of uploaded file without directories (or default name)."""
+    name = Path(filename.replace("\\", "/")).name
+    return name if name not in ("", ".", "..") else DEFAULT_UPLOAD_NAME
+
+
+@dataclass
+class Job:
+    id: str
+    config: JobConfig
+    status: str = "queued"
+    # status reported by processor, it can be shared by all jobs of processor
+    stage: str | None = None
+    progress: float | None = None
+    eta: float | None = None
+    messages: list[str] = field(default_factory=list)
+    result: Path | None = None
+    error: str | None = None
+    created: float = field(default_factory=time.time)
+    updated: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_stored(cls, stored: StoredJob) -> Job:
+        return cls(
+            stored.id,
+            stored.config,
+            status=stored.status,
+            result=Path(stored.result) if stored.result else None,
+            error=stored.error,
+            created=stored.created,
+            updated=stored.updated,
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "eta": self.eta,
+            "messages": self.messages[-MAX_MESSAGES:],
+            "filename": Path(self.config.path_to_file).name,
+            "target": self.config.job_target,
+            "result": self.result.name if self.result else None,
+            "error": self.error,
+            "created": self.created,
+            "updated": self.updated,
+        }
+
+
+class JobUI:
+    """UI of one job which saves info from converter to the job record.
+
+    Status of the record is changed by converter only, statuses of processor
+    are saved as `stage`. Job is completed when its result is saved.
+    Each update of the record is sent to `on_update` callback.
+    """
+
+    def __init__(self, job: Job, on_update: Callable[[dict], None] | None = None) -> None:
+        self.job = job
+        self.on_update = on_update
+
+    def _update(self, **fields: Any) -> None:
+        for key, value in fields.items():
+            setattr(self.job, key, value)
+        self.job.updated = time.time()
+        if self.on_update is not None:
+            self.on_update(self.job.to_dict())
+
+    def run(self, converter: Converter) -> None:
+        pass
+
+    def setup(self) -> JobConfig:
+        return self.job.config
+
+    def convert(self, config: JobConfig) -> None:
+        pass
+
+    def display_job_status(self, status: str) -> None:
+        if status == "completed" and self.job.result is None:
+            self._update(stage=status)
+            return
+        self._update(status=status)
+
+    def display_job_result(self, result: Path | str) -> None:
+        self._update(result=Path(result))
+
+    def display_job_id(self, job_id: str) -> None:
+        pass
+
+    def display_common_info(self, message: str, status: str | None = None) -> None:
+        self.job.messages.append(str(message))
+        del self.job.messages[:-MAX_MESSAGES]
+        self._update(stage=status or self.job.stage)
+
+    def display_progress(self, progress: Any) -> None:
+        self._update(progress=progress.percent, eta=progress.eta)
+
+    def display_error(self, error: str) -> None:
+        self._update(status="error", error=error)
+
+
+class JobManager:
+    """Runs conversion jobs in the bounded pool of worker threads.
+
+    Uploaded files and results are kept in `work_dir`.
+    Jobs are saved to job store (`work_dir`/jobs.db by default) to continue
+    unfinished ones by `recover` after restart of the service.
+    Updates of jobs are published to subscribers of `events`.
+    Identical jobs in progress (the same file and options) are processed once.
+    Only `MAX_FINISHED_JOBS` of the last finished jobs are kept in memory.
+    """
+
+    def __init__(
+        self,
+        processor: Any | None = None,
+        work_dir: str | Path = WORK_DIR,
+        max_workers: int = MAX_WORKERS,
+        job_store: JobStore | None = None,
+    ) -> None:
+        self.processor = processor or create_processor()
+        self.work_dir = Path(work_dir)
+        self.job_store = job_store or JobStore(self.work_dir / "jobs.db")
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="converter")
+        self.jobs: dict[str, Job] = {}
+        self._finished: deque[str] = deque()
+        self.events = JobEventBroker()
+        self.single_flight = SingleFlight()
+        self._lock = threading.Lock()
+
+    def create_upload_path(self, filename: str) -> tuple[str, Path]:
+        """Return new job ID and path to save uploaded file."""
+        job_id = uuid.uuid4().hex
+        upload_dir = self.work_dir / "uploads" / job_id
+        upload_dir.mkdir(parents=True, exist_ok=True)
+        return job_id, upload_dir / get_upload_name(filename)
+
+    def submit(self, job_id: str, path_to_file: Path, target: str, category: str) -> Job:
+        """Register job and send it to worker pool."""
+        config = JobConfig(
+            Target(target, category),
+            str(path_to_file),
+            str(self.work_dir / "results" / job_id),
+        )
+        self.job_store.create(config, get_processor_name(self.processor), job_id=job_id)
+        job = Job(job_id, config)
+        with self._lock:
+            self.jobs[job_id] = job
+        self.executor.submit(self._run, job)
+        return job
+
+    def recover(self) -> list[Job]:
+        """Continue jobs which were not finished before restart."""
+        jobs = []
+        for stored in self.job_store.get_unfinished(get_processor_name(self.processor)):
+            job = Job(stored.id, stored.config, created=stored.created)
+            with self._lock:
+                self.jobs[job.id] = job
+            self.executor.submit(self._run, job, stored)
+            jobs.append(job)
+        return jobs
+
+    def get_job(self, job_id: str) -> Job | None:
+        job = self.jobs.get(job_id)
+        if job is None:
+            # job could be finished before restart
+            stored = self.job_store.get(job_id)
+            job = Job.from_stored(stored) if stored is not None else None
+        return job
+
+    def _run(self, job: Job, stored: StoredJob | None = None) -> None:
+        ui = JobUI(job, self.events.publish)
+        ui.display_job_status("processing")
+        converter = Converter(
+            ui, self.processor, job_store=self.job_store, single_flight=self.single_flight)
+        try:
+            if stored is None:
+                converter.convert_job(job.config, store_id=job.id)
+            else:
+                converter.resume_job(stored)
+        finally:
+            # uploaded file is not needed after processing
+            shutil.rmtree(Path(job.config.path_to_file).parent, ignore_errors=True)
+            if job.status != "error" and job.result is None:
+                ui.display_error("Result was not created")
+                self.job_store.set_status(job.id, "error", error=job.error)
+            self._forget_finished(job)
+
+    def _forget_finished(self, job: Job) -> None:
+        """Remove the oldest finished jobs from memory, they are kept in job store."""
+        with self._lock:
+            self._finished.append(job.id)
+            while len(self._finished) > MAX_FINISHED_JOBS:
+                self.jobs.pop(self._finished.popleft(), None)
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
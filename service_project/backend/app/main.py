@@ -1,8 +1,43 @@
-from fastapi import FastAPI
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import parse_options_header
+
+from app.events import is_finished
+from app.jobs import JobManager
+from app.uploads import UploadParser
+from instrumentation import metrics
+
+MAX_STREAMED_JOBS = 100
+# comment is sent to keep connection through proxies when jobs are not updated
+KEEP_ALIVE_INTERVAL = 15
+
+manager: JobManager | None = None
+
+
+def get_manager() -> JobManager:
+    global manager
+    if manager is None:
+        manager = JobManager()
+    return manager
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # continue jobs which were interrupted by restart
+    get_manager().recover()
+    yield
+    if manager is not None:
+        manager.shutdown()
 
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,3 +57,115 @@ async def root():
 @app.get("/api")
 async def api_root():
     return {"message": "API v1.1"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Timings of converter stages and processor calls in Prometheus text format."""
+    return PlainTextResponse(metrics.to_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request):
+    """Create job from multipart form with `file` and optional `target` and `category`.
+
+    Body is parsed while it is received, so uploaded file is written to the job
+    directory once instead of being spooled to temporary file and copied.
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Send file as multipart/form-data")
+
+    jobs = get_manager()
+    parser = UploadParser(boundary, jobs.create_upload_path)
+    try:
+        # chunks are parsed and written in thread to not block event loop
+        async for chunk in request.stream():
+            await run_in_threadpool(parser.write, chunk)
+        await run_in_threadpool(parser.finalize)
+    except MultipartParseError as error:
+        await run_in_threadpool(parser.remove)
+        raise HTTPException(status_code=400, detail=f"Wrong form: {error}") from error
+    except BaseException:
+        await run_in_threadpool(parser.remove)
+        raise
+
+    if parser.upload is None:
+        raise HTTPException(status_code=400, detail="Send file in field `file`")
+
+    job_id, path_to_file = parser.upload
+    target = parser.fields.get("target", "mobi")
+    category = parser.fields.get("category", "ebook")
+    # job store is written in thread as well
+    job = await run_in_threadpool(jobs.submit, job_id, path_to_file, target, category)
+    return job.to_dict()
+
+
+def format_event(data: dict) -> str:
+    return f"event: job\ndata: {json.dumps(data)}\n\n"
+
+
+@app.get("/jobs/events")
+async def stream_jobs(ids: str = Query(..., description="Comma separated IDs of jobs")):
+    """Stream updates of jobs as server-sent events until all of them are finished."""
+    job_ids = {job_id for job_id in ids.split(",") if job_id}
+    if not job_ids or len(job_ids) > MAX_STREAMED_JOBS:
+        raise HTTPException(
+            status_code=400, detail=f"Send from 1 to {MAX_STREAMED_JOBS} job IDs")
+
+    jobs = get_manager()
+    subscription = jobs.events.subscribe(job_ids, asyncio.get_running_loop())
+
+    async def stream():
+        try:
+            # current state of jobs is sent first, subscription keeps updates after it
+            finished = {}
+            for job_id in job_ids:
+                job = await run_in_threadpool(jobs.get_job, job_id)
+                if job is not None:
+                    data = job.to_dict()
+                else:
+                    data = {"id": job_id, "status": "error", "error": "Job not found"}
+                finished[job_id] = is_finished(data)
+                yield format_event(data)
+
+            while not all(finished.values()):
+                try:
+                    events = await asyncio.wait_for(subscription.get(), KEEP_ALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                for data in events:
+                    finished[data["id"]] = is_finished(data)
+                    yield format_event(data)
+        finally:
+            jobs.events.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(get_manager().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str):
+    job = await run_in_threadpool(get_manager().get_job, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == "error":
+        raise HTTPException(status_code=409, detail=job.error)
+    if job.result is None or not job.result.is_file():
+        raise HTTPException(status_code=409, detail=f"Job is {job.status}")
+
+    # file is sent by chunks
+    return FileResponse(job.result, filename=job.result.name)
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import shutil
+from pathlib import Path
+from typing import BinaryIO, Callable
+
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# name of the form field with uploaded file
+FILE_FIELD = "file"
+# other fields are short options of job
+MAX_FIELD_SIZE = 1024
+
+
+class UploadParser:
+    """Parser of multipart form which writes file to disk by chunks of request body.
+
+    Form is not spooled to temporary file before parsing, so uploaded file is
+    written once to the path from `create_path(filename)` (job ID and path).
+    Other fields are kept in `fields`.
+    """
+
+    def __init__(
+        self, boundary: bytes, create_path: Callable[[str], tuple[str, Path]],
+    ) -> None:
+        self.create_path = create_path
+        self.upload: tuple[str, Path] | None = None
+        self.fields: dict[str, str] = {}
+        self._header_field = bytearray()
+        self._header_value = bytearray()
+        self._headers: dict[bytes, bytes] = {}
+        self._field: tuple[str, bytearray] | None = None
+        self._file: BinaryIO | None = None
+        self._parser = MultipartParser(boundary, {
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        })
+
+    def write(self, chunk: bytes) -> None:
+        self._parser.write(chunk)
+
+    def finalize(self) -> None:
+        self._parser.finalize()
+        if self._file is not None or self._field is not None:
+            msg = "Form is not completed"
+            raise MultipartParseError(msg)
+
+    def remove(self) -> None:
+        """Close and remove uploaded file, e.g. when form is broken."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.upload is not None:
+            shutil.rmtree(self.upload[1].parent, ignore_errors=True)
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        self._headers[bytes(self._header_field).lower()] = bytes(self._header_value)
+        self._header_field.clear()
+        self._header_value.clear()
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.pop(b"content-disposition", b""))
+        self._headers.clear()
+        name = options.get(b"name", b"").decode(errors="replace")
+        if name == FILE_FIELD and b"filename" in options and self.upload is None:
+            self.upload = self.create_path(options[b"filename"].decode(errors="replace"))
+            self._file = open(self.upload[1], "wb")
+        else:
+            self._field = (name, bytearray())
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._file is not None:
+            self._file.write(data[start:end])
+            return
+
+        value = self._field[1]
+        value += data[start:end]
+        if len(value) > MAX_FIELD_SIZE:
+            msg = f"Field {self._field[0]} is too big"
+            raise MultipartParseError(msg)
+
+    def _on_part_end(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        elif self._field is not None:
+            name, value = self._field
+            self.fields[name] = value.decode(errors="replace")
+            self._field = None
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import queue
+import threading
+from collections.abc import Iterator
+from concurrent.futures import Future
+from typing import Any
+
+# end of events of the flight
+_FINISHED = object()
+
+
+class Flight:
+    """One job in progress which is shared by all callers with the same key.
+
+    Leader publishes calls of UI (status stream) and result, followers get
+    all calls from the start and the same result or error.
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.result: Future = Future()
+        self.followers = 0
+        # source of the leader job, followers name their results by it
+        self.source: str | None = None
+        self._lock = threading.Lock()
+        self._events: list[tuple[str, tuple, dict]] = []
+        self._queues: list[queue.SimpleQueue] = []
+
+    def publish(self, method: str, *args: Any, **kwargs: Any) -> None:
+        """Send call of UI method to all followers."""
+        event = (method, args, kwargs)
+        with self._lock:
+            self._events.append(event)
+            queues = list(self._queues)
+        for events in queues:
+            events.put(event)
+
+    def subscribe(self) -> Iterator[tuple[str, tuple, dict]]:
+        """Return all published events, wait for new ones until flight is finished."""
+        events: queue.SimpleQueue = queue.SimpleQueue()
+        with self._lock:
+            for event in self._events:
+                events.put(event)
+            if self.result.done():
+                events.put(_FINISHED)
+            else:
+                self._queues.append(events)
+
+        while (event := events.get()) is not _FINISHED:
+            yield event
+
+    def finish(self, result: Any = None, error: BaseException | None = None) -> None:
+        with self._lock:
+            if error is not None:
+                self.result.set_exception(error)
+            else:
+                self.result.set_result(result)
+            queues, self._queues = self._queues, []
+        for events in queues:
+            events.put(_FINISHED)
+
+
+class SingleFlight:
+    """Jobs in progress by key, so identical jobs are processed once.
+
+    The same instance should be shared by all converters to coalesce their jobs.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._flights: dict[str, Flight] = {}
+
+    def join(self, key: str) -> tuple[Flight, bool]:
+        """Return flight of the key and True if caller is leader and should process the job."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                return flight, False
+
+            flight = self._flights[key] = Flight(key)
+            return flight, True
+
+    def finish(
+        self, flight: Flight, result: Any = None, error: BaseException | None = None,
+    ) -> None:
+        """Send result to followers, the next job with the same key is processed again."""
+        with self._lock:
+            self._flights.pop(flight.key, None)
+        flight.finish(result, error)
+
+    def __len__(self) -> int:
+        return len(self._flights)
@@ -1,3 +1,6 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Optional, Union, Any
 from pathlib import Path
 
@@ -43,6 +46,9 @@ class DummyUI:
     def display_common_info(self, message: str, status: str | None = None) -> None:
         print(f"DUMMY UI: display common info {message} {status}")
 
+    def display_progress(self, progress: Any) -> None:
+        print(f"DUMMY UI: display progress {progress}")
+
     def display_error(self, error: str) -> None:
         raise NotImplementedError
 
@@ -142,3 +148,189 @@ class LocalTestJobProcessor:
         full_path = f"path/to/{path_to_save}"
         self._data["full_path"] = full_path
         return full_path
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Handler which returns responses prepared in the server routes."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self) -> None:
+        self.respond()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        self.server.bodies.append(self.rfile.read(length))
+        self.respond()
+
+    def respond(self) -> None:
+        self.server.requests.append((self.command, self.path))
+        responses = self.server.routes.get(self.path) or [(404, b"")]
+        status, body, *headers = responses.pop(0) if len(responses) > 1 else responses[0]
+
+        self.send_response(status)
+        for key, value in (headers[0] if headers else {}).items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class LocalHTTPServer:
+    """Local HTTP server to use as remote API in tests.
+
+    routes: path -> list of (status, body) or (status, body, headers),
+    the last response is repeated
+    """
+
+    def __init__(self, routes: dict | None = None, handler: type = StubHandler) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.server.routes = routes or {}
+        self.server.requests = []
+        self.server.bodies = []
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    @property
+    def requests(self) -> list:
+        return self.server.requests
+
+    def __enter__(self) -> "LocalHTTPServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class CopyProcessor:
+    """Processor which "converts" file by copy of its content."""
+
+    def __init__(self):
+        self.sent = []
+
+    def set_status(self, status):
+        pass
+
+    def send_job(self, filename, options=None):
+        self.sent.append(Path(filename).name)
+        return (filename, options["target"])
+
+    def get_job_status(self, job_id):
+        return iter([])
+
+    def get_job_result(self, job_id):
+        return job_id
+
+    def save_file(self, path_to_result, path_to_save):
+        filename, target = path_to_result
+        path = Path(path_to_save) / f"{Path(filename).name}.{target}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(Path(filename).read_bytes())
+        return path
+
+
+class ServiceProcessor(CopyProcessor):
+    """Processor which does not finish jobs until `release` is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.release.set()
+
+    def get_job_state(self, job_id):
+        return {}
+
+    def attach_job(self, job_id, state):
+        return False
+
+    def get_job_status(self, job_id):
+        yield "processing", "50% Converting"
+        self.release.wait(5)
+        yield "processing", "100% Done"
+
+
+class SharedStatusProcessor(ServiceProcessor):
+    """Processor which reports status shared by all its jobs (as local one does)."""
+
+    def get_job_status(self, job_id):
+        filename, _ = job_id
+        yield "completed", "Other job is done"
+        if Path(filename).name.startswith("slow"):
+            self.release.wait(5)
+
+
+def wait_for(condition, timeout=5.0):
+    """Return True when condition is met or False after timeout."""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class RecordingUI(DummyUI):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def display_common_info(self, message, status=None):
+        self.calls.append(("info", message))
+
+    def display_progress(self, progress):
+        self.calls.append(("progress", progress.percent))
+
+    def display_job_status(self, status):
+        self.calls.append(("status", status))
+
+    def display_job_result(self, result):
+        self.calls.append(("result", result))
+
+    def display_error(self, error):
+        self.calls.append(("error", error))
+
+
+class BlockingProcessor:
+    """Processor which does not finish jobs until `release` is set."""
+
+    def __init__(self, fail: bool = False, by_stem: bool = False):
+        self.fail = fail
+        self.by_stem = by_stem
+        self.sent = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def set_status(self, status):
+        pass
+
+    def send_job(self, filename, options=None):
+        self.sent.append(filename)
+        return len(self.sent)
+
+    def get_job_status(self, job_id):
+        yield "processing", "50% Converting"
+        self.started.set()
+        self.release.wait(5)
+        yield "processing", "100% Done"
+
+    def get_job_result(self, job_id):
+        if self.fail:
+            raise ProcessorError("conversion failed")
+        # processors name result by source file (or by its stem as remote one)
+        source = Path(self.sent[job_id - 1])
+        return f"{source.stem if self.by_stem else source.name}.mobi"
+
+    def save_file(self, path_to_result, path_to_save):
+        path = Path(path_to_save) / path_to_result
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"converted")
+        return path
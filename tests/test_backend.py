@@ -0,0 +1,332 @@
+import asyncio
+import json
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from config import JobConfig, Target
+from job_store import get_processor_name
+from tests.common import ServiceProcessor, SharedStatusProcessor, wait_for
+
+sys.path.insert(0, str(Path(__file__).parents[1] / "service_project" / "backend"))
+
+try:
+    from fastapi.testclient import TestClient
+
+    from app import jobs as app_jobs, main as app_main
+    from app.events import JobEventBroker, is_finished
+    from app.jobs import Job, JobManager, JobUI, get_upload_name
+except ImportError:
+    TestClient = None
+
+
+@unittest.skipIf(TestClient is None, "service dependencies are not installed")
+class ServiceTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+        self.processor = ServiceProcessor()
+        self.manager = JobManager(self.processor, self.work_dir, max_workers=2)
+
+    def tearDown(self):
+        self.manager.shutdown()
+        self.manager.job_store.close()
+        self.tmp_dir.cleanup()
+
+    def submit(self, name="book.fb2", content=b"book"):
+        job_id, path_to_file = self.manager.create_upload_path(name)
+        path_to_file.write_bytes(content)
+        return self.manager.submit(job_id, path_to_file, "mobi", "ebook")
+
+    def wait_for_status(self, job_id, status="completed"):
+        return wait_for(lambda: self.manager.get_job(job_id).status == status)
+
+
+class JobManagerTestCase(ServiceTestCase):
+    def test_job_ui_publishes_updates(self):
+        updates = []
+        job = Job("id", JobConfig(Target("mobi", "ebook"), "book.fb2"))
+        ui = JobUI(job, updates.append)
+
+        ui.display_common_info("Uploading", status="uploading")
+        ui.display_error("broken book")
+        self.assertEqual([update["status"] for update in updates], ["queued", "error"])
+        self.assertEqual(updates[0]["stage"], "uploading")
+        self.assertEqual(updates[-1]["error"], "broken book")
+        self.assertEqual(updates[-1]["messages"], ["Uploading"])
+
+    def test_job_is_completed_with_result(self):
+        job = Job("id", JobConfig(Target("mobi", "ebook"), "book.fb2"))
+        ui = JobUI(job)
+        ui.display_job_status("completed")
+        self.assertEqual((job.status, job.stage), ("queued", "completed"))
+
+        ui.display_job_result("book.fb2.mobi")
+        ui.display_job_status("completed")
+        self.assertEqual(job.status, "completed")
+
+    def test_upload_name(self):
+        self.assertEqual(get_upload_name("dir/book.fb2"), "book.fb2")
+        self.assertEqual(get_upload_name("..\\book.fb2"), "book.fb2")
+        for name in ("", ".", "..", "../"):
+            self.assertEqual(get_upload_name(name), "book")
+
+    def test_submit(self):
+        job = self.submit()
+        self.assertTrue(self.wait_for_status(job.id))
+
+        job = self.manager.get_job(job.id)
+        self.assertEqual(job.result.read_bytes(), b"book")
+        self.assertEqual(job.progress, 100.0)
+        self.assertEqual(self.manager.job_store.get(job.id).status, "completed")
+        # uploaded file is removed
+        self.assertFalse(Path(job.config.path_to_file).exists())
+
+    def test_status_of_processor_does_not_finish_job(self):
+        self.processor = SharedStatusProcessor()
+        self.manager.processor = self.processor
+        self.processor.release.clear()
+        published = []
+        with patch.object(self.manager.events, "publish", side_effect=published.append):
+            slow = self.submit("slow.fb2", b"slow")
+            fast = self.submit("fast.fb2", b"fast")
+            self.assertTrue(self.wait_for_status(fast.id))
+
+            # slow job got "completed" from processor, but it is still in progress
+            self.assertTrue(wait_for(lambda: slow.stage == "completed"))
+            self.assertEqual(self.manager.get_job(slow.id).status, "start")
+            self.assertIsNone(slow.result)
+
+            self.processor.release.set()
+            self.assertTrue(self.wait_for_status(slow.id))
+
+        completed = [event for event in published if event["status"] == "completed"]
+        self.assertEqual({event["id"] for event in completed}, {slow.id, fast.id})
+        self.assertTrue(all(event["result"] for event in completed))
+
+    def test_finished_jobs_are_loaded_from_store(self):
+        with patch.object(app_jobs, "MAX_FINISHED_JOBS", 1):
+            first = self.submit("first.fb2")
+            self.assertTrue(self.wait_for_status(first.id))
+            second = self.submit("second.fb2")
+            self.assertTrue(self.wait_for_status(second.id))
+            self.assertTrue(wait_for(lambda: first.id not in self.manager.jobs))
+
+        self.assertIn(second.id, self.manager.jobs)
+        job = self.manager.get_job(first.id)
+        self.assertEqual(job.status, "completed")
+        self.assertEqual(job.result.name, "first.fb2.mobi")
+
+    def test_recover(self):
+        path_to_file = self.work_dir / "uploads" / "stored" / "book.fb2"
+        path_to_file.parent.mkdir(parents=True)
+        path_to_file.write_bytes(b"book")
+        config = JobConfig(
+            Target("mobi", "ebook"), str(path_to_file), str(self.work_dir / "results" / "stored"))
+        self.manager.job_store.create(
+            config, get_processor_name(self.processor), job_id="stored")
+
+        jobs = self.manager.recover()
+        self.assertEqual([job.id for job in jobs], ["stored"])
+        self.assertTrue(self.wait_for_status("stored"))
+        self.assertEqual(self.manager.get_job("stored").result.read_bytes(), b"book")
+
+
+@unittest.skipIf(TestClient is None, "service dependencies are not installed")
+class JobEventBrokerTestCase(unittest.TestCase):
+    def test_latest_event_of_each_job(self):
+        async def run():
+            broker = JobEventBroker()
+            subscription = broker.subscribe({"first", "second"}, asyncio.get_running_loop())
+            for progress in (10, 20, 30):
+                broker.publish({"id": "first", "progress": progress})
+            broker.publish({"id": "second", "progress": 5})
+            broker.publish({"id": "other", "progress": 1})
+            await asyncio.sleep(0)
+            return await asyncio.wait_for(subscription.get(), 1)
+
+        events = asyncio.run(run())
+        self.assertEqual(
+            sorted(events, key=lambda event: event["id"]),
+            [{"id": "first", "progress": 30}, {"id": "second", "progress": 5}],
+        )
+
+    def test_publish_from_thread(self):
+        async def run():
+            broker = JobEventBroker()
+            subscription = broker.subscribe({"first"}, asyncio.get_running_loop())
+            thread = threading.Thread(target=broker.publish, args=({"id": "first"},))
+            thread.start()
+            events = await asyncio.wait_for(subscription.get(), 1)
+            thread.join()
+            return events
+
+        self.assertEqual(asyncio.run(run()), [{"id": "first"}])
+
+    def test_is_finished(self):
+        self.assertTrue(is_finished({"status": "completed", "result": "book.fb2.mobi"}))
+        self.assertTrue(is_finished({"status": "error", "error": "broken book"}))
+        # status of processor is not enough
+        self.assertFalse(is_finished({"status": "completed", "result": None}))
+        self.assertFalse(is_finished({"status": "processing", "result": "book.fb2.mobi"}))
+
+    def test_unsubscribe(self):
+        async def run():
+            broker = JobEventBroker()
+            loop = asyncio.get_running_loop()
+            first = broker.subscribe({"first", "second"}, loop)
+            other = broker.subscribe({"first"}, loop)
+            broker.unsubscribe(first)
+            broker.publish({"id": "first"})
+            self.assertEqual(await asyncio.wait_for(other.get(), 1), [{"id": "first"}])
+            self.assertFalse(first._ready.is_set())
+
+            broker.unsubscribe(other)
+            return broker._subscriptions
+
+        self.assertEqual(asyncio.run(run()), {})
+
+
+class EndpointsTestCase(ServiceTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch.object(app_main, "manager", self.manager)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = TestClient(app_main.app)
+
+    def upload(self, name="book.fb2", content=b"book"):
+        response = self.client.post(
+            "/jobs", files={"file": (name, content)}, data={"target": "mobi"})
+        self.assertEqual(response.status_code, 202)
+        return response.json()
+
+    def test_create_job_and_get_result(self):
+        job = self.upload()
+        self.assertEqual(job["filename"], "book.fb2")
+        self.assertTrue(self.wait_for_status(job["id"]))
+
+        response = self.client.get(f"/jobs/{job['id']}")
+        self.assertEqual(response.json()["status"], "completed")
+        self.assertEqual(response.json()["result"], "book.fb2.mobi")
+
+        response = self.client.get(f"/jobs/{job['id']}/result")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"book")
+
+    def test_result_of_job_in_progress(self):
+        self.processor.release.clear()
+        job = self.upload()
+        response = self.client.get(f"/jobs/{job['id']}/result")
+        self.assertEqual(response.status_code, 409)
+        self.processor.release.set()
+
+    def test_upload_with_wrong_name(self):
+        job = self.upload("..")
+        self.assertEqual(job["filename"], "book")
+        self.assertTrue(self.wait_for_status(job["id"]))
+
+    def test_upload_is_written_once(self):
+        boundary = "book-boundary"
+        content = b"line\r\n--book" * 1000
+        body = b"".join([
+            f"--{boundary}\r\n".encode(),
+            b'Content-Disposition: form-data; name="file"; filename="book.fb2"\r\n\r\n',
+            content,
+            f"\r\n--{boundary}\r\n".encode(),
+            b'Content-Disposition: form-data; name="target"\r\n\r\nepub',
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        # body is streamed by small chunks, field is sent after file
+        chunks = [body[index:index + 7] for index in range(0, len(body), 7)]
+        with patch("shutil.copyfileobj") as copy_file:
+            response = self.client.post(
+                "/jobs",
+                content=iter(chunks),
+                headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+            )
+        self.assertEqual(response.status_code, 202)
+        copy_file.assert_not_called()
+
+        job = response.json()
+        self.assertEqual(job["target"], "epub")
+        self.assertTrue(self.wait_for_status(job["id"]))
+        result = self.client.get(f"/jobs/{job['id']}/result")
+        self.assertEqual(result.content, content)
+
+    def test_wrong_upload(self):
+        response = self.client.post("/jobs", data={"target": "mobi"})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post("/jobs", content=b"book")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.manager.jobs, {})
+
+    def test_broken_upload_is_removed(self):
+        response = self.client.post(
+            "/jobs",
+            content=b'--b\r\nContent-Disposition: form-data; name="file"; filename="a"\r\n\r\nbo',
+            headers={"Content-Type": "multipart/form-data; boundary=b"},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list((self.work_dir / "uploads").iterdir()), [])
+
+    def read_events(self, response):
+        for line in response.iter_lines():
+            if line.startswith("data: "):
+                yield json.loads(line[len("data: "):])
+
+    def test_stream_events_until_jobs_are_finished(self):
+        self.processor.release.clear()
+        job = self.upload()
+        # test client reads the whole stream, so job is finished by timer
+        timer = threading.Timer(0.2, self.processor.release.set)
+        timer.start()
+
+        with self.client.stream("GET", f"/jobs/events?ids={job['id']},unknown") as response:
+            self.assertEqual(response.headers["content-type"], "text/event-stream; charset=utf-8")
+            # stream is closed by server when all jobs are finished
+            events = list(self.read_events(response))
+        timer.join()
+
+        # current state of jobs is sent first
+        statuses = {event["id"]: event["status"] for event in events[:2]}
+        self.assertEqual(statuses["unknown"], "error")
+        self.assertNotIn(statuses[job["id"]], ("completed", "error"))
+        self.assertEqual(events[-1]["id"], job["id"])
+        self.assertEqual(events[-1]["status"], "completed")
+        self.assertEqual(events[-1]["result"], "book.fb2.mobi")
+        self.assertTrue(wait_for(lambda: not self.manager.events._subscriptions))
+
+    def test_unsubscribe_on_disconnect(self):
+        self.processor.release.clear()
+        job = self.upload()
+
+        async def run():
+            response = await app_main.stream_jobs(ids=job["id"])
+            first = await anext(response.body_iterator)
+            subscribed = dict(self.manager.events._subscriptions)
+            # client is disconnected before job is finished
+            await response.body_iterator.aclose()
+            return first, subscribed
+
+        first, subscribed = asyncio.run(run())
+        self.processor.release.set()
+        self.assertIn(job["id"], first)
+        self.assertIn(job["id"], subscribed)
+        self.assertEqual(self.manager.events._subscriptions, {})
+
+    def test_stream_ids_are_limited(self):
+        ids = ",".join(str(index) for index in range(app_main.MAX_STREAMED_JOBS + 1))
+        self.assertEqual(self.client.get(f"/jobs/events?ids={ids}").status_code, 400)
+        self.assertEqual(self.client.get("/jobs/events?ids=,").status_code, 400)
+
+    def test_unknown_job(self):
+        self.assertEqual(self.client.get("/jobs/unknown").status_code, 404)
+        self.assertEqual(self.client.get("/jobs/unknown/result").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+from functools import partial
+from pathlib import Path
+from unittest.mock import patch
+
+from converter import Converter
+from tests.common import CopyProcessor
+from uis.batch import MANIFEST_NAME, Manifest, find_files
+from uis.cli_ui import ConverterInterfaceCLI
+
+
+class BatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp_dir.name) / "books"
+        for name in ("a.fb2", "b.epub", "notes.txt", "sub/c.fb2", "skip/d.fb2"):
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_find_files(self):
+        files = find_files(self.root, include=["*.fb2", "*.epub"], exclude=["skip"])
+        self.assertEqual(
+            [path.relative_to(self.root).as_posix() for path in files],
+            ["a.fb2", "b.epub", "sub/c.fb2"],
+        )
+
+    def test_manifest(self):
+        source = self.root / "a.fb2"
+        output = self.root / "a.fb2.mobi"
+        output.write_text("result")
+        manifest = Manifest(self.root / MANIFEST_NAME)
+        self.assertTrue(manifest.is_changed(source, "mobi"))
+
+        manifest.update(source, "mobi", output)
+        manifest.save()
+        manifest = Manifest(self.root / MANIFEST_NAME)
+        self.assertFalse(manifest.is_changed(source, "mobi"))
+        self.assertTrue(manifest.is_changed(source, "epub"))
+
+        # touched file with the same content is not changed
+        os.utime(source, (1, 1))
+        self.assertFalse(manifest.is_changed(source, "mobi"))
+
+        source.write_text("new content")
+        self.assertTrue(manifest.is_changed(source, "mobi"))
+
+        source.write_text("a.fb2")
+        output.unlink()
+        self.assertTrue(manifest.is_changed(source, "mobi"))
+
+    def test_manifest_save_if_due(self):
+        source = self.root / "a.fb2"
+        manifest = Manifest(self.root / MANIFEST_NAME, save_interval=60)
+        self.assertFalse(manifest.save_if_due())
+
+        # hash which was computed before is used
+        with patch("uis.batch.hash_file") as mocked:
+            manifest.update(source, "mobi", source, file_hash="computed")
+        mocked.assert_not_called()
+        self.assertFalse(manifest.save_if_due())
+        self.assertFalse(manifest.path.exists())
+
+        manifest.save_interval = 0
+        self.assertTrue(manifest.save_if_due())
+        self.assertFalse(manifest.save_if_due())
+        self.assertEqual(len(Manifest(manifest.path)), 1)
+
+    def test_manifest_is_saved_during_conversion(self):
+        saved = []
+        manifest_path = self.root / MANIFEST_NAME
+
+        class CheckingProcessor(CopyProcessor):
+            def send_job(self, filename, options=None):
+                saved.append(len(Manifest(manifest_path)) if manifest_path.exists() else 0)
+                return super().send_job(filename, options)
+
+        interface = ConverterInterfaceCLI()
+        interface.converter = Converter(interface, CheckingProcessor())
+        settings = {"-dir": str(self.root), "-include": "*.fb2", "-parallel": "1"}
+        with \
+                patch("builtins.print"),\
+                patch("uis.cli_ui.Manifest", partial(Manifest, save_interval=0)):
+            report = interface.convert_directory(settings)
+
+        # finished files are in manifest before the next one is converted
+        self.assertEqual(report.completed, 3)
+        self.assertEqual(saved, [0, 1, 2])
+        self.assertEqual(len(Manifest(manifest_path)), 3)
+
+    def test_convert_directory(self):
+        processor = CopyProcessor()
+        interface = ConverterInterfaceCLI()
+        interface.converter = Converter(interface, processor)
+        out = self.root / "out"
+        settings = {
+            "-dir": str(self.root), "-include": "*.fb2,*.epub", "-exclude": "skip",
+            "-out": str(out), "-parallel": "2",
+        }
+
+        with patch("builtins.print"):
+            report = interface.convert_directory(settings)
+        self.assertEqual(report.completed, 3)
+        self.assertEqual(sorted(processor.sent), ["a.fb2", "b.epub", "c.fb2"])
+        self.assertEqual((out / "sub" / "c.fb2.mobi").read_text(), "sub/c.fb2")
+
+        # only changed files are converted again, results in out dir are not sources
+        (self.root / "b.epub").write_text("changed")
+        processor.sent.clear()
+        with patch("builtins.print"):
+            report = interface.convert_directory({**settings, "-include": "*"})
+        self.assertEqual(sorted(processor.sent), ["b.epub", "notes.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+import unittest
+from unittest.mock import patch
+
+from benchmarks.run import compare, main, percentile, run_scenario
+
+
+class BenchmarksTestCase(unittest.TestCase):
+    def test_percentile(self):
+        samples = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(samples, 50), 50.0)
+        self.assertEqual(percentile(samples, 99), 99.0)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_run_scenario(self):
+        result = run_scenario(
+            "test", jobs=10, parallel=3, failure_rate=0.5, output_size=10, seed=1)
+        self.assertEqual(result["completed"] + result["failures"], 10)
+        self.assertTrue(result["failures"])
+        self.assertEqual(result["stages"]["send_job"]["count"], 10)
+        self.assertIn("p99", result["stages"]["get_result"])
+
+    def test_compare_with_baseline(self):
+        def results(books_per_minute, p99):
+            stage = {"p50": p99, "p95": p99, "p99": p99}
+            scenario = {
+                "books_per_minute": books_per_minute,
+                "job_overhead": 0.001,
+                "stages": {"save": stage},
+            }
+            return {"scenarios": {"throughput": scenario}}
+
+        baseline = results(1000, 0.01)
+        self.assertFalse(compare(results(950, 0.011), baseline, threshold=0.2))
+        # small changes of timings are noise
+        self.assertFalse(compare(results(1000, 0.0003), results(1000, 0.0001), threshold=0.2))
+
+        regressions = compare(results(500, 0.05), baseline, threshold=0.2)
+        self.assertEqual(len(regressions), 4)
+        self.assertTrue(regressions[0].startswith("throughput.books_per_minute"))
+
+    def test_missing_baseline(self):
+        with patch("sys.stderr"), patch("benchmarks.run.run_benchmarks") as mocked:
+            with self.assertRaises(SystemExit) as ex:
+                main(["--baseline", "not/existed/baseline.json"])
+        self.assertNotEqual(ex.exception.code, 0)
+        mocked.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
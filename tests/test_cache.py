@@ -0,0 +1,210 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import Mock, patch
+
+from cache import ResultCache, hash_file
+from config import JobConfig, Target
+from converter import Converter
+from single_flight import SingleFlight
+from tests.common import DummyUI
+
+
+class ResultCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+        self.cache = ResultCache(self.work_dir / "cache", max_size=100)
+        self.options = {"category": "ebook", "target": "mobi", "options": {}}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def create_file(self, name: str, content: bytes) -> Path:
+        path = self.work_dir / name
+        path.write_bytes(content)
+        return path
+
+    def test_make_key(self):
+        first = self.create_file("first.fb2", b"book")
+        second = self.create_file("second.fb2", b"book")
+        other = self.create_file("other.fb2", b"other book")
+
+        key = ResultCache.make_key(first, self.options)
+        self.assertEqual(key, ResultCache.make_key(second, dict(self.options)))
+        self.assertNotEqual(key, ResultCache.make_key(other, self.options))
+        self.assertNotEqual(key, ResultCache.make_key(first, {**self.options, "target": "epub"}))
+
+    def test_get_without_entry(self):
+        self.assertIsNone(self.cache.get("key", self.work_dir / "books"))
+
+    def test_put_and_get(self):
+        result = self.create_file("book.fb2.mobi", b"converted")
+        self.cache.put("key", result)
+
+        path = self.cache.get("key", self.work_dir / "books")
+        self.assertEqual(path, self.work_dir / "books" / "book.fb2.mobi")
+        self.assertEqual(path.read_bytes(), b"converted")
+        self.assertEqual(self.cache.size, len(b"converted"))
+
+    def test_get_for_other_source(self):
+        self.cache.put("key", self.create_file("alpha.fb2.mobi", b"converted"), "alpha.fb2")
+
+        path = self.cache.get("key", self.work_dir / "books", "dir/beta.fb2")
+        self.assertEqual(path, self.work_dir / "books" / "beta.fb2.mobi")
+        self.assertEqual(path.read_bytes(), b"converted")
+
+    def test_result_named_by_stem(self):
+        # remote processor names results by URL ("alpha.mobi")
+        self.cache.put("key", self.create_file("alpha.mobi", b"converted"), "alpha.fb2")
+        self.assertEqual(
+            self.cache.get("key", self.work_dir / "books", "beta.fb2").name, "beta.mobi")
+        self.assertEqual(self.cache.get("key", self.work_dir / "books").name, "alpha.mobi")
+
+        # source of entry is not cached file
+        cache = ResultCache(self.work_dir / "cache", max_size=100)
+        self.assertEqual(cache.size, len(b"converted"))
+        self.assertEqual(cache.get("key", self.work_dir / "other", "beta.fb2").name, "beta.mobi")
+
+    def test_copy_without_lock(self):
+        self.cache.put("key", self.create_file("book.fb2.mobi", b"converted"))
+
+        def copy(source, destination):
+            # other lookups are not blocked and entry can be evicted during copy
+            self.assertFalse(self.cache._lock.locked())
+            self.cache.clear()
+            destination.write_bytes(source.read())
+            return destination
+
+        with patch("cache.copy_file_fast", side_effect=copy):
+            path = self.cache.get("key", self.work_dir / "books")
+        self.assertEqual(path.read_bytes(), b"converted")
+
+    def test_put_removes_tmp_dir_on_error(self):
+        result = self.create_file("book.fb2.mobi", b"converted")
+        with patch.object(Path, "rename", side_effect=OSError("no space")):
+            self.assertIsNone(self.cache.put("key", result))
+
+        self.assertEqual(list((self.work_dir / "cache").iterdir()), [])
+        self.assertNotIn("key", self.cache)
+
+    def test_entry_removed_by_other_process(self):
+        self.cache.put("key", self.create_file("book.fb2.mobi", b"converted"))
+        shutil.rmtree(self.work_dir / "cache" / "key")
+
+        self.assertIsNone(self.cache.get("key", self.work_dir / "books"))
+        self.assertNotIn("key", self.cache)
+        self.assertEqual(self.cache.size, 0)
+
+    def test_entry_saved_by_other_process(self):
+        other = ResultCache(self.work_dir / "cache", max_size=100)
+        other.put("key", self.create_file("first.fb2.mobi", b"first"))
+
+        path = self.cache.put("key", self.create_file("second.fb2.mobi", b"second"))
+        self.assertEqual(path, self.work_dir / "cache" / "key" / "first.fb2.mobi")
+        self.assertEqual(path.read_bytes(), b"first")
+        self.assertIn("key", self.cache)
+        self.assertEqual(list((self.work_dir / "cache").iterdir()), [path.parent])
+
+    def test_evict_least_recently_used(self):
+        for key in ("first", "second", "third"):
+            self.cache.put(key, self.create_file(f"{key}.mobi", b"x" * 40))
+            if key == "second":
+                # use the first entry to make it recent
+                self.cache.get("first", self.work_dir / "books")
+
+        self.assertIn("first", self.cache)
+        self.assertNotIn("second", self.cache)
+        self.assertIn("third", self.cache)
+        self.assertLessEqual(self.cache.size, 100)
+
+    def test_restore_entries(self):
+        self.cache.put("key", self.create_file("book.mobi", b"converted"))
+
+        cache = ResultCache(self.work_dir / "cache", max_size=100)
+        self.assertIn("key", cache)
+        self.assertEqual(cache.size, len(b"converted"))
+
+
+class ConverterCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+        self.path_to_file = self.work_dir / "book.fb2"
+        self.path_to_file.write_bytes(b"book")
+        self.path_to_result = self.work_dir / "book.fb2.mobi"
+
+        def get_job_result(job_id):
+            self.path_to_result.write_bytes(b"converted")
+            return str(self.path_to_result)
+
+        def save_file(path_to_result, path_to_save):
+            path = Path(path_to_save) / Path(path_to_result).name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            return Path(path_to_result).rename(path)
+
+        self.processor = Mock(
+            send_job=Mock(return_value="test_id"),
+            get_job_status=lambda job_id: iter([]),
+            get_job_result=get_job_result,
+            save_file=save_file,
+            wait_for_moves=lambda path=None: {},
+        )
+        self.converter = Converter(
+            interface=DummyUI(),
+            processor=self.processor,
+            cache=ResultCache(self.work_dir / "cache"),
+        )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def get_config(self, path_to_save: str) -> JobConfig:
+        return JobConfig(
+            Target("mobi", "ebook"),
+            str(self.path_to_file),
+            str(self.work_dir / path_to_save),
+        )
+
+    def test_convert_from_cache(self):
+        first = self.converter._convert(self.get_config("first"))
+        second = self.converter._convert(self.get_config("second"))
+
+        self.processor.send_job.assert_called_once()
+        self.assertEqual(first.read_bytes(), b"converted")
+        self.assertEqual(second, self.work_dir / "second" / "book.fb2.mobi")
+        self.assertEqual(second.read_bytes(), b"converted")
+
+    def test_cached_result_is_named_by_source(self):
+        self.converter._convert(self.get_config("first"))
+
+        # the same content in file with other name
+        other = self.work_dir / "other.fb2"
+        other.write_bytes(b"book")
+        config = self.get_config("second")
+        config.path_to_file = str(other)
+        second = self.converter._convert(config)
+
+        self.processor.send_job.assert_called_once()
+        self.assertEqual(second, self.work_dir / "second" / "other.fb2.mobi")
+
+    def test_convert_without_cache(self):
+        self.converter.cache = None
+        self.converter._convert(self.get_config("first"))
+        self.converter._convert(self.get_config("second"))
+
+        self.assertEqual(self.processor.send_job.call_count, 2)
+
+    def test_file_is_hashed_once(self):
+        self.converter.single_flight = SingleFlight()
+        config = self.get_config("first")
+        with patch("converter.hash_file", wraps=hash_file) as mocked:
+            self.converter._convert(config)
+        mocked.assert_called_once()
+        # hash is kept in config to be reused (e.g. by manifest)
+        self.assertEqual(config.file_hash, hash_file(self.path_to_file))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ import os
 import unittest
 from unittest.mock import patch, Mock
 
+from config import JobConfig, Target
 from converter import Converter, ConvertError
 from tests.common import DummyJobProcessor, DummyUI, DummyWorker
 
@@ -132,6 +133,28 @@ class ConverterTestCase(unittest.TestCase):
             self.converter.error_handler(Exception("test error"))
             mocked.assert_called_once()
 
+    def test_display_upload_progress(self):
+        class UploadingProcessor(DummyJobProcessor):
+            def send_job(self, filename, options=None, upload_progress=None):
+                upload_progress(512 * 1024, 1024**2)
+                return filename
+
+        # processor is shared, so progress is shown only by converter of the job
+        processor = UploadingProcessor()
+        first, second = Mock(), Mock()
+        converters = [Converter(interface=ui, processor=processor) for ui in (first, second)]
+        config = JobConfig(Target("mobi", "ebook"), os.path.abspath(__file__))
+
+        converters[0].send_job(config)
+        first.display_common_info.assert_any_call(
+            "Uploaded 0.5 of 1.0 MB (50%)", status="uploading")
+        first.reset_mock()
+
+        converters[1].send_job(config)
+        second.display_common_info.assert_any_call(
+            "Uploaded 0.5 of 1.0 MB (50%)", status="uploading")
+        first.display_common_info.assert_not_called()
+
     def test_save(self):
         path_to_result = "path/to/result/file"
         with patch.object(self.converter.processor, "save_file") as mocked:
@@ -140,5 +163,74 @@ class ConverterTestCase(unittest.TestCase):
         self.assertEqual(res, path_to_result)
 
 
+
+class ConverterBatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.processor = Mock(
+            send_job=lambda path_to_file, options: path_to_file,
+            get_job_status=lambda job_id: iter([("processing", "in progress")]),
+            get_job_result=lambda job_id: f"{job_id}.mobi",
+            save_file=lambda path_to_result, path_to_save: f"{path_to_save}/{path_to_result}",
+            wait_for_moves=lambda path=None: {},
+        )
+        self.converter = Converter(interface=DummyUI(), processor=self.processor)
+        self.path_to_file = os.path.abspath(__file__)
+
+    def get_config(self, path_to_file: str) -> JobConfig:
+        return JobConfig(Target("mobi", "ebook"), path_to_file, "books")
+
+    def test_convert_many(self):
+        configs = [self.get_config(self.path_to_file) for _ in range(5)]
+        report = self.converter.convert_many(configs, max_parallel=3)
+
+        self.assertEqual(report.total, 5)
+        self.assertEqual(report.completed, 5)
+        self.assertFalse(report.failures)
+        self.assertEqual(
+            [job.result for job in report.jobs],
+            [f"books/{self.path_to_file}.mobi"] * 5,
+        )
+        self.assertIsNone(self.converter.config)
+
+    def test_convert_many_with_failed_job(self):
+        configs = [
+            self.get_config(self.path_to_file),
+            self.get_config("wrong/path/to/file"),
+        ]
+        with patch.object(self.converter.interface, "display_error") as mocked:
+            report = self.converter.convert_many(configs, max_parallel=2)
+        mocked.assert_called_once()
+
+        self.assertEqual(report.completed, 1)
+        self.assertEqual(len(report.failures), 1)
+        self.assertIs(report.failures[0].config, configs[1])
+        self.assertEqual(report.failures[0].error.args[0], "Invalid file path")
+
+    def test_convert_many_on_done(self):
+        configs = [self.get_config(self.path_to_file), self.get_config("wrong/path/to/file")]
+        done = []
+
+        def on_done(job):
+            done.append(job)
+            raise ValueError("broken callback")
+
+        with patch.object(self.converter.interface, "display_error") as mocked:
+            report = self.converter.convert_many(configs, max_parallel=2, on_done=on_done)
+
+        # error of callback does not break the batch
+        self.assertEqual(len(report.jobs), 2)
+        self.assertCountEqual(done, report.jobs)
+        self.assertEqual(mocked.call_count, 3)
+
+    def test_convert_many_with_wrong_parallel(self):
+        with self.assertRaises(ConvertError):
+            self.converter.convert_many([], max_parallel=0)
+
+    def test_batch_report_summary(self):
+        report = self.converter.convert_many([], max_parallel=1)
+        self.assertEqual(report.books_per_minute, 0.0)
+        self.assertIn("failures: 0", report.summary())
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,87 @@
+import os
+import unittest
+from unittest.mock import Mock
+
+from config import JobConfig, Target
+from converter import Converter
+from instrumentation import CONVERT_STAGE, PROCESSOR_CALL, Histogram, Instrumentation, Metrics
+from processors.scheduler import JobScheduler
+from tests.common import DummyUI
+
+
+class MetricsTestCase(unittest.TestCase):
+    def setUp(self):
+        self.instrumentation = Instrumentation()
+        self.metrics = Metrics(buckets=(0.1, 1))
+        self.metrics.connect(self.instrumentation)
+
+    def test_histogram_buckets(self):
+        histogram = Histogram((0.1, 1))
+        for value in (0.05, 0.1, 0.5, 3):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [("0.1", 2), ("1", 3), ("+Inf", 4)])
+        self.assertEqual(histogram.sum, 3.65)
+
+    def test_measure_error(self):
+        with self.assertRaises(ValueError):
+            with self.instrumentation.measure("call", processor="Test"):
+                raise ValueError
+
+        text = self.metrics.to_prometheus()
+        self.assertIn('call_errors_total{processor="Test"} 1', text)
+        self.assertIn('call_duration_seconds_count{processor="Test"} 1', text)
+        self.assertIn('call_duration_seconds_bucket{processor="Test",le="+Inf"} 1', text)
+
+    def test_prometheus_format(self):
+        self.instrumentation.record("call", 0.5, call='say "hi"')
+        self.metrics.inc("jobs_total", 2, status="completed")
+
+        self.assertEqual(self.metrics.to_prometheus().splitlines(), [
+            "# TYPE jobs_total counter",
+            'jobs_total{status="completed"} 2',
+            "# TYPE call_duration_seconds histogram",
+            'call_duration_seconds_bucket{call="say \\"hi\\"",le="0.1"} 0',
+            'call_duration_seconds_bucket{call="say \\"hi\\"",le="1"} 1',
+            'call_duration_seconds_bucket{call="say \\"hi\\"",le="+Inf"} 1',
+            'call_duration_seconds_sum{call="say \\"hi\\""} 0.5',
+            'call_duration_seconds_count{call="say \\"hi\\""} 1',
+        ])
+        self.assertEqual(self.metrics.to_dict()["counters"]["jobs_total"][0]["value"], 2)
+
+    def test_converter_stages(self):
+        events = []
+        self.instrumentation.finished.connect(lambda *args: events.append(args))
+        processor = Mock(
+            send_job=lambda path_to_file, options: "job",
+            get_job_status=lambda job_id: iter([]),
+            get_job_result=lambda job_id: "result.mobi",
+            save_file=lambda path_to_result, path_to_save: f"{path_to_save}/{path_to_result}",
+            wait_for_moves=lambda path=None: {},
+        )
+        converter = Converter(DummyUI(), processor, instrumentation=self.instrumentation)
+        config = JobConfig(Target("mobi", "ebook"), os.path.abspath(__file__), "books")
+        converter.convert_job(config)
+
+        self.assertEqual(
+            [labels["stage"] for name, _, labels, _ in events],
+            ["validate", "cache", "send", "process", "save"],
+        )
+        name, duration, labels, error = events[-1]
+        self.assertEqual(name, CONVERT_STAGE)
+        self.assertEqual(labels, {"stage": "save", "processor": "Mock", "source": "py", "target": "mobi"})
+        self.assertIsNone(error)
+
+    def test_scheduler_calls(self):
+        events = []
+        self.instrumentation.finished.connect(lambda *args: events.append(args))
+        scheduler = JobScheduler(1, instrumentation=self.instrumentation)
+        job = scheduler.submit(1, ["true"])
+        scheduler.wait_started(job, timeout=5)
+        scheduler.monitor.wait(1, timeout=5)
+
+        self.assertEqual([labels["call"] for _, _, labels, _ in events], ["queue_wait", "spawn"])
+        self.assertTrue(all(name == PROCESSOR_CALL for name, *_ in events))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,155 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from config import JobConfig, Target
+from converter import Converter
+from job_store import JobStore, get_processor_name
+from tests.common import DummyUI
+
+
+class FakeProcessor:
+    """Processor which keeps jobs on "server" and can be attached to them after restart."""
+
+    def __init__(self, alive_jobs: set | None = None) -> None:
+        self.alive_jobs = alive_jobs if alive_jobs is not None else set()
+        self.sent: list[str] = []
+        self.attached: list[str] = []
+
+    def set_status(self, status: str) -> None:
+        pass
+
+    def send_job(self, filename: str, options: dict | None = None) -> str:
+        job_id = f"job_{len(self.sent)}"
+        self.sent.append(filename)
+        self.alive_jobs.add(job_id)
+        return job_id
+
+    def get_job_state(self, job_id: str) -> dict:
+        return {"server": "test"}
+
+    def attach_job(self, job_id: str, state: dict) -> bool:
+        self.attached.append(job_id)
+        return job_id in self.alive_jobs and state == {"server": "test"}
+
+    def get_job_status(self, job_id: str):
+        yield "processing", "in progress"
+
+    def get_job_result(self, job_id: str) -> str:
+        return f"{job_id}.mobi"
+
+    def save_file(self, path_to_result: str, path_to_save: str) -> str:
+        return f"{path_to_save}/{path_to_result}"
+
+
+class JobStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = JobStore(Path(self.tmp_dir.name) / "jobs.db")
+        self.config = JobConfig(Target("mobi", "ebook"), "book.fb2", "books")
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_wal_mode(self):
+        with sqlite3.connect(self.store.path) as connection:
+            mode = connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.assertEqual(mode, "wal")
+
+    def test_job_lifecycle(self):
+        job_id = self.store.create(self.config, "FakeProcessor")
+        stored = self.store.get(job_id)
+        self.assertEqual(stored.status, "queued")
+        self.assertEqual(stored.config, self.config)
+        self.assertIsNone(stored.external_id)
+
+        self.store.set_sent(job_id, 42, {"file_to_save": "book.fb2.mobi"})
+        stored = self.store.get(job_id)
+        self.assertEqual(stored.status, "running")
+        self.assertEqual(stored.external_id, "42")
+        self.assertEqual(stored.state, {"file_to_save": "book.fb2.mobi"})
+
+        self.store.set_status(job_id, "completed", result=Path("books/book.mobi"))
+        self.assertEqual(self.store.get(job_id).result, "books/book.mobi")
+        self.assertIsNone(self.store.get("unknown"))
+
+    def test_unfinished_jobs_are_kept_after_reopen(self):
+        queued = self.store.create(self.config, "FakeProcessor")
+        running = self.store.create(self.config, "FakeProcessor")
+        self.store.set_sent(running, "job_0")
+        done = self.store.create(self.config, "FakeProcessor")
+        self.store.set_status(done, "completed")
+        self.store.create(self.config, "OtherProcessor")
+        self.store.close()
+
+        self.store = JobStore(self.store.path)
+        unfinished = self.store.get_unfinished("FakeProcessor")
+        self.assertEqual([job.id for job in unfinished], [queued, running])
+        self.assertEqual(len(self.store.get_unfinished()), 3)
+
+    def test_unfinished_statuses_are_bound(self):
+        queued = self.store.create(self.config, "FakeProcessor")
+        running = self.store.create(self.config, "FakeProcessor")
+        self.store.set_sent(running, "job_0")
+
+        # one status is not rendered as tuple with trailing comma
+        with patch("job_store.UNFINISHED_STATUSES", ("queued",)):
+            unfinished = self.store.get_unfinished("FakeProcessor")
+        self.assertEqual([job.id for job in unfinished], [queued])
+
+
+class ConverterRecoveryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = JobStore(Path(self.tmp_dir.name) / "jobs.db")
+        self.config = JobConfig(Target("mobi", "ebook"), os.path.abspath(__file__), "books")
+
+    def tearDown(self):
+        self.store.close()
+        self.tmp_dir.cleanup()
+
+    def test_convert_saves_job(self):
+        processor = FakeProcessor()
+        converter = Converter(DummyUI(), processor, job_store=self.store)
+        store_id = self.store.create(self.config, get_processor_name(processor))
+        converter.convert_job(self.config, store_id=store_id)
+
+        stored = self.store.get(store_id)
+        self.assertEqual(stored.status, "completed")
+        self.assertEqual(stored.external_id, "job_0")
+        self.assertEqual(stored.result, "books/job_0.mobi")
+        self.assertFalse(self.store.get_unfinished())
+
+    def test_resume_attaches_running_jobs(self):
+        processor = FakeProcessor(alive_jobs={"job_7"})
+        name = get_processor_name(processor)
+        running = self.store.create(self.config, name)
+        self.store.set_sent(running, "job_7", processor.get_job_state("job_7"))
+        queued = self.store.create(self.config, name)
+        lost = self.store.create(self.config, name)
+        self.store.set_sent(lost, "job_8", processor.get_job_state("job_8"))
+
+        converter = Converter(DummyUI(), processor, job_store=self.store)
+        with patch.object(converter.interface, "display_error") as mocked:
+            report = converter.resume_jobs(max_parallel=1)
+        mocked.assert_called_once()
+
+        # running job is not sent again, queued job is sent from the start
+        self.assertEqual(processor.attached, ["job_7", "job_8"])
+        self.assertEqual(len(processor.sent), 1)
+        self.assertEqual(report.completed, 2)
+        self.assertEqual(report.jobs[0].result, "books/job_7.mobi")
+
+        self.assertEqual(self.store.get(running).status, "completed")
+        self.assertEqual(self.store.get(queued).external_id, "job_0")
+        self.assertEqual(self.store.get(lost).status, "error")
+        self.assertIn("job_8 was lost", self.store.get(lost).error)
+        self.assertFalse(self.store.get_unfinished())
+
+
+if __name__ == "__main__":
+    unittest.main()
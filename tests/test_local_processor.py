@@ -0,0 +1,200 @@
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from processors import ProcessorError
+from processors.local_processor import LocalProcessor
+from processors.monitor import ProcessMonitor
+from processors.scheduler import JobScheduler
+
+CONVERT_SCRIPT = """
+import sys, time
+print("10% Converting input", flush=True)
+time.sleep(float(sys.argv[2]))
+print("100% Done", flush=True)
+open(sys.argv[1], "w").write("converted")
+sys.exit(int(sys.argv[3]))
+"""
+
+
+def sleep_command(seconds: float) -> list[str]:
+    return [sys.executable, "-c", f"import time; time.sleep({seconds})"]
+
+
+def start_process(script: str) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-c", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+
+class ProcessMonitorTestCase(unittest.TestCase):
+    def test_watch_many_processes(self):
+        monitor = ProcessMonitor()
+        threads_count = threading.active_count()
+        script = "import sys; print('first'); print('error', file=sys.stderr); print('second', end='')"
+        for job_id in range(20):
+            monitor.watch(job_id, start_process(script))
+
+        for job_id in range(20):
+            events = list(monitor.iter_events(job_id))
+            self.assertEqual(sorted(events), [("stderr", "error"), ("stdout", "first"), ("stdout", "second")])
+            self.assertEqual(monitor.wait(job_id, timeout=5), 0)
+
+        # all processes are read by one thread
+        self.assertEqual(threading.active_count(), threads_count + 1)
+
+    def test_exit_code_and_callback(self):
+        monitor = ProcessMonitor()
+        exited = []
+        job = monitor.watch(
+            1, start_process("import sys; sys.exit(3)"), on_exit=lambda job: exited.append(job.job_id))
+
+        self.assertEqual(monitor.wait(1, timeout=5), 3)
+        self.assertEqual(exited, [1])
+        self.assertTrue(job.done.is_set())
+        with self.assertRaises(ProcessorError):
+            monitor.get_job(1)
+
+
+class JobSchedulerTestCase(unittest.TestCase):
+    def test_limit_running_jobs(self):
+        scheduler = JobScheduler(max_jobs=2)
+        jobs = [scheduler.submit(job_id, sleep_command(0.2)) for job_id in range(4)]
+
+        self.assertEqual(scheduler.running, 2)
+        self.assertEqual(scheduler.queued, 2)
+        self.assertFalse(jobs[3].started.is_set())
+
+        for job in jobs:
+            scheduler.wait_started(job, timeout=5).wait()
+        self.assertEqual(scheduler.queued, 0)
+
+    def test_default_limit(self):
+        with patch("processors.scheduler.get_available_cores", return_value=[0, 1, 2]):
+            scheduler = JobScheduler()
+        self.assertEqual(scheduler.max_jobs, 3)
+
+    def test_start_error(self):
+        scheduler = JobScheduler(max_jobs=1)
+        job = scheduler.submit(1, ["not-existed-command-to-convert"])
+
+        with self.assertRaises(ProcessorError):
+            scheduler.wait_started(job)
+        self.assertEqual(scheduler.running, 0)
+
+    def test_pin_cores_and_niceness(self):
+        with patch("processors.scheduler.get_available_cores", return_value=[0]):
+            scheduler = JobScheduler(max_jobs=2, pin_cores=True, niceness=5)
+
+        with patch("processors.scheduler.os.sched_setaffinity") as mocked_affinity, \
+                patch("processors.scheduler.os.setpriority") as mocked_priority:
+            first = scheduler.submit(1, sleep_command(0))
+            second = scheduler.submit(2, sleep_command(0))
+
+        self.assertEqual(first.core, 0)
+        self.assertIsNone(second.core)
+        mocked_affinity.assert_called_once_with(first.process.pid, {0})
+        self.assertEqual(mocked_priority.call_count, 2)
+        for job in (first, second):
+            job.process.wait()
+
+
+class LocalProcessorTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+        self.processor = LocalProcessor(max_jobs=2)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def send_job(self, name: str, seconds: float = 0, exit_code: int = 0) -> int:
+        path_to_file = self.work_dir / name
+        path_to_file.write_text("book")
+        command = {
+            "command": [
+                sys.executable, "-c", CONVERT_SCRIPT,
+                f"{path_to_file}.mobi", str(seconds), str(exit_code),
+            ],
+            "file_to_save": f"{path_to_file}.mobi",
+        }
+        with patch.object(self.processor, "_prepare_command", return_value=command):
+            return self.processor.send_job(str(path_to_file), {"target": "mobi", "options": {}})
+
+    def test_convert(self):
+        job_id = self.send_job("book.fb2")
+        statuses = list(self.processor.get_job_status(job_id))
+        result = self.processor.get_job_result(job_id)
+        path = self.processor.save_file(result, self.work_dir / "books")
+
+        self.assertEqual(
+            [message for _, message in statuses],
+            ["10% Converting input", "100% Done", "Process exited with code 0"],
+        )
+        self.assertEqual([status for status, _ in statuses], ["processing"] * 2 + ["completed"])
+        self.assertEqual(path, self.work_dir / "books" / "book.fb2.mobi")
+        self.assertEqual(path.read_text(), "converted")
+
+    def test_queue_jobs(self):
+        started = time.monotonic()
+        job_ids = [self.send_job(f"book_{index}.fb2", seconds=0.3) for index in range(4)]
+        self.assertEqual(self.processor.scheduler.running, 2)
+
+        for job_id in job_ids:
+            list(self.processor.get_job_status(job_id))
+            self.processor.get_job_result(job_id)
+        self.assertGreaterEqual(time.monotonic() - started, 0.6)
+
+    def test_status_of_overlapped_jobs(self):
+        slow = self.send_job("slow.fb2", seconds=0.3, exit_code=1)
+        fast = self.send_job("fast.fb2")
+        slow_statuses = self.processor.get_job_status(slow)
+        self.assertEqual(next(slow_statuses), ("processing", "10% Converting input"))
+
+        self.assertEqual(list(self.processor.get_job_status(fast))[-1][0], "completed")
+        # status of slow job does not depend on finished one
+        self.assertEqual(next(slow_statuses), ("processing", "100% Done"))
+        self.assertEqual(next(slow_statuses), ("error", "Process exited with code 1"))
+        self.processor.get_job_result(fast)
+        with self.assertRaises(ProcessorError):
+            self.processor.get_job_result(slow)
+
+    def test_failed_job(self):
+        job_id = self.send_job("book.fb2")
+        self.processor.processes[job_id] = (self.processor.processes[job_id][0], "result")
+        with patch.object(self.processor.scheduler.monitor, "wait", return_value=1), \
+                patch.object(self.processor.scheduler.monitor, "get_job") as mocked_job:
+            mocked_job.return_value.stderr_tail = ["Conversion error"]
+            with self.assertRaises(ProcessorError) as ex:
+                self.processor.get_job_result(job_id)
+        self.assertIn("Conversion error", ex.exception.args[0])
+
+    def test_background_moves(self):
+        processor = LocalProcessor(background_moves=True)
+        result = self.work_dir / "book.fb2.mobi"
+        result.write_text("converted")
+
+        path = processor.save_file(str(result), self.work_dir / "books")
+        self.assertEqual(processor.wait_for_moves(), {})
+        self.assertEqual(path.read_text(), "converted")
+        self.assertFalse(result.exists())
+
+    def test_background_move_error(self):
+        processor = LocalProcessor(background_moves=True)
+        path = processor.save_file(str(self.work_dir / "not_existed.mobi"), self.work_dir / "books")
+
+        errors = processor.wait_for_moves(path)
+        self.assertIsInstance(errors[path], FileNotFoundError)
+        self.assertEqual(processor.wait_for_moves(), {})
+
+    def test_get_result_of_unknown_job(self):
+        with self.assertRaises(ProcessorError):
+            self.processor.get_job_result(100)
+
+
+if __name__ == "__main__":
+    unittest.main()
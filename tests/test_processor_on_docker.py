@@ -0,0 +1,344 @@
+import itertools
+import tempfile
+import threading
+import unittest
+from collections import namedtuple
+from pathlib import Path
+from unittest.mock import patch
+
+from docker.errors import ImageNotFound
+
+from processors import ProcessorError
+from processors.container_pool import CONTAINER_WORKDIR, ContainerPool
+from processors.processor_on_docker import (
+    DOCKERFILE_HASH_LABEL,
+    IMAGE_NAME,
+    ProcessorOnDocker,
+    get_dockerfile_hash,
+    init_container,
+    iter_output_lines,
+)
+
+ExecResult = namedtuple("ExecResult", "exit_code,output")
+
+
+class FakeContainer:
+    ids = itertools.count()
+
+    def __init__(self, volumes: list[str]) -> None:
+        self.id = f"container_{next(self.ids)}"
+        self.status = "running"
+        self.removed = False
+        self.commands: list[list[str]] = []
+        host_dir, container_dir = volumes[0].split(":")
+        self.mount = (Path(host_dir), container_dir)
+
+    def reload(self) -> None:
+        pass
+
+    def remove(self, force: bool = False) -> None:
+        self.removed = True
+        self.status = "removed"
+
+    def exec_run(self, command: list[str], workdir: str, exit_code: int = 0) -> ExecResult:
+        self.commands.append(command)
+        host_dir, container_dir = self.mount
+        job_dir = host_dir / Path(workdir).relative_to(container_dir)
+
+        # emulate converting of staged file, failed command leaves partial file
+        _, path_to_file, path_to_save = command[:3]
+        if (job_dir / path_to_file).is_file():
+            (job_dir / path_to_save).write_bytes(b"converted")
+        return ExecResult(
+            exit_code, iter([b"10% Converting input\n50% Running transforms\n", b"Done\n"]))
+
+
+class FakeAPIClient:
+    """Low-level API which runs exec in fake containers."""
+
+    def __init__(self, containers: "FakeContainers") -> None:
+        self.containers = containers
+        self.execs: dict[str, tuple] = {}
+        self.exit_code = 0
+
+    def exec_create(self, container_id: str, command: list[str], workdir: str) -> dict:
+        exec_id = f"exec_{len(self.execs)}"
+        self.execs[exec_id] = (self.containers.get(container_id), command, workdir)
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id: str, stream: bool = False):
+        container, command, workdir = self.execs[exec_id]
+        result = container.exec_run(command, workdir, self.exit_code)
+        self.execs[exec_id] = result
+        return result.output
+
+    def exec_inspect(self, exec_id: str) -> dict:
+        return {"ExitCode": self.execs[exec_id].exit_code}
+
+
+class FakeContainers:
+    def __init__(self) -> None:
+        self.created: list[FakeContainer] = []
+
+    def run(self, image: str, volumes: list[str], command: list[str], detach: bool) -> FakeContainer:
+        container = FakeContainer(volumes)
+        self.created.append(container)
+        return container
+
+    def get(self, container_id: str) -> FakeContainer:
+        return next(container for container in self.created if container.id == container_id)
+
+
+class FakeImage:
+    def __init__(self, labels: dict) -> None:
+        self.labels = labels
+
+
+class FakeImages:
+    def __init__(self, image: FakeImage | None = None) -> None:
+        self.image = image
+
+    def get(self, name: str) -> FakeImage:
+        if self.image is None:
+            raise ImageNotFound(name)
+        return self.image
+
+
+class FakeDockerClient:
+    def __init__(self, image: FakeImage | None = None) -> None:
+        self.containers = FakeContainers()
+        self.images = FakeImages(image)
+        self.api = FakeAPIClient(self.containers)
+
+
+class ContainerPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.client = FakeDockerClient()
+        self.pool = ContainerPool(
+            self.client, IMAGE_NAME, size=2, max_jobs=2, workspace=self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_reuse_container(self):
+        container = self.pool.acquire()
+        self.pool.release(container)
+
+        self.assertIs(self.pool.acquire(), container)
+        self.assertEqual(len(self.client.containers.created), 1)
+
+    def test_pool_size(self):
+        self.pool.acquire()
+        self.pool.acquire()
+        with self.assertRaises(ProcessorError):
+            self.pool.acquire(timeout=0.01)
+        self.assertEqual(len(self.client.containers.created), 2)
+
+    def test_recycle_container(self):
+        container = self.pool.acquire()
+        self.pool.release(container)
+        self.pool.acquire()
+        self.pool.release(container)
+
+        new_container = self.pool.acquire()
+        self.assertTrue(container.removed)
+        self.assertIsNot(new_container, container)
+
+    def test_replace_unhealthy_container(self):
+        container = self.pool.acquire()
+        self.pool.release(container)
+        container.status = "exited"
+
+        new_container = self.pool.acquire()
+        self.assertTrue(container.removed)
+        self.assertEqual(new_container.status, "running")
+
+    def test_close(self):
+        container = self.pool.acquire()
+        self.pool.release(container)
+        self.pool.close()
+        self.assertTrue(container.removed)
+
+    def test_job_dir(self):
+        host_dir, container_dir = self.pool.get_job_dir("job")
+        self.assertEqual(host_dir, Path(self.tmp_dir.name).resolve() / "job")
+        self.assertEqual(container_dir, f"{CONTAINER_WORKDIR}/job")
+
+
+class OutputLinesTestCase(unittest.TestCase):
+    def test_lines_split_across_chunks(self):
+        data = "45% Converting input\nКонвертация книги\n\n100% Done".encode()
+        # split inside of line and inside of two-byte character
+        cyrillic = data.index("Конвертация".encode()) + 5
+        chunks = [data[:2], data[2:cyrillic], data[cyrillic:]]
+        self.assertEqual(
+            list(iter_output_lines(chunks)),
+            ["45% Converting input", "Конвертация книги", "100% Done"],
+        )
+
+    def test_broken_character(self):
+        self.assertEqual(list(iter_output_lines([b"Done \xd0\n"])), ["Done \ufffd"])
+
+
+class ProcessorOnDockerPoolTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+        self.path_to_file = self.work_dir / "book.fb2"
+        self.path_to_file.write_bytes(b"book")
+
+        self.client = FakeDockerClient()
+        self.processor = ProcessorOnDocker(
+            client=self.client, pool_size=1, workspace=self.work_dir / "workspace")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def convert(self) -> Path:
+        options = {"target": "mobi", "category": "ebook", "options": {}}
+        job_id = self.processor.send_job(str(self.path_to_file), options)
+        statuses = list(self.processor.get_job_status(job_id))
+        self.assertEqual(statuses[0], ("processing", "10% Converting input"))
+        self.assertEqual(statuses[-1], ("completed", "Process exited with code 0"))
+        self.assertEqual(len(statuses), 4)
+
+        result = self.processor.get_job_result(job_id)
+        return self.processor.save_file(result, self.work_dir / "books")
+
+    def test_convert_in_pool(self):
+        first = self.convert()
+        second = self.convert()
+
+        self.assertEqual(first, self.work_dir / "books" / "book.fb2.mobi")
+        self.assertEqual(second.read_bytes(), b"converted")
+        self.assertEqual(len(self.client.containers.created), 1)
+
+        container = self.client.containers.created[0]
+        self.assertEqual(container.commands[0], ["ebook-convert", "book.fb2", "book.fb2.mobi"])
+        self.assertEqual(list((self.work_dir / "workspace").iterdir()), [])
+
+    def test_result_was_not_created(self):
+        options = {"target": "mobi", "category": "ebook", "options": {}}
+        job_id = self.processor.send_job(str(self.path_to_file), options)
+        job = self.processor.pooled_jobs[job_id]
+        (job.file_to_save.parent / "book.fb2").unlink()
+        job.file_to_save.unlink()
+
+        with self.assertRaises(ProcessorError):
+            self.processor.get_job_result(job_id)
+        # container is returned to pool after failed job
+        self.assertFalse(self.processor.pool._idle.empty())
+
+    def test_status_of_split_output(self):
+        options = {"target": "mobi", "category": "ebook", "options": {}}
+        job_id = self.processor.send_job(str(self.path_to_file), options)
+        # the second chunk ends inside of "К"
+        data = "45% Converting input\nКнига\n".encode()
+        self.processor.pooled_jobs[job_id].output = iter([data[:2], data[2:22], data[22:]])
+
+        statuses = list(self.processor.get_job_status(job_id))
+        self.assertEqual(
+            [message for _, message in statuses[:2]], ["45% Converting input", "Книга"])
+        self.processor.get_job_result(job_id)
+
+    def test_status_of_overlapped_jobs(self):
+        self.processor.pool = ContainerPool(
+            self.client, IMAGE_NAME, size=2, workspace=self.work_dir / "workspace")
+        options = {"target": "mobi", "category": "ebook", "options": {}}
+        self.client.api.exit_code = 1
+        failed = self.processor.send_job(str(self.path_to_file), options)
+        self.client.api.exit_code = 0
+        completed = self.processor.send_job(str(self.path_to_file), options)
+
+        failed_statuses = self.processor.get_job_status(failed)
+        self.assertEqual(next(failed_statuses)[0], "processing")
+        self.assertEqual(list(self.processor.get_job_status(completed))[-1][0], "completed")
+        # status of failed job does not depend on finished one
+        self.assertEqual(list(failed_statuses)[-1][0], "error")
+
+    def test_failed_command(self):
+        self.client.api.exit_code = 1
+        options = {"target": "mobi", "category": "ebook", "options": {}}
+        job_id = self.processor.send_job(str(self.path_to_file), options)
+        statuses = list(self.processor.get_job_status(job_id))
+        self.assertEqual(statuses[-1], ("error", "Process exited with code 1"))
+        job = self.processor.pooled_jobs[job_id]
+        self.assertTrue(job.file_to_save.is_file())
+
+        # partial result is not used
+        with self.assertRaisesRegex(ProcessorError, "exit code 1.*Done"):
+            self.processor.get_job_result(job_id)
+        self.assertFalse(job.file_to_save.parent.exists())
+        self.assertFalse(self.processor.pool._idle.empty())
+
+
+class DockerInitTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+        self.path_to_file = self.work_dir / "book.fb2"
+        self.path_to_file.write_bytes(b"book")
+        self.options = {"target": "mobi", "category": "ebook", "options": {}}
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_skip_build_of_actual_image(self):
+        client = FakeDockerClient(FakeImage({DOCKERFILE_HASH_LABEL: get_dockerfile_hash()}))
+        with patch("processors.processor_on_docker.build_image") as mocked:
+            self.assertIs(init_container(client=client), client)
+        mocked.assert_not_called()
+
+    def test_build_changed_or_missed_image(self):
+        dockerfile_hash = get_dockerfile_hash()
+        for image in (FakeImage({DOCKERFILE_HASH_LABEL: "old"}), None):
+            with patch("processors.processor_on_docker.build_image") as mocked:
+                init_container(client=FakeDockerClient(image))
+            mocked.assert_called_once()
+            self.assertEqual(
+                mocked.call_args.kwargs["labels"], {DOCKERFILE_HASH_LABEL: dockerfile_hash})
+
+    def test_jobs_wait_for_image(self):
+        client = FakeDockerClient()
+        image_is_built = threading.Event()
+
+        def init_container(rebuild):
+            image_is_built.wait(5)
+            return client
+
+        with patch("processors.processor_on_docker.init_container", init_container):
+            processor = ProcessorOnDocker()
+            self.assertFalse(processor.is_ready())
+
+            job_ids = []
+            sender = threading.Thread(
+                target=lambda: job_ids.append(
+                    processor.send_job(str(self.path_to_file), self.options)))
+            sender.start()
+            sender.join(0.1)
+            self.assertEqual(job_ids, [])
+
+            image_is_built.set()
+            sender.join(5)
+
+        self.assertTrue(processor.is_ready())
+        self.assertIs(processor.client, client)
+        self.assertEqual(job_ids, [client.containers.created[0].id])
+
+    def test_failed_init(self):
+        def init_container(rebuild):
+            raise ConnectionError("daemon is not running")
+
+        with patch("processors.processor_on_docker.init_container", init_container):
+            processor = ProcessorOnDocker()
+            with self.assertRaises(ProcessorError) as ex:
+                processor.send_job(str(self.path_to_file), self.options)
+        self.assertIn("daemon is not running", str(ex.exception))
+
+        processor = ProcessorOnDocker(client=FakeDockerClient(), ready_timeout=0)
+        self.assertTrue(processor.is_ready())
+
+
+if __name__ == "__main__":
+    unittest.main()
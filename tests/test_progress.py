@@ -0,0 +1,73 @@
+import unittest
+from unittest.mock import Mock, patch
+
+from converter import Converter
+from progress import ProgressEvent, ProgressTracker, parse_progress
+from tests.common import DummyUI
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ProgressTestCase(unittest.TestCase):
+    def test_parse_progress(self):
+        self.assertEqual(
+            parse_progress("34% Running transforms on e-book..."),
+            ProgressEvent(34, "Running transforms on e-book..."),
+        )
+        self.assertEqual(parse_progress(" 1.5% Converting input"), ProgressEvent(1.5, "Converting input"))
+        self.assertEqual(parse_progress("100%"), ProgressEvent(100, ""))
+
+    def test_parse_other_lines(self):
+        self.assertIsNone(parse_progress("Output saved to book.mobi"))
+        self.assertIsNone(parse_progress("Compression 50% of file"))
+        self.assertIsNone(parse_progress("150% wrong"))
+
+    def test_tracker_throttle(self):
+        clock = FakeClock()
+        tracker = ProgressTracker(interval=10, clock=clock)
+
+        sent = []
+        for step in range(1, 101):
+            clock.now = step
+            event = tracker.update(ProgressEvent(step, "stage"))
+            if event is not None:
+                sent.append(event.percent)
+
+        self.assertEqual(sent, [1, 11, 21, 31, 41, 51, 61, 71, 81, 91, 100])
+
+    def test_tracker_eta(self):
+        clock = FakeClock()
+        tracker = ProgressTracker(interval=0, clock=clock)
+
+        self.assertIsNone(tracker.update(ProgressEvent(0, "start")).eta)
+        clock.now = 10
+        self.assertEqual(tracker.update(ProgressEvent(25, "stage")).eta, 30)
+
+
+class ConverterProgressTestCase(unittest.TestCase):
+    def test_get_result_with_progress(self):
+        lines = [("processing", f"{percent}% Converting") for percent in range(101)]
+        lines.append(("processing", "Output saved"))
+        processor = Mock(
+            get_job_status=lambda job_id: iter(lines),
+            get_job_result=lambda job_id: "result",
+        )
+        converter = Converter(DummyUI(), processor, progress_interval=60)
+
+        with patch.object(converter.interface, "display_progress") as mocked_progress, \
+                patch.object(converter.interface, "display_common_info") as mocked_info:
+            self.assertEqual(converter.get_result("test_id"), "result")
+
+        self.assertEqual(
+            [call.args[0].percent for call in mocked_progress.call_args_list], [0, 100])
+        mocked_info.assert_called_once_with("Output saved", status="processing")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import subprocess
+import sys
+import unittest
+
+from processors.local_processor import LocalProcessor
+from registry import Registry, RegistryError, processors
+
+
+class RegistryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.registry = Registry("processor")
+        self.registry.register("local", "processors.local_processor:LocalProcessor")
+
+    def test_load(self):
+        self.assertIs(self.registry.load("local"), LocalProcessor)
+        self.assertIsInstance(self.registry.create("local", max_jobs=1), LocalProcessor)
+        self.assertIn("local", self.registry)
+        self.assertEqual(processors.names(), ["docker", "local", "remote"])
+
+    def test_load_by_path(self):
+        self.assertIs(self.registry.load("processors.local_processor:LocalProcessor"), LocalProcessor)
+
+    def test_errors(self):
+        with self.assertRaises(RegistryError):
+            self.registry.load("unknown")
+        with self.assertRaises(RegistryError):
+            self.registry.load("processors.local_processor:Unknown")
+        with self.assertRaises(RegistryError):
+            self.registry.register("wrong", "processors.local_processor")
+
+    def test_not_selected_plugins_are_not_imported(self):
+        code = (
+            "import sys, registry\n"
+            "registry.processors.load('local'); registry.uis.load('cli')\n"
+            "print(sorted({'docker', 'tkinter', 'requests'} & set(sys.modules)))\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertEqual(result.stdout.strip(), "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,217 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from config import HTTPConfig, PollingConfig
+from processors import ProcessorError
+from processors.remote_processor import JobProcessorRemote, parse_retry_after, poll_intervals
+from tests.common import LocalHTTPServer
+from utils import MultipartFileStream, create_session, get_connection_stats
+
+
+def to_json(data: dict) -> bytes:
+    return json.dumps(data).encode()
+
+
+class SessionTestCase(unittest.TestCase):
+    def test_reuse_connections(self):
+        routes = {"/job": [(200, b"{}")]}
+        with LocalHTTPServer(routes) as server:
+            session = create_session()
+            for _ in range(5):
+                session.get(f"{server.url}/job", timeout=1)
+
+        stats = get_connection_stats(session)
+        self.assertEqual(stats["requests"], 5)
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["reused"], 4)
+
+    def test_without_keep_alive(self):
+        session = create_session(HTTPConfig(keep_alive=False))
+        self.assertEqual(session.headers["Connection"], "close")
+
+    def test_retry_server_errors(self):
+        routes = {"/job": [(503, b""), (502, b""), (200, b"ok")]}
+        with LocalHTTPServer(routes) as server:
+            session = create_session(HTTPConfig(backoff_factor=0))
+            response = session.get(f"{server.url}/job", timeout=1)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(server.requests), 3)
+
+    def test_do_not_retry_post(self):
+        routes = {"/job": [(503, b""), (200, b"ok")]}
+        with LocalHTTPServer(routes) as server:
+            session = create_session(HTTPConfig(backoff_factor=0))
+            response = session.post(f"{server.url}/job", timeout=1)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(server.requests), 1)
+
+
+class JobProcessorRemoteTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_requests_use_one_session(self):
+        completed = {
+            "status": {"code": "completed", "info": "done"},
+            "errors": [],
+            "output": [{"uri": "/download/book.mobi"}],
+        }
+        routes = {
+            "/jobs/test_ID": [(200, to_json(completed))],
+            "/download/book.mobi": [(200, b"converted")],
+        }
+        with LocalHTTPServer(routes) as server:
+            processor = JobProcessorRemote()
+            processor.api_config.url = f"{server.url}/jobs"
+
+            uri = processor.get_job_result("test_ID")
+            path = processor.save_file(f"{server.url}{uri}", self.work_dir)
+
+        self.assertEqual(Path(path).read_bytes(), b"converted")
+        stats = processor.get_connection_stats()
+        self.assertEqual(stats["connections"], 1)
+        self.assertEqual(stats["reused"], stats["requests"] - 1)
+
+
+class UploadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_to_file = Path(self.tmp_dir.name) / "book.epub"
+        self.content = bytes(range(256)) * 1000
+        self.path_to_file.write_bytes(self.content)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_multipart_stream(self):
+        progress = []
+        stream = MultipartFileStream(
+            self.path_to_file, chunk_size=1000, callback=lambda sent, total: progress.append(sent))
+        with stream:
+            chunks = list(stream)
+
+        body = b"".join(chunks)
+        self.assertEqual(len(body), len(stream))
+        self.assertTrue(all(len(chunk) <= 1000 for chunk in chunks))
+        self.assertIn(b'filename="book.epub"', body)
+        self.assertIn(self.content, body)
+        self.assertTrue(body.endswith(f"--{stream.boundary}--\r\n".encode()))
+        self.assertEqual(progress[-1], len(stream))
+
+    def test_send_binary_file(self):
+        routes = {
+            "/jobs": [(200, to_json({"id": "test_ID", "server": "SERVER"}))],
+            "/upload-file/test_ID": [(200, to_json({"completed": True}))],
+        }
+        progress = []
+        with LocalHTTPServer(routes) as server:
+            processor = JobProcessorRemote()
+            processor.api_config.url = f"{server.url}/jobs"
+
+            with patch.object(processor, "_set_upload_url", return_value=f"{server.url}/upload-file/test_ID"):
+                job_id = processor.send_job(
+                    str(self.path_to_file),
+                    {"target": "mobi", "category": "ebook"},
+                    upload_progress=lambda sent, total: progress.append((sent, total)),
+                )
+
+        self.assertEqual(job_id, "test_ID")
+        self.assertIn(self.content, server.server.bodies[-1])
+        sent, total = progress[-1]
+        self.assertEqual(sent, total)
+        self.assertLessEqual(len(progress), 101)
+
+
+class PollingTestCase(unittest.TestCase):
+    def setUp(self):
+        self.processing = {"status": {"code": "processing", "info": "in progress"}, "errors": []}
+        self.completed = {
+            "status": {"code": "completed", "info": "done"},
+            "errors": [],
+            "output": [{"uri": "/download/book.mobi"}],
+        }
+
+    def test_poll_intervals(self):
+        intervals = poll_intervals(PollingConfig(initial=0.5, maximum=2, factor=2, jitter=0))
+        self.assertEqual([next(intervals) for _ in range(5)], [0.5, 1, 2, 2, 2])
+
+    def test_poll_intervals_with_jitter(self):
+        intervals = poll_intervals(PollingConfig(initial=1, maximum=1, jitter=0.1))
+        for _ in range(10):
+            self.assertTrue(0.9 <= next(intervals) <= 1.1)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(parse_retry_after("5"), 5)
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT"), 0)
+        self.assertIsNone(parse_retry_after("wrong"))
+        self.assertIsNone(parse_retry_after(None))
+        self.assertIsNone(parse_retry_after("nan"))
+        # date without zone is UTC
+        self.assertEqual(parse_retry_after("Wed, 21 Oct 2015 07:28:00 -0000"), 0)
+
+    def test_retry_after_is_limited(self):
+        processor = JobProcessorRemote(polling_config=PollingConfig(retry_after_maximum=30))
+        processor._poll_hints["test_ID"] = parse_retry_after("99999999")
+        intervals = iter([0.1, 0.2])
+        self.assertEqual(processor._get_poll_interval("test_ID", intervals), 30)
+        self.assertEqual(processor._get_poll_interval("test_ID", intervals), 0.2)
+
+    def test_get_job_status_and_result(self):
+        routes = {
+            "/jobs/test_ID": [
+                (200, to_json(self.processing)),
+                (200, to_json(self.processing), {"Retry-After": "7"}),
+                (200, to_json(self.completed)),
+            ],
+        }
+        polling_config = PollingConfig(initial=0.1, maximum=0.4, factor=2, jitter=0)
+        with LocalHTTPServer(routes) as server:
+            processor = JobProcessorRemote(polling_config=polling_config)
+            processor.api_config.url = f"{server.url}/jobs"
+
+            with patch("processors.remote_processor.time.sleep") as mocked_sleep:
+                statuses = list(processor.get_job_status("test_ID"))
+            uri = processor.get_job_result("test_ID")
+
+        self.assertEqual([status for status, _ in statuses], ["processing", "processing", "completed"])
+        self.assertEqual([call.args[0] for call in mocked_sleep.call_args_list], [0.1, 0.2, 7])
+        self.assertEqual(uri, "/download/book.mobi")
+        # result is taken from the last status response
+        self.assertEqual(len(server.requests), 3)
+
+    def test_server_error_after_retries(self):
+        routes = {
+            "/jobs/test_ID": [(503, b"<html>Service Unavailable</html>")] * 2,
+            "/jobs": [(200, b"not json")],
+        }
+        http_config = HTTPConfig(retries=1, backoff_factor=0, timeout=5)
+        with LocalHTTPServer(routes) as server:
+            processor = JobProcessorRemote(http_config=http_config)
+            processor.api_config.url = f"{server.url}/jobs"
+
+            with patch.object(processor.session, "get", wraps=processor.session.get) as mocked:
+                with self.assertRaisesRegex(ProcessorError, "status request failed.*503"):
+                    processor._get_job_info("test_ID")
+            with self.assertRaisesRegex(ProcessorError, "create_job request failed"):
+                processor._get_job_id_from_server("{}")
+
+        # configured timeout is used for all requests
+        self.assertEqual(mocked.call_args.kwargs["timeout"], 5)
+
+    def test_wrong_job_info(self):
+        processor = JobProcessorRemote()
+        with self.assertRaisesRegex(ProcessorError, "wrong job info"):
+            processor._check_errors({"error": "not found"})
+
+
+if __name__ == "__main__":
+    unittest.main()
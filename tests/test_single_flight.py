@@ -0,0 +1,108 @@
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from config import JobConfig, Target
+from converter import Converter, ConvertError
+from processors import ProcessorError
+from single_flight import SingleFlight
+from tests.common import BlockingProcessor, RecordingUI, wait_for
+
+
+class FlightTestCase(unittest.TestCase):
+    def test_subscribe(self):
+        single_flight = SingleFlight()
+        flight, is_leader = single_flight.join("key")
+        self.assertTrue(is_leader)
+        self.assertEqual(single_flight.join("key"), (flight, False))
+
+        flight.publish("display_job_status", "start")
+        events = flight.subscribe()
+        self.assertEqual(next(events), ("display_job_status", ("start",), {}))
+
+        flight.publish("display_common_info", "info", status="processing")
+        single_flight.finish(flight, result="path")
+        self.assertEqual(list(events), [("display_common_info", ("info",), {"status": "processing"})])
+        self.assertEqual(flight.result.result(), "path")
+        self.assertEqual(len(single_flight), 0)
+        self.assertTrue(single_flight.join("key")[1])
+
+
+class ConverterSingleFlightTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.work_dir = Path(self.tmp_dir.name)
+        self.single_flight = SingleFlight()
+
+        # the same content in files with different names
+        for name, book in (("first", "alpha.fb2"), ("second", "beta.fb2")):
+            (self.work_dir / name).mkdir()
+            (self.work_dir / name / book).write_bytes(b"book")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def convert_both(self, processor):
+        converters = [
+            Converter(RecordingUI(), processor, single_flight=self.single_flight)
+            for _ in range(2)
+        ]
+        jobs = [None, None]
+
+        def convert(index, name, book):
+            config = JobConfig(
+                Target("mobi", "ebook"),
+                str(self.work_dir / name / book),
+                str(self.work_dir / name / "result"),
+            )
+            jobs[index] = converters[index].convert_job(config)
+
+        leader = threading.Thread(target=convert, args=(0, "first", "alpha.fb2"))
+        leader.start()
+        processor.started.wait(5)
+        follower = threading.Thread(target=convert, args=(1, "second", "beta.fb2"))
+        follower.start()
+        # wait for follower to join the flight of leader
+        wait_for(self._has_follower)
+        processor.release.set()
+        leader.join(5)
+        follower.join(5)
+        return converters, jobs
+
+    def _has_follower(self):
+        return any(flight.followers for flight in self.single_flight._flights.values())
+
+    def test_identical_jobs_are_sent_once(self):
+        processor = BlockingProcessor()
+        converters, jobs = self.convert_both(processor)
+
+        self.assertEqual(len(processor.sent), 1)
+        # follower's result is named by its own source
+        self.assertEqual(jobs[0].result, self.work_dir / "first" / "result" / "alpha.fb2.mobi")
+        self.assertEqual(jobs[1].result, self.work_dir / "second" / "result" / "beta.fb2.mobi")
+        self.assertEqual(jobs[1].result.read_bytes(), b"converted")
+
+        follower_calls = converters[1].interface.calls
+        self.assertIn(("progress", 50.0), follower_calls)
+        self.assertIn(("progress", 100.0), follower_calls)
+        self.assertEqual(follower_calls[-2:], [("result", jobs[1].result), ("status", "completed")])
+
+    def test_follower_result_is_named_as_leader_one(self):
+        processor = BlockingProcessor(by_stem=True)
+        _, jobs = self.convert_both(processor)
+
+        self.assertEqual(jobs[0].result, self.work_dir / "first" / "result" / "alpha.mobi")
+        self.assertEqual(jobs[1].result, self.work_dir / "second" / "result" / "beta.mobi")
+
+    def test_follower_gets_error(self):
+        processor = BlockingProcessor(fail=True)
+        _, jobs = self.convert_both(processor)
+
+        self.assertIsInstance(jobs[0].error, ProcessorError)
+        self.assertIsInstance(jobs[1].error, ConvertError)
+        self.assertIn("conversion failed", str(jobs[1].error))
+
+
+if __name__ == "__main__":
+    unittest.main()
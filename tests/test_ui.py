@@ -1,5 +1,7 @@
 from unittest import TestCase
 
+from uis.events import UIEventBuffer
+
 
 class TestUI(TestCase):
     def setUp(self):
@@ -8,3 +10,43 @@ class TestUI(TestCase):
     def test_one(self):
         # NOTE: wrong test to run assertion
         self.assertEqual(1, 2)
+
+
+class UIEventBufferTestCase(TestCase):
+    def setUp(self):
+        self.buffer = UIEventBuffer()
+
+    def test_drain_messages(self):
+        for index in range(3):
+            self.buffer.add_message(f"message {index}\n")
+        self.buffer.add_message(None)
+
+        updates = self.buffer.drain()
+        self.assertEqual(updates.messages, ["message 0", "message 1", "message 2"])
+        self.assertFalse(self.buffer.drain())
+
+    def test_keep_latest_status_and_progress(self):
+        self.buffer.set_status("start")
+        self.buffer.set_progress(10, 90)
+        self.buffer.set_progress(50, 50)
+        self.buffer.set_status("processing")
+
+        updates = self.buffer.drain()
+        self.assertEqual(updates.status, "processing")
+        self.assertEqual(updates.progress, (50, 50))
+        self.assertTrue(updates.status_is_last)
+
+    def test_progress_after_status(self):
+        self.buffer.set_status("processing")
+        self.buffer.set_progress(10)
+
+        self.assertFalse(self.buffer.drain().status_is_last)
+
+    def test_keep_all_errors(self):
+        self.buffer.add_error("first error\n")
+        self.buffer.add_error("second error")
+
+        updates = self.buffer.drain()
+        self.assertTrue(updates)
+        self.assertEqual(updates.errors, ["first error", "second error"])
+        self.assertFalse(self.buffer.drain())
@@ -0,0 +1,256 @@
+import errno
+import json
+import os
+import re
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+
+from tests.common import LocalHTTPServer, StubHandler
+from utils import (
+    copy_file_fast,
+    download_file,
+    move_file,
+    get_download_state_path,
+    get_partial_file_path,
+    get_result_name,
+    save_from_url,
+    split_ranges,
+)
+
+CONTENT = bytes(range(256)) * 400
+
+
+class RangeHandler(StubHandler):
+    """Handler which sends CONTENT with support of HTTP Range requests."""
+
+    def do_HEAD(self) -> None:
+        self.server.requests.append((self.command, self.path, None))
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(CONTENT)))
+        self.send_header("ETag", self.server.etag)
+        if self.server.accept_ranges:
+            self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+    def do_GET(self) -> None:
+        byte_range = self.headers.get("Range")
+        self.server.requests.append((self.command, self.path, byte_range))
+
+        start, end = 0, len(CONTENT) - 1
+        match = re.match(r"bytes=(\d+)-(\d*)", byte_range or "")
+        if_range = self.headers.get("If-Range")
+        if match and self.server.accept_ranges and if_range in (None, self.server.etag):
+            start = int(match.group(1))
+            end = int(match.group(2) or end)
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(CONTENT)}")
+        else:
+            self.send_response(200)
+
+        body = CONTENT[start: end + 1]
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", self.server.etag)
+        self.end_headers()
+
+        if self.server.drop_after is not None:
+            # emulate disconnect in the middle of response
+            drop_after, self.server.drop_after = self.server.drop_after, None
+            self.wfile.write(body[:drop_after])
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+
+class DownloadTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = Path(self.tmp_dir.name) / "book.mobi"
+        self.server = LocalHTTPServer(handler=RangeHandler)
+        self.server.server.accept_ranges = True
+        self.server.server.drop_after = None
+        self.server.server.etag = '"v1"'
+        self.server.__enter__()
+        self.url = f"{self.server.url}/book.mobi"
+        self.session = requests.Session()
+
+    def tearDown(self):
+        self.session.close()
+        self.server.__exit__()
+        self.tmp_dir.cleanup()
+
+    def get_ranges(self) -> list:
+        return [byte_range for command, _, byte_range in self.server.requests if command == "GET"]
+
+    def test_split_ranges(self):
+        self.assertEqual(split_ranges(100, 4, 10), [(0, 24), (25, 49), (50, 74), (75, 99)])
+        self.assertEqual(split_ranges(100, 4, 40), [(0, 49), (50, 99)])
+        self.assertEqual(split_ranges(100, 4, 1000), [(0, 99)])
+
+    def test_download_by_segments(self):
+        download_file(self.url, self.file_path, self.session, segments=4, min_segment_size=1000)
+
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+        self.assertEqual(len(self.get_ranges()), 4)
+        self.assertEqual(list(Path(self.tmp_dir.name).iterdir()), [self.file_path])
+
+    def test_segments_are_joined_by_kernel(self):
+        with patch.object(os, "copy_file_range", wraps=os.copy_file_range) as mocked:
+            download_file(
+                self.url, self.file_path, self.session, segments=4, min_segment_size=1000)
+
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+        # segments are appended to the first one
+        self.assertEqual(mocked.call_count, 3)
+
+    def test_segments_are_joined_without_kernel_functions(self):
+        error = OSError(errno.ENOSYS, "not supported")
+        with patch.object(os, "copy_file_range", side_effect=error), \
+                patch.object(os, "sendfile", side_effect=error):
+            download_file(
+                self.url, self.file_path, self.session, segments=4, min_segment_size=1000)
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+
+    def test_download_small_file_by_one_stream(self):
+        download_file(self.url, self.file_path, self.session, min_segment_size=len(CONTENT))
+
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+        self.assertEqual(self.get_ranges(), [None])
+
+    def test_download_without_ranges(self):
+        self.server.server.accept_ranges = False
+        download_file(self.url, self.file_path, self.session, min_segment_size=1000)
+
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+        self.assertEqual(self.get_ranges(), [None])
+
+    def save_state(self, etag: str, ranges: list) -> None:
+        state = {"validator": etag, "size": len(CONTENT), "ranges": ranges}
+        get_download_state_path(self.file_path).write_text(json.dumps(state))
+
+    def test_resume_partial_segment(self):
+        segment_size = len(CONTENT) // 2
+        get_partial_file_path(self.file_path, 1).write_bytes(CONTENT[segment_size: segment_size + 100])
+        self.save_state('"v1"', [[0, segment_size - 1], [segment_size, len(CONTENT) - 1]])
+
+        download_file(self.url, self.file_path, self.session, segments=2, min_segment_size=1000)
+
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+        self.assertIn(f"bytes={segment_size + 100}-{len(CONTENT) - 1}", self.get_ranges())
+        self.assertEqual(list(Path(self.tmp_dir.name).iterdir()), [self.file_path])
+
+    def test_stale_partial_is_not_resumed(self):
+        # partial of the old version of file or without saved version
+        for etag in ('"v0"', None):
+            get_partial_file_path(self.file_path).write_bytes(b"x" * 500)
+            if etag is not None:
+                self.save_state(etag, [])
+            self.server.server.requests.clear()
+
+            download_file(self.url, self.file_path, self.session, min_segment_size=len(CONTENT))
+
+            self.assertEqual(self.file_path.read_bytes(), CONTENT)
+            self.assertEqual(self.get_ranges(), [None])
+
+    def test_oversized_partial_is_not_used(self):
+        get_partial_file_path(self.file_path).write_bytes(CONTENT + b"x" * 500)
+        self.save_state('"v1"', [])
+
+        download_file(self.url, self.file_path, self.session, min_segment_size=len(CONTENT))
+
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+        self.assertEqual(self.get_ranges(), [None])
+
+    def test_file_changed_during_download(self):
+        get_partial_file_path(self.file_path).write_bytes(b"x" * 500)
+        self.save_state('"v0"', [])
+        # server has new version after HEAD request, so it sends full file
+        with patch("utils.get_validator", return_value='"v0"'):
+            download_file(self.url, self.file_path, self.session, min_segment_size=len(CONTENT))
+
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+        self.assertEqual(self.get_ranges(), ["bytes=500-"])
+
+    def test_resume_after_disconnect(self):
+        self.server.server.drop_after = 1000
+        download_file(
+            self.url, self.file_path, self.session, min_segment_size=len(CONTENT), bufsize=100)
+
+        self.assertEqual(self.file_path.read_bytes(), CONTENT)
+        self.assertEqual(self.get_ranges(), [None, "bytes=1000-"])
+
+    def test_save_from_url(self):
+        path = save_from_url(self.url, self.tmp_dir.name, self.session)
+        self.assertEqual(path, self.file_path.resolve())
+        self.assertEqual(path.read_bytes(), CONTENT)
+
+
+class CopyFileTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = Path(self.tmp_dir.name) / "book.mobi"
+        self.source.write_bytes(CONTENT)
+        self.destination = Path(self.tmp_dir.name) / "saved.mobi"
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_copy_file(self):
+        self.assertEqual(copy_file_fast(self.source, self.destination), self.destination)
+        self.assertEqual(self.destination.read_bytes(), CONTENT)
+        self.assertEqual(sorted(Path(self.tmp_dir.name).iterdir()), [self.source, self.destination])
+
+    def test_copy_without_kernel_functions(self):
+        error = OSError(errno.ENOSYS, "not supported")
+        with patch.object(os, "copy_file_range", side_effect=error), \
+                patch.object(os, "sendfile", side_effect=error):
+            copy_file_fast(self.source, self.destination)
+        self.assertEqual(self.destination.read_bytes(), CONTENT)
+
+    def test_copy_by_sendfile(self):
+        error = OSError(errno.EXDEV, "cross-device")
+        with patch.object(os, "copy_file_range", side_effect=error):
+            copy_file_fast(self.source, self.destination)
+        self.assertEqual(self.destination.read_bytes(), CONTENT)
+
+    def test_move_file(self):
+        self.assertEqual(move_file(self.source, self.destination), self.destination)
+        self.assertEqual(self.destination.read_bytes(), CONTENT)
+        self.assertFalse(self.source.exists())
+
+    def test_move_file_to_other_filesystem(self):
+        with patch.object(os, "replace", side_effect=[OSError(errno.EXDEV, "cross-device"), None]) as mocked:
+            move_file(self.source, self.destination)
+
+        # the second replace is rename of temporary copy
+        temporary_path = mocked.call_args_list[1].args[0]
+        self.assertEqual(temporary_path.parent, self.destination.parent)
+        self.assertEqual(temporary_path.read_bytes(), CONTENT)
+        self.assertFalse(self.source.exists())
+
+    def test_move_file_error(self):
+        with patch.object(os, "replace", side_effect=OSError(errno.EACCES, "denied")):
+            with self.assertRaises(OSError):
+                move_file(self.source, self.destination)
+        self.assertTrue(self.source.exists())
+
+    def test_remove_temporary_file_on_error(self):
+        with patch.object(os, "copy_file_range", side_effect=OSError(errno.EIO, "io error")):
+            with self.assertRaises(OSError):
+                copy_file_fast(self.source, self.destination)
+        self.assertEqual(list(Path(self.tmp_dir.name).iterdir()), [self.source])
+
+
+class ResultNameTestCase(unittest.TestCase):
+    def test_result_name(self):
+        self.assertEqual(
+            get_result_name("alpha.fb2.mobi", "alpha.fb2", "beta.epub"), "beta.epub.mobi")
+        self.assertEqual(get_result_name("alpha.mobi", "alpha.fb2", "beta.epub"), "beta.mobi")
+        self.assertEqual(get_result_name("result.mobi", "alpha.fb2", "beta.epub"), "result.mobi")
+
+
+if __name__ == "__main__":
+    unittest.main()
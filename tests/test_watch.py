@@ -0,0 +1,159 @@
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from config import Target
+from converter import Converter
+from tests.common import CopyProcessor, wait_for
+from uis.batch import MANIFEST_NAME, Manifest
+from uis.cli_ui import ConverterInterfaceCLI
+from uis.watch import Debouncer, InboxWatcher, InotifyWatcher, PollingWatcher
+
+
+class WatchTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.inbox = Path(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_debouncer(self):
+        now = [0.0]
+        debouncer = Debouncer(quiet_period=2, clock=lambda: now[0])
+        path = self.inbox / "a.fb2"
+        path.write_text("part")
+        debouncer.touch(path)
+
+        now[0] = 1
+        self.assertEqual(debouncer.ready(), [])
+
+        # file is still written without events
+        path.write_text("part and more")
+        now[0] = 2
+        self.assertEqual(debouncer.ready(), [])
+        now[0] = 4
+        self.assertEqual(debouncer.ready(), [path])
+        self.assertEqual(len(debouncer), 0)
+
+        # removed file is forgotten
+        debouncer.touch(path)
+        path.unlink()
+        now[0] = 10
+        self.assertEqual(debouncer.ready(), [])
+        self.assertEqual(len(debouncer), 0)
+
+    def test_polling_watcher(self):
+        (self.inbox / "old.fb2").write_text("old")
+        watcher = PollingWatcher(self.inbox, interval=0)
+        self.assertEqual(watcher.poll(0), set())
+
+        (self.inbox / "new.fb2").write_text("new")
+        (self.inbox / "old.fb2").write_text("old changed")
+        (self.inbox / "dir").mkdir()
+        self.assertEqual(
+            watcher.poll(0), {self.inbox / "new.fb2", self.inbox / "old.fb2"})
+        self.assertEqual(watcher.poll(0), set())
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "inotify is available on linux")
+    def test_inotify_watcher(self):
+        watcher = InotifyWatcher(self.inbox)
+        try:
+            self.assertEqual(watcher.poll(0), set())
+            (self.inbox / "new.fb2").write_text("new")
+            (self.inbox / "dir").mkdir()
+            self.assertEqual(watcher.poll(1), {self.inbox / "new.fb2"})
+        finally:
+            watcher.close()
+
+    def test_inbox_watcher(self):
+        (self.inbox / "a.fb2").write_text("a")
+        (self.inbox / "skip.part").write_text("not finished")
+        processor = CopyProcessor()
+        interface = ConverterInterfaceCLI()
+        converter = Converter(interface, processor)
+        # manifest is saved on stop only
+        manifest = Manifest(self.inbox / MANIFEST_NAME, save_interval=60)
+        watcher = InboxWatcher(
+            converter, self.inbox, self.inbox, Target("mobi", "ebook"),
+            exclude=("*.part", MANIFEST_NAME), max_parallel=2, quiet_period=0.05,
+            watcher=PollingWatcher(self.inbox, interval=0.01), manifest=manifest,
+        )
+
+        with patch("builtins.print"):
+            thread = threading.Thread(target=watcher.run)
+            thread.start()
+            try:
+                # files which are in inbox are converted at start
+                self.assertTrue(wait_for(lambda: (self.inbox / "a.fb2.mobi").exists()))
+                (self.inbox / "b.fb2").write_text("b")
+                self.assertTrue(wait_for(lambda: (self.inbox / "b.fb2.mobi").exists()))
+                self.assertFalse(manifest.path.exists())
+            finally:
+                watcher.stop()
+                thread.join()
+
+        # results are not converted again
+        self.assertEqual(sorted(processor.sent), ["a.fb2", "b.fb2"])
+        self.assertFalse(manifest.is_changed(self.inbox / "b.fb2", "mobi"))
+        self.assertEqual(len(Manifest(manifest.path)), 2)
+
+    def test_manifest_is_saved_on_timer(self):
+        (self.inbox / "a.fb2").write_text("a")
+        interface = ConverterInterfaceCLI()
+        manifest = Manifest(self.inbox / MANIFEST_NAME, save_interval=0.05)
+        watcher = InboxWatcher(
+            Converter(interface, CopyProcessor()), self.inbox, self.inbox,
+            Target("mobi", "ebook"), exclude=(MANIFEST_NAME,), quiet_period=0.05,
+            watcher=PollingWatcher(self.inbox, interval=0.01), manifest=manifest,
+        )
+
+        with patch("builtins.print"):
+            thread = threading.Thread(target=watcher.run)
+            thread.start()
+            try:
+                # manifest is saved while watcher is running
+                self.assertTrue(wait_for(lambda: manifest.path.exists()))
+                self.assertEqual(len(Manifest(manifest.path)), 1)
+            finally:
+                watcher.stop()
+                thread.join()
+
+    def test_on_stop_before_jobs_are_finished(self):
+        (self.inbox / "a.fb2").write_text("a")
+        started, release = threading.Event(), threading.Event()
+        stopped = []
+
+        def get_job_status(job_id):
+            started.set()
+            release.wait(5)
+            return iter([])
+
+        def on_stop():
+            # job in progress is not finished yet
+            stopped.append((self.inbox / "a.fb2.mobi").exists())
+            release.set()
+
+        processor = CopyProcessor()
+        watcher = InboxWatcher(
+            Converter(ConverterInterfaceCLI(), processor), self.inbox, self.inbox,
+            Target("mobi", "ebook"), quiet_period=0.05,
+            watcher=PollingWatcher(self.inbox, interval=0.01), on_stop=on_stop,
+        )
+
+        with patch("builtins.print"), patch.object(processor, "get_job_status", get_job_status):
+            thread = threading.Thread(target=watcher.run)
+            thread.start()
+            self.assertTrue(started.wait(5))
+            watcher.stop()
+            thread.join()
+
+        self.assertEqual(stopped, [False])
+        self.assertTrue((self.inbox / "a.fb2.mobi").exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import threading
+import time
+import unittest
+
+from workers.worker import (
+    PoolWorker,
+    ProcessWorker,
+    SharedBuffer,
+    ThreadError,
+    WorkerTimeoutError,
+    share,
+    unshare,
+)
+
+
+# functions of process worker should be importable in other process
+def get_digest(data, reverse=False):
+    return data[::-1] if reverse else hashlib.sha256(data).hexdigest()
+
+
+def get_pid():
+    return os.getpid()
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def get_shared_memory():
+    if not os.path.isdir("/dev/shm"):
+        return set()
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+class PoolWorkerTestCase(unittest.TestCase):
+    def setUp(self):
+        self.worker = PoolWorker(max_workers=2)
+        self.errors = []
+        self.worker.set_error_handler(self.errors.append)
+
+    def tearDown(self):
+        self.worker.shutdown(cancel_pending=True)
+
+    def test_results_of_all_calls(self):
+        with self.assertRaises(ThreadError):
+            self.worker.is_completed()
+
+        futures = [self.worker.execute(pow, number, 2) for number in range(5)]
+        self.assertEqual([future.result(timeout=5) for future in futures], [0, 1, 4, 9, 16])
+        self.assertTrue(self.worker.is_completed())
+        self.assertEqual(self.worker.get_result(), 16)
+
+    def test_bounded_pool(self):
+        lock = threading.Lock()
+        running = [0, 0]
+
+        def job():
+            with lock:
+                running[0] += 1
+                running[1] = max(running)
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+
+        futures = [self.worker.execute(job) for _ in range(6)]
+        for future in futures:
+            future.result(timeout=5)
+        self.assertEqual(running[1], 2)
+
+    def test_error(self):
+        future = self.worker.execute(int, "not a number")
+        with self.assertRaises(ValueError):
+            future.result(timeout=5)
+        self.assertIsNone(self.worker.get_result())
+        self.assertEqual(len(self.errors), 1)
+
+        # handler is connected once
+        self.worker.set_error_handler(self.errors.append)
+        self.assertEqual(len(self.worker._error.handlers), 1)
+
+    def test_timeout(self):
+        release = threading.Event()
+        future = self.worker.execute_with_timeout(0.05, release.wait, 5)
+        with self.assertRaises(WorkerTimeoutError):
+            future.result(timeout=5)
+        self.assertIsInstance(self.errors[0], WorkerTimeoutError)
+
+        # late result is dropped
+        release.set()
+        self.assertEqual(self.worker.execute(pow, 2, 3).result(timeout=5), 8)
+        self.assertEqual(len(self.errors), 1)
+
+    def test_cancel_and_shutdown(self):
+        release = threading.Event()
+        running = [self.worker.execute(release.wait, 5) for _ in range(2)]
+        queued = self.worker.execute(pow, 2, 3)
+        self.assertTrue(queued.cancel())
+
+        other = self.worker.execute(pow, 2, 4)
+        self.assertEqual(self.worker.cancel_all(), 1)
+        self.assertTrue(other.cancelled())
+
+        release.set()
+        self.worker.shutdown()
+        self.assertTrue(all(future.result() for future in running))
+        self.assertTrue(self.worker.is_completed())
+        with self.assertRaises(ThreadError):
+            self.worker.execute(pow, 2, 2)
+
+
+class ProcessWorkerTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.worker = ProcessWorker(max_workers=2, shared_memory_threshold=1024)
+        cls.errors = []
+        cls.worker.set_error_handler(cls.errors.append)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.worker.shutdown()
+
+    def test_share(self):
+        self.assertEqual(share(b"small", 1024), (b"small", None))
+        buffer, memory = share(b"x" * 2048, 1024)
+        memory.close()
+        self.assertIsInstance(buffer, SharedBuffer)
+        self.assertEqual(unshare(buffer, unlink=True), b"x" * 2048)
+
+    def test_execute_in_other_process(self):
+        future = self.worker.execute(get_pid)
+        self.assertNotEqual(future.result(timeout=60), os.getpid())
+        self.assertEqual(self.worker.get_result(), future.result())
+        self.assertTrue(self.worker.is_completed())
+
+    def test_shared_memory(self):
+        before = get_shared_memory()
+        data = os.urandom(64 * 1024)
+        digest = self.worker.execute(get_digest, data)
+        reversed_data = self.worker.execute(get_digest, data, reverse=True)
+        small = self.worker.execute(get_digest, b"small", reverse=True)
+
+        self.assertEqual(digest.result(timeout=60), hashlib.sha256(data).hexdigest())
+        self.assertEqual(reversed_data.result(timeout=60), data[::-1])
+        self.assertEqual(small.result(timeout=60), b"llams")
+        # all shared memory is released
+        self.assertEqual(get_shared_memory(), before)
+
+    def test_error(self):
+        future = self.worker.execute(fail, "broken book")
+        with self.assertRaises(ValueError):
+            future.result(timeout=60)
+        self.assertEqual(str(self.errors[-1]), "broken book")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -4,6 +4,18 @@ command needs:
 -name - file_name in current directory
 -t - [target] - string of file format(default "mobi")
 -cat - [category] - category of formatting file (default "ebook")
+-metrics - path to save timings of processing ("-" to print, *.json for JSON)
+
+directory mode (files which were not changed since the last run are skipped):
+-dir - path/to/directory with files to convert recursively
+-include, -exclude - comma separated globs of files (e.g. "*.fb2,*.epub")
+-out - directory to save results (default is the same directory)
+-parallel - count of files converted at the same time (default 4)
+-manifest - path to manifest of converted files (default "dir/.convert-manifest.json")
+
+watch mode (files are converted when they are added or changed, until Ctrl+C):
+-watch - path/to/directory to watch (not recursive), other params are the same as above
+-debounce - seconds when file should not be changed before conversion (default 2)
 """
 
 
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import fnmatch
+import json
+import os
+import threading
+import time
+import uuid
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from cache import hash_file
+
+MANIFEST_NAME = ".convert-manifest.json"
+# seconds between saves of manifest while files are converted
+DEFAULT_SAVE_INTERVAL = 5.0
+
+
+def find_files(
+    root: str | Path,
+    include: Iterable[str] = ("*",),
+    exclude: Iterable[str] = (),
+) -> Iterator[Path]:
+    """Walk the tree and return files which match include and do not match exclude globs.
+
+    Globs are matched with the name of file and with its path relative to root.
+    Directories which match exclude globs are not walked.
+    """
+    root = Path(root)
+    include, exclude = tuple(include), tuple(exclude)
+
+    def matches(path: str, patterns: tuple[str, ...]) -> bool:
+        name = os.path.basename(path)
+        return any(
+            fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(path, pattern)
+            for pattern in patterns
+        )
+
+    for dir_path, dir_names, file_names in os.walk(root):
+        relative_dir = os.path.relpath(dir_path, root)
+        relative_dir = "" if relative_dir == os.curdir else relative_dir
+
+        dir_names[:] = sorted(
+            name for name in dir_names
+            if not matches(os.path.join(relative_dir, name), exclude)
+        )
+        for name in sorted(file_names):
+            relative_path = os.path.join(relative_dir, name)
+            if matches(relative_path, include) and not matches(relative_path, exclude):
+                yield root / relative_path
+
+
+@dataclass
+class ManifestEntry:
+    mtime: float
+    size: int
+    hash: str
+    target: str
+    output: str
+
+
+class Manifest:
+    """Sources which were converted before with their mtime, size, hash and output.
+
+    File is not changed if its size and mtime are the same (hash is not computed),
+    or if its content hash is the same (e.g. file was touched).
+    Updates are saved by `save_if_due` not more often than once per `save_interval`.
+    """
+
+    def __init__(self, path: str | Path, save_interval: float = DEFAULT_SAVE_INTERVAL) -> None:
+        self.path = Path(path)
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._is_dirty = False
+        self._saved = time.monotonic()
+        self._entries: dict[str, ManifestEntry] = {}
+        if self.path.is_file():
+            data = json.loads(self.path.read_text())
+            self._entries = {source: ManifestEntry(**entry) for source, entry in data.items()}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_changed(self, source: str | Path, target: str) -> bool:
+        """Return True if source has to be converted to target again."""
+        key = str(Path(source).resolve())
+        entry = self._entries.get(key)
+        if entry is None or entry.target != target or not Path(entry.output).is_file():
+            return True
+
+        stat = os.stat(source)
+        if stat.st_size == entry.size and stat.st_mtime == entry.mtime:
+            return False
+        if stat.st_size != entry.size or hash_file(source) != entry.hash:
+            return True
+
+        # content is the same, remember new mtime to not hash file again
+        with self._lock:
+            entry.mtime = stat.st_mtime
+        return False
+
+    def update(
+        self,
+        source: str | Path,
+        target: str,
+        output: str | Path,
+        file_hash: str | None = None,
+    ) -> None:
+        """Remember converted source, `file_hash` is its hash if it was computed before."""
+        stat = os.stat(source)
+        entry = ManifestEntry(
+            mtime=stat.st_mtime,
+            size=stat.st_size,
+            hash=file_hash or hash_file(source),
+            target=target,
+            output=str(Path(output).resolve()),
+        )
+        with self._lock:
+            self._entries[str(Path(source).resolve())] = entry
+            self._is_dirty = True
+
+    def save_if_due(self) -> bool:
+        """Save updates if manifest was not saved during `save_interval` seconds."""
+        with self._lock:
+            is_due = self._is_dirty and time.monotonic() - self._saved >= self.save_interval
+        if is_due:
+            self.save()
+        return is_due
+
+    def save(self) -> None:
+        """Write manifest to temporary file and rename it to not break it on crash."""
+        # older data should not replace newer one
+        with self._save_lock:
+            with self._lock:
+                data = {source: asdict(entry) for source, entry in self._entries.items()}
+                self._is_dirty = False
+                self._saved = time.monotonic()
+            tmp_path = self.path.with_name(f".{self.path.name}.{uuid.uuid4().hex}.tmp")
+            tmp_path.write_text(json.dumps(data, indent=1))
+            os.replace(tmp_path, self.path)
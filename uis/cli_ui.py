@@ -1,19 +1,31 @@
 from __future__ import annotations
 
+import atexit
 import sys
 from pathlib import Path
 
 from config import JobConfig, Target, ParamsError
-from converter import Converter
+from converter import BatchReport, Converter, JobResult
+from instrumentation import metrics
 from interfaces.ui_interface import Config
+from progress import ProgressEvent
 from uis import DOCSTRING, InterfaceError
+from uis.batch import MANIFEST_NAME, Manifest, find_files
+from uis.watch import DEFAULT_EXCLUDE, DEFAULT_QUIET_PERIOD, InboxWatcher
 from utils import get_path, parse_command
 
 
+DEFAULT_PARALLEL = 4
+
+
 def yes_no(message="Do you want to run convert[N/y]?: "):
     return input(message).lower() in {"y", "yes"}
 
 
+def split_globs(value: str) -> list[str]:
+    return [pattern.strip() for pattern in value.split(",") if pattern.strip()]
+
+
 class ConverterInterfaceCLI:
     """Command line interface for converter to use as terminal app."""
 
@@ -37,13 +49,114 @@ class ConverterInterfaceCLI:
 
     def run(self, converter) -> None:
         self.converter = converter
+
+        # metrics are dumped when processing in worker threads is finished
+        data_settings = parse_command()
+        metrics_path = data_settings.get("-metrics")
+        if metrics_path:
+            atexit.register(self.dump_metrics, metrics_path)
+
         try:
+            if data_settings.get("-dir"):
+                self.convert_directory(data_settings)
+                return
+
+            if data_settings.get("-watch"):
+                self.watch_directory(data_settings)
+                return
+
             config = self.setup()
             if yes_no():
                 self.convert(config)
         except Exception as ex:
             self.display_error(f"Something wrong: {ex}")
 
+    def convert_directory(self, data_settings: dict) -> BatchReport:
+        """Convert files of the tree in parallel, skip files which were not changed since last run.
+
+        Results are saved to the same tree in `-out` dir (source dir by default).
+        """
+        if self.converter is None:
+            msg = "Converter is not initilazed"
+            raise InterfaceError(msg)
+
+        root = Path(data_settings["-dir"])
+        if not root.is_dir():
+            raise ParamsError(f"Directory does not exist: {root}")
+
+        target = data_settings.get("-t", "mobi")
+        category = data_settings.get("-cat", "ebook")
+        path_to_save = Path(data_settings.get("-out", root))
+        parallel = int(data_settings.get("-parallel", DEFAULT_PARALLEL))
+        manifest = Manifest(data_settings.get("-manifest", root / MANIFEST_NAME))
+
+        include = split_globs(data_settings.get("-include", "*"))
+        # results and manifest should not be converted as sources
+        exclude = [*split_globs(data_settings.get("-exclude", "")), f"*.{target}", MANIFEST_NAME]
+        if path_to_save.resolve().is_relative_to(root.resolve()):
+            out_dir = path_to_save.resolve().relative_to(root.resolve())
+            if out_dir.parts:
+                exclude.append(str(out_dir))
+
+        configs, skipped = [], 0
+        for path_to_file in find_files(root, include, exclude):
+            if not manifest.is_changed(path_to_file, target):
+                skipped += 1
+                continue
+            save_dir = path_to_save / path_to_file.parent.relative_to(root)
+            configs.append(JobConfig(Target(target, category), str(path_to_file), str(save_dir)))
+
+        def on_done(job: JobResult) -> None:
+            # manifest is saved during conversion, so finished files are not lost on crash
+            if not job.is_failed and job.result is not None:
+                manifest.update(job.config.path_to_file, target, job.result, job.config.file_hash)
+                manifest.save_if_due()
+
+        self.display_common_info(f"Found {len(configs)} new or changed files, skipped {skipped}")
+        report = self.converter.convert_many(configs, max_parallel=parallel, on_done=on_done)
+        manifest.save()
+        return report
+
+    def watch_directory(self, data_settings: dict) -> None:
+        """Convert new and changed files of the directory until Ctrl+C is pressed."""
+        if self.converter is None:
+            msg = "Converter is not initilazed"
+            raise InterfaceError(msg)
+
+        inbox = Path(data_settings["-watch"])
+        if not inbox.is_dir():
+            raise ParamsError(f"Directory does not exist: {inbox}")
+
+        target = Target(data_settings.get("-t", "mobi"), data_settings.get("-cat", "ebook"))
+        exclude = split_globs(data_settings.get("-exclude", ""))
+        watcher = InboxWatcher(
+            self.converter,
+            inbox,
+            data_settings.get("-out", inbox),
+            target,
+            include=split_globs(data_settings.get("-include", "*")),
+            exclude=[*exclude, *DEFAULT_EXCLUDE, MANIFEST_NAME],
+            max_parallel=int(data_settings.get("-parallel", DEFAULT_PARALLEL)),
+            quiet_period=float(data_settings.get("-debounce", DEFAULT_QUIET_PERIOD)),
+            manifest=Manifest(data_settings.get("-manifest", inbox / MANIFEST_NAME)),
+            on_stop=lambda: self.display_common_info("Stopped, waiting for jobs in progress"),
+        )
+
+        self.display_common_info(f"Watching {inbox}, press Ctrl+C to stop")
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            # jobs in progress are finished by watcher before exit
+            watcher.stop()
+
+    @staticmethod
+    def dump_metrics(path: str) -> None:
+        """Print metrics ("-") or save them to file (as JSON for *.json)."""
+        if path == "-":
+            print(metrics.dump())
+            return
+        metrics.dump(path, fmt="json" if path.endswith(".json") else "prometheus")
+
     def setup(self) -> Config:
         try:
             args = self._get_params(sys.argv)
@@ -91,6 +204,10 @@ class ConverterInterfaceCLI:
     def display_job_status(self, status: str) -> None:
         print(f">>> INTERFACE STATUS: {status}")
 
+    def display_progress(self, progress: ProgressEvent) -> None:
+        eta = f" ETA: {progress.eta:.0f}s" if progress.eta is not None else ""
+        print(f">>> INTERFACE PROGRESS: {progress.percent:.0f}% {progress.stage}{eta}")
+
     def display_job_result(self, result: Path | str) -> None:
         print(f">>> INTERFACE RESULT: {result}")
 
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class UIUpdates:
+    """Updates collected since the last drain of buffer."""
+
+    messages: list[str] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    status: str | None = None
+    progress: tuple[float, float | None] | None = None
+    # True if status was set after the last progress
+    status_is_last: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.messages) or bool(self.errors) or self.status is not None or self.progress is not None
+
+
+class UIEventBuffer:
+    """Thread safe buffer of UI updates.
+
+    Worker threads add updates and UI main loop drains them by batches.
+    All messages and errors are kept, but only the latest status and progress are applied.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._updates = UIUpdates()
+
+    def add_message(self, message: Any) -> None:
+        if not isinstance(message, str):
+            return
+        with self._lock:
+            self._updates.messages.append(message.strip())
+
+    def add_error(self, error: str) -> None:
+        with self._lock:
+            self._updates.errors.append(str(error).strip())
+
+    def set_status(self, status: str) -> None:
+        with self._lock:
+            self._updates.status = status
+            self._updates.status_is_last = True
+
+    def set_progress(self, percent: float, eta: float | None = None) -> None:
+        with self._lock:
+            self._updates.progress = (percent, eta)
+            self._updates.status_is_last = False
+
+    def drain(self) -> UIUpdates:
+        """Return all updates and clear buffer."""
+        with self._lock:
+            updates, self._updates = self._updates, UIUpdates()
+        return updates
@@ -14,12 +14,18 @@ import ttkbootstrap as ttkb
 from config import JobConfig as Config
 from config import Target
 from ttkbootstrap.dialogs import Messagebox
+from uis.events import UIEventBuffer
+from utils import copy_file_fast
 
 if TYPE_CHECKING:
     from converter import Converter
+    from progress import ProgressEvent
 
 work_dir = Path(__file__)
 
+# interval in ms to apply updates from worker threads to the window
+UI_REFRESH_INTERVAL = 100
+
 CONVERTER_FORMATS_MAPPING = {
     "mobi": ["fb2", "txt", "epub"],
     "fb2": ["mobi", "txt", "epub"],
@@ -28,9 +34,14 @@ CONVERTER_FORMATS_MAPPING = {
 
 
 class ConverterInterfaceTk:
-    """User interface with WM is written by TK python library."""
+    """User interface with WM is written by TK python library.
+
+    Status messages from worker threads are buffered and shown by Tk main loop
+    with fixed rate to keep the window responsive.
+    """
 
     def __init__(self) -> None:
+        self.updates = UIEventBuffer()
         self.view: TkView = TkView(self)
 
     def run(self, converter: Converter) -> None:
@@ -54,25 +65,27 @@ class ConverterInterfaceTk:
         return self.config
 
     def display_job_status(self, status: str) -> None:
-        self.view.set_status(status)
+        self.updates.set_status(status)
 
     def display_common_info(self, message: str, status: str | None = None) -> None:
         if status is not None:
             self.display_job_status(status)
-        self.view.add_text_message(message)
+        self.updates.add_message(message)
+
+    def display_progress(self, progress: ProgressEvent) -> None:
+        self.updates.set_progress(progress.percent, progress.eta)
 
     def display_job_result(self, result: Path | str) -> None:
-        self.view.add_text_message(result)
-        with open(result, "rb") as file:
-            tkthread.call_nosync(self.view.processing_result, result, file.read())
+        self.updates.add_message(str(result))
+        # send only path, file is copied by kernel when user selects where to save it
+        tkthread.call_nosync(self.view.processing_result, Path(result))
 
     def display_job_id(self, job_id: str) -> None:
         self.view.update_text_message(job_id)
 
     def display_error(self, error: str) -> None:
         self.display_job_status("error")
-        tkthread.call_nosync(self.view.show_message, error, "show_error")
-        self.view.processing_error(error)
+        self.updates.add_error(error)
 
 
 class TkView:
@@ -103,6 +116,18 @@ class TkView:
     def increment_progress(self, value):
         self.progress_bar["value"] += value
 
+    def set_progress(self, percent: float, eta: float | None = None) -> None:
+        """Show real percent of processing instead of indeterminate animation"""
+        if str(self.progress_bar["mode"]) != "determinate":
+            self.progress_bar.stop()
+            self.progress_bar.configure(mode="determinate", maximum=100)
+        self.progress_bar["value"] = percent
+
+        status = f"{percent:.0f}%"
+        if eta is not None:
+            status += f" ETA {eta:.0f}s"
+        self.set_status(status)
+
     def create_view(self) -> None:
         # get window params
         screen_width = self.root.winfo_width()
@@ -187,6 +212,8 @@ class TkView:
         self.update_text_message("")
         self.set_config()
         config = self.interface.setup()
+        # show animation until processor sends real progress
+        self.progress_bar.configure(mode="indeterminate", value=0)
         self.progress_bar.start()
         self.interface.convert(config)
         return True
@@ -195,9 +222,9 @@ class TkView:
         self.add_text_message(error)
         self.progress_bar.stop()
 
-    def processing_result(self, result: Path, content: bytes):
+    def processing_result(self, result: Path):
         self.progress_bar.stop()
-        self.download_result(result.name, content)
+        self.download_result(result)
 
     def open_file(self) -> None:
         self.file_field.delete(0.0, "end")
@@ -205,9 +232,9 @@ class TkView:
         filename = fd.askopenfilename(title="Open a file", initialdir=work_dir, filetypes=filetypes)
         self.file_field.insert(0.0, filename)
 
-    def download_result(self, filename: str, converted_file_content: bytes) -> None:
+    def download_result(self, result: Path) -> None:
         file_path = fd.asksaveasfilename(
-            initialfile=filename,
+            initialfile=result.name,
             initialdir=".",
             defaultextension=f".{self.selection_to.get()}",
             filetypes=[("Ebook files", f"*.{self.selection_to.get()}"), ("All Files", "*.*")],
@@ -218,8 +245,8 @@ class TkView:
             return
 
         try:
-            with open(file_path, "wb") as file:
-                file.write(converted_file_content)
+            if Path(file_path).resolve() != result.resolve():
+                copy_file_fast(result, file_path)
             self.show_message(f"File saved: {file_path}")
         except Exception as exc:
             self.show_message(f"Failed to save file: {exc}", "show_error")
@@ -235,6 +262,22 @@ class TkView:
         self.result_txt.delete(0.0, tk.END)
         self.result_txt.insert(0.0, message)
 
+    def apply_updates(self) -> None:
+        """Show all buffered updates by one operation and schedule the next call"""
+        updates = self.interface.updates.drain()
+        if updates.messages:
+            self.result_txt.insert(tk.END, "\n".join(updates.messages) + "\n")
+        if updates.progress is not None:
+            self.set_progress(*updates.progress)
+        if updates.status is not None and (updates.status_is_last or updates.progress is None):
+            self.set_status(updates.status)
+        for error in updates.errors:
+            self.processing_error(error)
+        if updates.errors:
+            self.show_message("\n".join(updates.errors), "show_error")
+
+        self.root.after(UI_REFRESH_INTERVAL, self.apply_updates)
+
     def set_status(self, msg: str) -> None:
         """Show new status in status field"""
         self.status_field.delete(0.0, tk.END)
@@ -251,4 +294,5 @@ class TkView:
     def run(self) -> None:
         self.create_view()
         self.set_status("ready")
+        self.root.after(UI_REFRESH_INTERVAL, self.apply_updates)
         self.root.mainloop()
@@ -0,0 +1,301 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import threading
+import time
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Protocol
+
+from config import JobConfig, Target
+from converter import Converter, JobResult
+from uis.batch import Manifest
+
+# masks of inotify events (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+EVENTS_BUFFER_SIZE = 64 * 1024
+
+DEFAULT_QUIET_PERIOD = 2.0
+DEFAULT_POLL_INTERVAL = 1.0
+# temporary and hidden files are usually not finished yet
+DEFAULT_EXCLUDE = (".*", "*.part", "*.tmp", "*.crdownload", "*~")
+
+
+class Watcher(Protocol):
+    def poll(self, timeout: float) -> set[Path]:
+        """Wait for changes not longer than timeout and return changed files."""
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """Watches files of directory (not recursive) by inotify via libc."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            error = ctypes.get_errno()
+            raise OSError(error, os.strerror(error))
+
+        if self._libc.inotify_add_watch(self._fd, os.fsencode(self.path), WATCH_MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, os.strerror(error), str(self.path))
+
+    def poll(self, timeout: float) -> set[Path]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, EVENTS_BUFFER_SIZE)
+        except BlockingIOError:
+            return set()
+        return self._parse_events(data)
+
+    def _parse_events(self, data: bytes) -> set[Path]:
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                # events were lost, so all files are checked
+                changed.update(path for path in self.path.iterdir() if path.is_file())
+            elif name and not mask & IN_ISDIR:
+                changed.add(self.path / os.fsdecode(name))
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingWatcher:
+    """Watches files of directory (not recursive) by comparing their size and mtime."""
+
+    def __init__(self, path: str | Path, interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        self.path = Path(path)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        snapshot = {}
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+                except FileNotFoundError:
+                    continue
+        return snapshot
+
+    def poll(self, timeout: float) -> set[Path]:
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = {
+            path for path, signature in snapshot.items()
+            if self._snapshot.get(path) != signature
+        }
+        self._snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def create_watcher(path: str | Path) -> Watcher:
+    """Return inotify watcher or polling one if inotify is not available."""
+    try:
+        return InotifyWatcher(path)
+    except (OSError, AttributeError) as ex:
+        print(f"Inotify is not available ({ex}), directory is polled")
+        return PollingWatcher(path)
+
+
+def get_signature(path: Path) -> tuple[int, int] | None:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class Debouncer:
+    """Returns files which were not changed during `quiet_period` seconds.
+
+    Size and mtime of file are checked again, so file which is still written
+    without events (e.g. on polling) is not returned.
+    """
+
+    def __init__(
+        self,
+        quiet_period: float = DEFAULT_QUIET_PERIOD,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.quiet_period = quiet_period
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._pending: dict[Path, tuple[float, tuple[int, int] | None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def touch(self, path: Path) -> None:
+        signature = get_signature(path)
+        with self._lock:
+            self._pending[path] = (self.clock(), signature)
+
+    def ready(self) -> list[Path]:
+        now = self.clock()
+        with self._lock:
+            pending = list(self._pending.items())
+
+        ready = []
+        for path, (changed, signature) in pending:
+            if now - changed < self.quiet_period:
+                continue
+
+            current = get_signature(path)
+            with self._lock:
+                if self._pending.get(path) != (changed, signature):
+                    # file was touched again
+                    continue
+                if current is None:
+                    del self._pending[path]
+                elif current != signature:
+                    self._pending[path] = (now, current)
+                else:
+                    del self._pending[path]
+                    ready.append(path)
+        return ready
+
+
+class InboxWatcher:
+    """Converts new and changed files of inbox directory until it is stopped.
+
+    Files are converted when they are not changed during `quiet_period`,
+    not more than `max_parallel` at the same time. File which is changed
+    during conversion is converted again after it. Files from manifest which
+    were not changed since the last run are skipped. Manifest is saved not more
+    often than its `save_interval` and always on stop. `on_stop` is called when
+    watching is stopped, before waiting for jobs in progress.
+    """
+
+    def __init__(
+        self,
+        converter: Converter,
+        inbox: str | Path,
+        path_to_save: str | Path,
+        target: Target,
+        include: Iterable[str] = ("*",),
+        exclude: Iterable[str] = DEFAULT_EXCLUDE,
+        max_parallel: int = 4,
+        quiet_period: float = DEFAULT_QUIET_PERIOD,
+        watcher: Watcher | None = None,
+        manifest: Manifest | None = None,
+        on_stop: Callable[[], None] | None = None,
+    ) -> None:
+        self.converter = converter
+        self.inbox = Path(inbox)
+        self.path_to_save = Path(path_to_save)
+        self.target = target
+        self.include = tuple(include)
+        # results can be saved to inbox
+        self.exclude = (*exclude, f"*.{target.target}")
+        self.watcher = watcher or create_watcher(self.inbox)
+        self.manifest = manifest
+        self.on_stop = on_stop
+        self.debouncer = Debouncer(quiet_period)
+        self.executor = ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="watch")
+
+        self._lock = threading.Lock()
+        self._in_progress: set[Path] = set()
+        self._changed_in_progress: set[Path] = set()
+        self.stopped = threading.Event()
+
+    def is_matched(self, path: Path) -> bool:
+        name = path.name
+        return (
+            any(fnmatch.fnmatch(name, pattern) for pattern in self.include)
+            and not any(fnmatch.fnmatch(name, pattern) for pattern in self.exclude)
+        )
+
+    def run(self) -> None:
+        """Convert files which are in inbox and watch for new ones until `stop`."""
+        for path in sorted(self.inbox.iterdir()):
+            if path.is_file():
+                self.on_changed(path)
+
+        try:
+            while not self.stopped.is_set():
+                timeout = self.debouncer.quiet_period / 2 if len(self.debouncer) else 1.0
+                for path in self.watcher.poll(timeout):
+                    self.on_changed(path)
+                for path in self.debouncer.ready():
+                    self.submit(path)
+                if self.manifest is not None:
+                    self.manifest.save_if_due()
+        finally:
+            self.watcher.close()
+            if self.on_stop is not None:
+                self.on_stop()
+            self.executor.shutdown(wait=True)
+            if self.manifest is not None:
+                self.manifest.save()
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def on_changed(self, path: Path) -> None:
+        if not self.is_matched(path):
+            return
+        with self._lock:
+            if path in self._in_progress:
+                self._changed_in_progress.add(path)
+                return
+        self.debouncer.touch(path)
+
+    def submit(self, path: Path) -> Future | None:
+        if self.manifest is not None and not self.manifest.is_changed(path, self.target.target):
+            return None
+        with self._lock:
+            self._in_progress.add(path)
+        config = JobConfig(self.target, str(path), str(self.path_to_save))
+        future = self.executor.submit(self.converter.convert_job, config)
+        future.add_done_callback(lambda done: self._on_done(path, done))
+        return future
+
+    def _on_done(self, path: Path, future: Future) -> None:
+        with self._lock:
+            self._in_progress.discard(path)
+            is_changed = path in self._changed_in_progress
+            self._changed_in_progress.discard(path)
+
+        job: JobResult | None = None if future.exception() else future.result()
+        if job is not None and not job.is_failed:
+            self.converter.interface.display_common_info(
+                f"{path.name} was converted in {job.elapsed:.1f}s")
+            if self.manifest is not None and job.result is not None:
+                self.manifest.update(
+                    path, self.target.target, job.result, job.config.file_hash)
+        if is_changed:
+            self.debouncer.touch(path)
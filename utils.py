@@ -1,15 +1,34 @@
 from __future__ import annotations
 
+import errno
+import glob
+import json
 import os
 import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from functools import wraps
 from pathlib import Path, PosixPath
-from typing import TYPE_CHECKING, Union
+from typing import TYPE_CHECKING, BinaryIO, Union
 
-import requests
+from config import HTTPConfig
 
+# requests is imported by functions which use it to not slow down start of apps without HTTP
 if TYPE_CHECKING:
-    from collections.abc import Callable
+    from collections.abc import Callable, Iterator
+
+    import requests
+
+UPLOAD_CHUNK_SIZE = 256 * 1024
+DOWNLOAD_BUFFER_SIZE = 1024 * 1024
+DOWNLOAD_SEGMENT_MIN_SIZE = 8 * 1024 * 1024
+DOWNLOAD_SEGMENTS = 4
+DOWNLOAD_RETRIES = 3
+COPY_BUFFER_SIZE = 1024 * 1024
+# errors of kernel copy functions which mean that they can not be used for the files
+KERNEL_COPY_ERRORS = {
+    errno.ENOSYS, errno.EXDEV, errno.EINVAL, errno.ENOTSUP, errno.EOPNOTSUPP, errno.EBADF,
+}
 
 
 def coroutine(func: Callable):
@@ -73,12 +92,141 @@ def parse_command() -> dict:
     return data
 
 
-def save_from_url(url: str, sub_dir: str = os.path.curdir) -> Union[str, Path, PosixPath]:
+def create_session(http_config: HTTPConfig | None = None) -> requests.Session:
+    """return session with pool of keep-alive connections and retries with backoff"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    http_config = http_config or HTTPConfig()
+    retry = Retry(
+        total=http_config.retries,
+        backoff_factor=http_config.backoff_factor,
+        status_forcelist=http_config.retry_statuses,
+        allowed_methods=http_config.retry_methods,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=http_config.pool_connections,
+        pool_maxsize=http_config.pool_size,
+        max_retries=retry,
+    )
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if not http_config.keep_alive:
+        session.headers["Connection"] = "close"
+    return session
+
+
+def get_connection_stats(session: requests.Session) -> dict:
+    """return count of opened connections and requests sent via session pools"""
+    stats = {"pools": 0, "connections": 0, "requests": 0, "reused": 0}
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = getattr(adapter, "poolmanager", None)
+        if pools is None:
+            continue
+        for key in pools.pools.keys():
+            pool = pools.pools.get(key)
+            if pool is None:
+                continue
+            stats["pools"] += 1
+            stats["connections"] += pool.num_connections
+            stats["requests"] += pool.num_requests
+
+    stats["reused"] = max(stats["requests"] - stats["connections"], 0)
+    return stats
+
+
+class MultipartFileStream:
+    """multipart/form-data body with one file which is read by chunks on sending
+
+    Memory usage does not depend on size of file.
+    callback(sent, total) is called after each read chunk.
+    """
+
+    def __init__(
+        self,
+        path_to_file: str | Path,
+        field: str = "file",
+        callback: Callable | None = None,
+        chunk_size: int = UPLOAD_CHUNK_SIZE,
+    ) -> None:
+        self.boundary = uuid.uuid4().hex
+        self.chunk_size = chunk_size
+        self.callback = callback
+
+        filename = Path(path_to_file).name.replace('"', "%22")
+        head = (
+            f"--{self.boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode()
+        tail = f"\r\n--{self.boundary}--\r\n".encode()
+
+        self._file = open(path_to_file, "rb")
+        file_size = os.fstat(self._file.fileno()).st_size
+        self._parts: list = [head, self._file, tail]
+        self.len = len(head) + file_size + len(tail)
+        self.sent = 0
+
+    @property
+    def content_type(self) -> str:
+        return f"multipart/form-data; boundary={self.boundary}"
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = self.chunk_size
+
+        chunks = []
+        left = size
+        while self._parts and left > 0:
+            part = self._parts[0]
+            if isinstance(part, bytes):
+                data, self._parts[0] = part[:left], part[left:]
+            else:
+                data = part.read(left)
+                if len(data) < left:
+                    # end of file
+                    self._parts[0] = b""
+
+            chunks.append(data)
+            left -= len(data)
+            if self._parts[0] == b"":
+                self._parts.pop(0)
+
+        chunk = b"".join(chunks)
+        self.sent += len(chunk)
+        if chunk and self.callback is not None:
+            self.callback(self.sent, self.len)
+        return chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        while chunk := self.read(self.chunk_size):
+            yield chunk
+
+    def __len__(self) -> int:
+        return self.len
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> MultipartFileStream:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def save_from_url(
+    url: str, sub_dir: str = os.path.curdir, session: requests.Session | None = None
+) -> Union[str, Path, PosixPath]:
     """saves file form remote URL to directory"""
     filename = url.split("/")[-1]
     full_path = get_full_file_path(filename, sub_dir)
-    response = requests.get(url, stream=True)
-    save_data_from_response_to_dir(full_path, response)
+    download_file(url, full_path, session=session)
     return full_path
 
 
@@ -90,13 +238,349 @@ def get_full_file_path(filename: str, sub_dir: str | Path) -> Union[str, Path, P
     return main_path / filename
 
 
+def get_result_name(result_name: str, source_name: str, other_source_name: str) -> str:
+    """Return name of result of other source which is named as `result_name` of `source_name`.
+
+    Processors name results by the whole name of source ("book.fb2.mobi")
+    or by its stem ("book.mobi"), other names are kept.
+    """
+    for name, other_name in (
+        (source_name, other_source_name),
+        (Path(source_name).stem, Path(other_source_name).stem),
+    ):
+        if result_name.startswith(name):
+            return other_name + result_name[len(name):]
+    return result_name
+
+
 def save_data_from_response_to_dir(
-    file_path: str | Path, response: requests.Response, bufsize: int = 1024
+    file_path: str | Path, response: requests.Response, bufsize: int = DOWNLOAD_BUFFER_SIZE
+) -> None:
+    """save file from response object to dir via temporary file"""
+    tmp_path = get_partial_file_path(file_path)
+    with open(tmp_path, "wb") as opened_file:
+        _write_response(opened_file, response, bufsize)
+    os.replace(tmp_path, file_path)
+
+
+def get_partial_file_path(file_path: str | Path, index: int | None = None) -> Path:
+    """return path of temporary file to download data before rename"""
+    suffix = ".part" if index is None else f".part{index}"
+    return Path(f"{file_path}{suffix}")
+
+
+def get_download_state_path(file_path: str | Path) -> Path:
+    """return path of file with version of remote file which partial files belong to"""
+    return Path(f"{file_path}.part.json")
+
+
+def download_file(
+    url: str,
+    file_path: str | Path,
+    session: requests.Session | None = None,
+    segments: int = DOWNLOAD_SEGMENTS,
+    min_segment_size: int = DOWNLOAD_SEGMENT_MIN_SIZE,
+    bufsize: int = DOWNLOAD_BUFFER_SIZE,
+    retries: int = DOWNLOAD_RETRIES,
+    timeout: float = HTTPConfig.timeout,
+) -> Path:
+    """download file from URL to path
+
+    Big files are downloaded by parallel HTTP Range segments if server supports them.
+    Data is written to temporary files which are resumed after disconnect
+    (or on the next call) and renamed to `file_path` when download is done.
+    Partial files of the previous call are resumed only if remote file has the same
+    ETag or Last-Modified date (checked by server with If-Range too), otherwise
+    they are removed.
+    """
+    import requests
+
+    http = session or requests
+    file_path = Path(file_path)
+    size, accept_ranges, validator = _get_download_info(http, url, timeout)
+
+    ranges = []
+    if size and accept_ranges and segments > 1:
+        ranges = split_ranges(size, segments, min_segment_size)
+    if len(ranges) < 2:
+        ranges = []
+
+    _prepare_partial_files(file_path, {"validator": validator, "size": size, "ranges": ranges})
+    if ranges:
+        _download_segments(http, url, file_path, ranges, validator, bufsize, retries, timeout)
+    else:
+        _download_stream(
+            http, url, file_path, size, accept_ranges, validator, bufsize, retries, timeout)
+    get_download_state_path(file_path).unlink(missing_ok=True)
+    return file_path
+
+
+def split_ranges(size: int, segments: int, min_segment_size: int) -> list[tuple[int, int]]:
+    """return list of inclusive byte ranges to download file by segments"""
+    segments = max(min(segments, size // max(min_segment_size, 1)), 1)
+    segment_size = -(-size // segments)
+    return [
+        (start, min(start + segment_size, size) - 1)
+        for start in range(0, size, segment_size)
+    ]
+
+
+def _get_download_info(http, url: str, timeout: float) -> tuple[int | None, bool, str | None]:
+    """return size of remote file, if server allows to download it by ranges and its version"""
+    import requests
+
+    try:
+        response = http.head(url, allow_redirects=True, timeout=timeout)
+    except requests.RequestException:
+        return None, False, None
+    if not response.ok:
+        return None, False, None
+
+    length = response.headers.get("Content-Length")
+    size = int(length) if length and length.isdigit() else None
+    accept_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+    return size, accept_ranges, get_validator(response.headers)
+
+
+def get_validator(headers) -> str | None:
+    """return strong ETag or Last-Modified date which can be sent as If-Range"""
+    etag = headers.get("ETag")
+    if etag and not etag.startswith("W/"):
+        return etag
+    return headers.get("Last-Modified")
+
+
+def _prepare_partial_files(file_path: Path, state: dict) -> None:
+    """remove partial files which belong to other version of remote file or other ranges"""
+    state_path = get_download_state_path(file_path)
+    try:
+        saved_state = json.loads(state_path.read_text())
+    except (FileNotFoundError, ValueError):
+        saved_state = None
+
+    if state["validator"] is None or saved_state != json.loads(json.dumps(state)):
+        for part_path in file_path.parent.glob(f"{glob.escape(file_path.name)}.part*"):
+            part_path.unlink(missing_ok=True)
+    if state["validator"] is not None:
+        state_path.write_text(json.dumps(state))
+
+
+def _get_range_headers(start: int, end: int | str, validator: str | None) -> dict:
+    headers = {"Range": f"bytes={start}-{end}"}
+    if validator is not None:
+        # server sends full file instead of range if it was changed
+        headers["If-Range"] = validator
+    return headers
+
+
+def _download_segments(
+    http,
+    url: str,
+    file_path: Path,
+    ranges: list[tuple[int, int]],
+    validator: str | None,
+    bufsize: int,
+    retries: int,
+    timeout: float,
+) -> None:
+    part_paths = [get_partial_file_path(file_path, index) for index in range(len(ranges))]
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        futures = [
+            executor.submit(
+                _download_range,
+                http, url, part_path, start, end, validator, bufsize, retries, timeout,
+            )
+            for part_path, (start, end) in zip(part_paths, ranges)
+        ]
+        for future in futures:
+            future.result()
+
+    # join segments in the first part by kernel copy and rename it as done file
+    with open(part_paths[0], "r+b") as opened_file:
+        offset = os.fstat(opened_file.fileno()).st_size
+        for part_path in part_paths[1:]:
+            with open(part_path, "rb") as part_file:
+                size = os.fstat(part_file.fileno()).st_size
+                _kernel_copy(part_file.fileno(), opened_file.fileno(), size, offset)
+            offset += size
+    os.replace(part_paths[0], file_path)
+    for part_path in part_paths[1:]:
+        part_path.unlink()
+
+
+def _download_range(
+    http,
+    url: str,
+    part_path: Path,
+    start: int,
+    end: int,
+    validator: str | None,
+    bufsize: int,
+    retries: int,
+    timeout: float,
+) -> None:
+    """download range of bytes to part file, continue from the size of existing part"""
+    import requests
+
+    expected_size = end - start + 1
+    for attempt in range(retries + 1):
+        done = part_path.stat().st_size if part_path.exists() else 0
+        if done > expected_size:
+            part_path.unlink()
+            done = 0
+        if done == expected_size:
+            return
+
+        headers = _get_range_headers(start + done, end, validator)
+        try:
+            with http.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code != 206:
+                    # file was changed, so its parts can not be joined
+                    part_path.unlink(missing_ok=True)
+                    msg = f"Server did not return range of file: {response.status_code}"
+                    raise requests.HTTPError(msg, response=response)
+                with open(part_path, "ab") as opened_file:
+                    _write_response(opened_file, response, bufsize)
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                raise
+
+    if part_path.stat().st_size != expected_size:
+        part_path.unlink()
+        msg = f"Segment {start}-{end} of {url} was not downloaded"
+        raise requests.ConnectionError(msg)
+
+
+def _download_stream(
+    http,
+    url: str,
+    file_path: Path,
+    size: int | None,
+    accept_ranges: bool,
+    validator: str | None,
+    bufsize: int,
+    retries: int,
+    timeout: float,
+) -> None:
+    """download file by one connection, continue partial file if server allows ranges"""
+    import requests
+
+    part_path = get_partial_file_path(file_path)
+    if not accept_ranges and part_path.exists():
+        part_path.unlink()
+
+    for attempt in range(retries + 1):
+        done = part_path.stat().st_size if part_path.exists() else 0
+        if size is not None and done > size:
+            part_path.unlink()
+            done = 0
+        if size is not None and done == size:
+            break
+
+        headers = _get_range_headers(done, "", validator) if done and accept_ranges else {}
+        try:
+            with http.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                # server can ignore range (or file was changed) and send full file
+                mode = "ab" if response.status_code == 206 else "wb"
+                with open(part_path, mode) as opened_file:
+                    _write_response(opened_file, response, bufsize)
+            if size is None or part_path.stat().st_size >= size:
+                break
+        except (requests.ConnectionError, requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                raise
+
+    done = part_path.stat().st_size
+    if size is not None and done != size:
+        if done > size:
+            part_path.unlink()
+        msg = f"{url} was downloaded with {done} of {size} bytes"
+        raise requests.ConnectionError(msg)
+    os.replace(part_path, file_path)
+
+
+def _write_response(opened_file, response: requests.Response, bufsize: int) -> None:
+    for part in response.iter_content(bufsize):
+        opened_file.write(part)
+
+
+def copy_file_fast(source: str | Path | BinaryIO, destination: str | Path) -> Path:
+    """copy file by kernel (copy_file_range or sendfile) without reading it to memory
+
+    Data is copied to temporary file in destination dir which is renamed when copy is done.
+    Source can be opened binary file, e.g. to copy it when its path can be removed.
+    """
+    destination = Path(destination)
+    tmp_path = destination.with_name(f".{destination.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "wb") as tmp_file:
+            if isinstance(source, (str, Path)):
+                with open(source, "rb") as source_file:
+                    _copy_opened_file(source_file, tmp_file)
+            else:
+                _copy_opened_file(source, tmp_file)
+        os.replace(tmp_path, destination)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return destination
+
+
+def _copy_opened_file(source_file: BinaryIO, destination_file: BinaryIO) -> None:
+    size = os.fstat(source_file.fileno()).st_size
+    _kernel_copy(source_file.fileno(), destination_file.fileno(), size)
+
+
+def move_file(source: str | Path, destination: str | Path) -> Path:
+    """move file by rename or by kernel copy if paths are on different filesystems"""
+    destination = Path(destination)
+    try:
+        os.replace(source, destination)
+    except OSError as ex:
+        if ex.errno != errno.EXDEV:
+            raise
+        copy_file_fast(source, destination)
+        os.unlink(source)
+    return destination
+
+
+def _kernel_copy(
+    source_fd: int, destination_fd: int, size: int, destination_offset: int = 0,
 ) -> None:
-    """save file from response object to dir"""
-    with open(file_path, "wb") as opened_file:
-        for part in response.iter_content(bufsize):
-            opened_file.write(part)
+    """copy data between file descriptors, use python copy if kernel functions are not supported
+
+    Data is written to destination from `destination_offset`, e.g. to append it.
+    """
+    offset = 0
+    for method in ("copy_file_range", "sendfile"):
+        if offset >= size:
+            return
+        if not hasattr(os, method):
+            continue
+
+        try:
+            while offset < size:
+                if method == "copy_file_range":
+                    copied = os.copy_file_range(
+                        source_fd, destination_fd, size - offset, offset,
+                        destination_offset + offset,
+                    )
+                else:
+                    # sendfile writes data from the current position of destination
+                    os.lseek(destination_fd, destination_offset + offset, os.SEEK_SET)
+                    copied = os.sendfile(destination_fd, source_fd, offset, size - offset)
+                if not copied:
+                    break
+                offset += copied
+        except OSError as ex:
+            if ex.errno not in KERNEL_COPY_ERRORS:
+                raise
+
+    os.lseek(source_fd, offset, os.SEEK_SET)
+    os.lseek(destination_fd, destination_offset + offset, os.SEEK_SET)
+    while chunk := os.read(source_fd, COPY_BUFFER_SIZE):
+        os.write(destination_fd, chunk)
 
 
 if __name__ == "__main__":
@@ -106,5 +590,7 @@ if __name__ == "__main__":
     else:
         print(get_path(__file__))
 
+    import requests
+
     resp = requests.get("http://www.google.com")
     save_data_from_response_to_dir(get_full_file_path("some.txt", "book"), resp)
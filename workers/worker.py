@@ -1,10 +1,16 @@
+from __future__ import annotations
+
+import heapq
+import itertools
+import multiprocessing
 import queue
 import threading
 import time
-import requests
 from collections.abc import Callable, Generator
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass
 from functools import wraps
+from multiprocessing.shared_memory import SharedMemory
 from typing import Any
 
 from workers.observer import Signal
@@ -55,6 +61,10 @@ class ThreadError(Exception):
     pass
 
 
+class WorkerTimeoutError(ThreadError, TimeoutError):
+    pass
+
+
 class ThreadWorker:
     """Worker is implemented by threading module"""
 
@@ -88,6 +98,331 @@ class ThreadWorker:
             self._error.emit(ex)
 
 
+class PoolWorker:
+    """Worker which runs calls on bounded pool of threads and returns future of each call.
+
+    Call which is not finished in `timeout` seconds since its start gets
+    WorkerTimeoutError (thread can not be killed, so its late result is dropped).
+    Calls which are waiting in queue can be cancelled by their futures.
+    """
+
+    def __init__(self, max_workers: int | None = None, timeout: float | None = None) -> None:
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pool_worker")
+        self._error = Signal()
+        self._lock = threading.Condition()
+        self._futures: set[Future] = set()
+        self._last: Future | None = None
+        self._deadlines: list[tuple[float, int, Future, float]] = []
+        self._counter = itertools.count()
+        self._watchdog: threading.Thread | None = None
+        self._is_shutdown = False
+
+    def is_completed(self) -> bool:
+        """Return True if all calls are finished."""
+        if self._last is None:
+            raise ThreadError
+        with self._lock:
+            return all(future.done() for future in self._futures)
+
+    def get_result(self) -> Any:
+        """Return result of the last call or None if it is not finished or failed."""
+        future = self._last
+        if future is None or not future.done() or future.cancelled() or future.exception():
+            return None
+        return future.result()
+
+    def set_error_handler(self, handler: Callable) -> None:
+        # converter sets its handler before each call
+        if handler not in self._error.handlers:
+            self._error.connect(handler)
+
+    def execute(self, func: Callable, *args, **kwargs) -> Future:
+        return self.execute_with_timeout(self.timeout, func, *args, **kwargs)
+
+    def execute_with_timeout(
+        self, timeout: float | None, func: Callable, *args, **kwargs,
+    ) -> Future:
+        future: Future = Future()
+        with self._lock:
+            if self._is_shutdown:
+                msg = "Worker was shut down"
+                raise ThreadError(msg)
+            self._futures.add(future)
+            self._last = future
+        future.add_done_callback(self._forget)
+        self._executor.submit(self._run, future, timeout, func, args, kwargs)
+        return future
+
+    def cancel_all(self) -> int:
+        """Cancel calls which are not started yet and return their count."""
+        with self._lock:
+            futures = list(self._futures)
+        return sum(future.cancel() for future in futures)
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        """Do not accept new calls, finish (or cancel) the queued ones."""
+        with self._lock:
+            self._is_shutdown = True
+        if cancel_pending:
+            self.cancel_all()
+        self._executor.shutdown(wait=wait)
+        with self._lock:
+            self._lock.notify_all()
+
+    def __enter__(self) -> PoolWorker:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+    def _forget(self, future: Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def _run(
+        self, future: Future, timeout: float | None, func: Callable, args: tuple, kwargs: dict,
+    ) -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+
+        if timeout is not None:
+            self._add_deadline(future, timeout)
+        try:
+            result = func(*args, **kwargs)
+        except Exception as ex:
+            self._set_error(future, ex)
+        else:
+            try:
+                future.set_result(result)
+            except InvalidStateError:
+                # call was timed out
+                pass
+
+    def _set_error(self, future: Future, error: Exception) -> None:
+        try:
+            future.set_exception(error)
+        except InvalidStateError:
+            return
+        self._error.emit(error)
+
+    def _add_deadline(self, future: Future, timeout: float) -> None:
+        with self._lock:
+            deadline = time.monotonic() + timeout
+            heapq.heappush(self._deadlines, (deadline, next(self._counter), future, timeout))
+            if self._watchdog is None:
+                self._watchdog = threading.Thread(
+                    target=self._watch_deadlines, name="pool_worker_watchdog", daemon=True)
+                self._watchdog.start()
+            self._lock.notify_all()
+
+    def _watch_deadlines(self) -> None:
+        """Fail calls which are running longer than their timeout."""
+        while True:
+            expired = []
+            with self._lock:
+                while self._deadlines and self._deadlines[0][2].done():
+                    heapq.heappop(self._deadlines)
+                if not self._deadlines:
+                    if self._is_shutdown:
+                        self._watchdog = None
+                        return
+                    self._lock.wait()
+                    continue
+
+                delay = self._deadlines[0][0] - time.monotonic()
+                if delay > 0:
+                    self._lock.wait(delay)
+                    continue
+                while self._deadlines and self._deadlines[0][0] <= time.monotonic():
+                    expired.append(heapq.heappop(self._deadlines))
+
+            for _, _, future, timeout in expired:
+                self._set_error(future, WorkerTimeoutError(f"Call was not finished in {timeout}s"))
+
+
+# bytes which are larger are passed to other process by shared memory
+SHARED_MEMORY_THRESHOLD = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class SharedBuffer:
+    """Bytes in shared memory, only name and size of them are pickled."""
+
+    name: str
+    size: int
+
+
+def share(value: Any, threshold: int, track: bool = True) -> tuple[Any, SharedMemory | None]:
+    """Copy large bytes to shared memory and return buffer to send instead of them."""
+    if not isinstance(value, (bytes, bytearray, memoryview)):
+        return value, None
+
+    data = memoryview(value).cast("B")
+    if not data.nbytes or data.nbytes < threshold:
+        return value, None
+
+    memory = SharedMemory(create=True, size=data.nbytes, track=track)
+    memory.buf[:data.nbytes] = data
+    return SharedBuffer(memory.name, data.nbytes), memory
+
+
+def unshare(value: Any, unlink: bool = False) -> Any:
+    """Return bytes of shared buffer, other values are returned as is."""
+    if not isinstance(value, SharedBuffer):
+        return value
+
+    # memory is tracked by process which unlinks it
+    memory = SharedMemory(value.name, track=unlink)
+    try:
+        return bytes(memory.buf[:value.size])
+    finally:
+        memory.close()
+        if unlink:
+            memory.unlink()
+
+
+def _run_in_process(func: Callable, args: tuple, kwargs: dict, threshold: int) -> Any:
+    args = tuple(unshare(arg) for arg in args)
+    kwargs = {name: unshare(value) for name, value in kwargs.items()}
+    result, memory = share(func(*args, **kwargs), threshold, track=False)
+    if memory is not None:
+        # parent process reads and unlinks it
+        memory.close()
+    return result
+
+
+class _ProcessFuture(Future):
+    """Future of call which can be cancelled while it is not sent to process."""
+
+    def __init__(self, call: Future) -> None:
+        super().__init__()
+        self._call = call
+
+    def cancel(self) -> bool:
+        # future is cancelled by callback of the call
+        return self._call.cancel()
+
+
+class ProcessWorker:
+    """Worker which runs calls in spawned processes, so CPU bound code is not limited by GIL.
+
+    Function and its arguments should be picklable (function is imported by its
+    name in other process). Bytes which are larger than `shared_memory_threshold`
+    are passed by shared memory in both directions instead of pickling.
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        shared_memory_threshold: int = SHARED_MEMORY_THRESHOLD,
+        max_tasks_per_child: int | None = None,
+    ) -> None:
+        self.shared_memory_threshold = shared_memory_threshold
+        self._executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            max_tasks_per_child=max_tasks_per_child,
+        )
+        self._error = Signal()
+        self._lock = threading.Lock()
+        self._futures: set[Future] = set()
+        self._last: Future | None = None
+
+    def is_completed(self) -> bool:
+        """Return True if all calls are finished."""
+        if self._last is None:
+            raise ThreadError
+        with self._lock:
+            return all(future.done() for future in self._futures)
+
+    def get_result(self) -> Any:
+        """Return result of the last call or None if it is not finished or failed."""
+        future = self._last
+        if future is None or not future.done() or future.cancelled() or future.exception():
+            return None
+        return future.result()
+
+    def set_error_handler(self, handler: Callable) -> None:
+        if handler not in self._error.handlers:
+            self._error.connect(handler)
+
+    def execute(self, func: Callable, *args, **kwargs) -> Future:
+        memories = []
+
+        def to_shared(value: Any) -> Any:
+            value, memory = share(value, self.shared_memory_threshold)
+            if memory is not None:
+                memories.append(memory)
+            return value
+
+        try:
+            call = self._executor.submit(
+                _run_in_process,
+                func,
+                tuple(to_shared(arg) for arg in args),
+                {name: to_shared(value) for name, value in kwargs.items()},
+                self.shared_memory_threshold,
+            )
+        except BaseException:
+            self._release(memories)
+            raise
+
+        future = _ProcessFuture(call)
+        with self._lock:
+            self._futures.add(future)
+            self._last = future
+        future.add_done_callback(self._forget)
+        call.add_done_callback(lambda done: self._on_done(future, done, memories))
+        return future
+
+    def cancel_all(self) -> int:
+        """Cancel calls which are not sent to processes yet and return their count."""
+        with self._lock:
+            futures = list(self._futures)
+        return sum(future.cancel() for future in futures)
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False) -> None:
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+    def __enter__(self) -> ProcessWorker:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+    @staticmethod
+    def _release(memories: list[SharedMemory]) -> None:
+        for memory in memories:
+            memory.close()
+            memory.unlink()
+
+    def _forget(self, future: Future) -> None:
+        with self._lock:
+            self._futures.discard(future)
+
+    def _on_done(self, future: Future, call: Future, memories: list[SharedMemory]) -> None:
+        self._release(memories)
+        if call.cancelled():
+            Future.cancel(future)
+            future.set_running_or_notify_cancel()
+            return
+
+        error = call.exception()
+        if error is None:
+            try:
+                result = unshare(call.result(), unlink=True)
+            except Exception as ex:
+                error = ex
+            else:
+                future.set_result(result)
+                return
+
+        future.set_exception(error)
+        self._error.emit(error)
+
+
 class WorkerCoroutine:
     def is_completed(self):
         return self._status in ["error", "completed"]
@@ -201,6 +536,8 @@ class WorkerCoroutine:
 
 
 if __name__ == "__main__":
+    import requests
+
     def get_response_status(some):
         res = requests.get("http://localhost:5000/", json={"some": some})
         return res, res.json()["status"]["code"]